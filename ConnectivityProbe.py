@@ -0,0 +1,207 @@
+#!/usr/bin/python3
+# -*- coding: utf-8 -*-
+
+#=========================================================================
+#	ConnectivityProbe.py
+#	Author: Raul Rojas
+#	Contact: rrojas994@gmail.com
+#	Description:
+#		Checks whether network targets (gateways, DNS servers, etc.) can
+#       be reached. Every target is probed concurrently with asyncio, by
+#       ICMP echo where unprivileged ping sockets are allowed and by a
+#       TCP connect otherwise, and the whole run finishes within one
+#       deadline no matter how many interfaces or targets there are.
+#=========================================================================
+
+import asyncio
+import socket
+import struct
+import time
+from collections import deque
+
+#------------------------------------------------------------
+#	getDefaultGateways()
+#		Description: Returns a dictionary of interface name ->
+#           default route gateway IP read from /proc/net/route.
+#           Interfaces without a default route are left out.
+#------------------------------------------------------------
+def getDefaultGateways(routeFile='/proc/net/route'):
+    gateways = dict()
+    try:
+        with open(routeFile, 'r') as f:
+            lines = f.read().splitlines()[1:]
+    except OSError:
+        return gateways
+    for line in lines:
+        fields = line.split()
+        if(len(fields) < 8 or fields[1] != '00000000' or fields[7] != '00000000'):
+            continue # only default routes (destination and mask 0.0.0.0).
+        if(not(int(fields[3], 16) & 0x2)): # RTF_GATEWAY
+            continue
+        gateways.setdefault(fields[0], socket.inet_ntoa(struct.pack('<L', int(fields[2], 16))))
+    return gateways
+
+
+#------------------------------------------------------------
+#	class ProbeTarget()
+#		Description: Something to probe. sourceAddress binds
+#           the probe to an interface's address so it leaves
+#           through that interface.
+#------------------------------------------------------------
+class ProbeTarget():
+    def __init__(self, host, sourceAddress=None, name=None, tcpPorts=(53, 80, 443)):
+        self.host = host
+        self.sourceAddress = sourceAddress
+        self.name = name if name else host
+        self.tcpPorts = tuple(tcpPorts)
+
+    def key(self):
+        return (self.host, self.sourceAddress)
+
+    def __repr__(self):
+        return 'ProbeTarget({}, {})'.format(self.name, self.host)
+
+
+#------------------------------------------------------------
+#	class ProbeHistory()
+#		Description: Rolling latency/loss history of a target.
+#           Lost probes are stored as None.
+#------------------------------------------------------------
+class ProbeHistory():
+    def __init__(self, size=60):
+        self.samples = deque(maxlen=size) # (time, latency ms or None)
+
+    def add(self, latency):
+        self.samples.append((time.time(), latency))
+
+    @property
+    def last(self):
+        return self.samples[-1][1] if self.samples else None
+
+    def getLoss(self):
+        if(not(self.samples)):
+            return 0.0
+        return sum(1 for _, l in self.samples if l is None) / len(self.samples)
+
+    def getAverageLatency(self):
+        latencies = [l for _, l in self.samples if l is not None]
+        return sum(latencies) / len(latencies) if latencies else None
+
+
+'''
+----------------------------------------------------------------------------------------------------------
+    class ProbeEngine()
+    Description:
+        Probes every target at the same time and returns once all of them answered or the
+        deadline passed, whichever is first. Targets that did not answer in time count as lost.
+        ICMP echo is used when the kernel allows unprivileged ping sockets
+        (net.ipv4.ping_group_range), otherwise (or with useIcmp=False) a TCP connect to the
+        target's ports is used. A refused connection still proves the host is reachable.
+    Attributes:
+        deadline: Seconds the whole run may take.
+        history: Dictionary of target key -> ProbeHistory.
+----------------------------------------------------------------------------------------------------------
+'''
+class ProbeEngine():
+    def __init__(self, deadline=1.0, useIcmp=True, historySize=60):
+        self.deadline = deadline
+        self.useIcmp = useIcmp
+        self.historySize = historySize
+        self.history = dict()
+        self._icmpAllowed = None # unknown until the first ping socket is opened.
+        self._sequence = 0
+
+    def run(self, targets):
+        '''Blocking wrapper around probeAll(), returns {target name: latency ms or None}.'''
+        return asyncio.run(self.probeAll(targets))
+
+    async def probeAll(self, targets):
+        tasks = {asyncio.ensure_future(self.probe(t)): t for t in targets}
+        results = {t.name: None for t in targets}
+        if(tasks):
+            done, pending = await asyncio.wait(tasks.keys(), timeout=self.deadline)
+            for task in pending:
+                task.cancel()
+            for task in done:
+                if(not(task.cancelled()) and task.exception() is None):
+                    results[tasks[task].name] = task.result()
+        for t in targets:
+            self.getHistory(t).add(results[t.name])
+        return results
+
+    def getHistory(self, target):
+        history = self.history.get(target.key())
+        if(history is None):
+            history = ProbeHistory(self.historySize)
+            self.history[target.key()] = history
+        return history
+
+    async def probe(self, target):
+        '''Returns the latency in ms or None if the target could not be reached.'''
+        if(self.useIcmp and self._icmpAllowed is not False):
+            try:
+                return await self.probeIcmp(target)
+            except PermissionError:
+                self._icmpAllowed = False # not allowed for this user, stop trying.
+            except OSError:
+                return None
+        return await self.probeTcp(target)
+
+    async def probeIcmp(self, target):
+        loop = asyncio.get_running_loop()
+        sock = socket.socket(socket.AF_INET, socket.SOCK_DGRAM, socket.IPPROTO_ICMP)
+        self._icmpAllowed = True
+        try:
+            sock.setblocking(False)
+            if(target.sourceAddress):
+                sock.bind((target.sourceAddress, 0))
+            seq = self._sequence = (self._sequence + 1) & 0xffff # other probes change _sequence while this one waits.
+            packet = _icmpEcho(seq)
+            sock.connect((target.host, 0))
+            start = time.perf_counter()
+            await loop.sock_sendall(sock, packet)
+            while(True):
+                reply = await loop.sock_recv(sock, 1024)
+                if(len(reply) >= 8 and reply[0] == 0 and struct.unpack('!H', reply[6:8])[0] == seq):
+                    return (time.perf_counter() - start) * 1000
+        finally:
+            sock.close()
+
+    async def probeTcp(self, target):
+        localAddr = (target.sourceAddress, 0) if target.sourceAddress else None
+        attempts = [asyncio.ensure_future(self._connect(target.host, port, localAddr)) for port in target.tcpPorts]
+        try:
+            for attempt in asyncio.as_completed(attempts):
+                latency = await attempt
+                if(latency is not None):
+                    return latency
+            return None
+        finally:
+            for attempt in attempts:
+                attempt.cancel()
+
+    async def _connect(self, host, port, localAddr):
+        start = time.perf_counter()
+        try:
+            reader, writer = await asyncio.open_connection(host, port, local_addr=localAddr)
+            writer.close()
+        except ConnectionRefusedError:
+            pass # the host answered with a reset, so it is reachable.
+        except OSError:
+            return None
+        return (time.perf_counter() - start) * 1000
+
+
+def _icmpEcho(sequence):
+    header = struct.pack('!BBHHH', 8, 0, 0, 0, sequence) # the kernel fills in the identifier.
+    payload = b'DeskClock'
+    checksum = _checksum(header + payload)
+    return struct.pack('!BBHHH', 8, 0, checksum, 0, sequence) + payload
+
+def _checksum(data):
+    if(len(data) % 2):
+        data += b'\x00'
+    total = sum(struct.unpack('!{}H'.format(len(data) // 2), data))
+    total = (total >> 16) + (total & 0xffff)
+    total += total >> 16
+    return ~total & 0xffff
@@ -12,13 +12,18 @@
 #       may not translate as intentionally designed. 
 #=========================================================================
 
-import PySimpleGUI as sg 
-import LayoutManager
-import DeskClockWindows
+import StartupProfiler # first import, the start up timeline begins here.
+import sys
+with StartupProfiler.span('import PySimpleGUI'):
+    import PySimpleGUI as sg 
+with StartupProfiler.span('import DeskClock modules'):
+    import DeskClockWindows
+    import WindowManager
+    import WorkerPool
+    import DeskClockSettings
 #TODO: add a theme picker feature.
 
-windows = dict()
-activeWindow = None
+windows = WindowManager.WindowManager()
 
 #------------------------------------------------------------
 #	main()
@@ -26,56 +31,47 @@ activeWindow = None
 #           by "if __name__ == __main__" @ gottom of file.
 #------------------------------------------------------------
 def main():
-    global windows
-    global activeWindow
-    windows['bg'] = DeskClockWindows.BGWindow()
-    windows['main'] = DeskClockWindows.MainWindow()
-    windows['layouts'] = None
-    activeWindow = windows['main']
+    with StartupProfiler.span('build background window'):
+        windows.add('bg', DeskClockWindows.BGWindow())
+    windows.show('main', DeskClockWindows.MainWindow)
 
-    while(activeWindow):
-        event, values = activeWindow.attend()
+    while(windows.active):
+        event, values = windows.active.attend()
         handleWindowEvents(event, values)
-    
-    closeAllWindows()
+
+    closeAllWindows() # the only place windows are closed, features are detached once.
 
 def handleWindowEvents(event, values):
     '''
     Handles any events that are not handled or cant be handled by the class because of scope restraint.
     '''
-    global activeWindow
-    global windows
-    if(event == sg.WINDOW_CLOSED or event == '-button.main.exit-'):
-        if(activeWindow == windows['layouts']):
-            activeWindow.close()
-            activeWindow = None 
-            activeWindow = windows['main']
+    if(event == sg.WINDOW_CLOSED or event == '-button.main.exit-' or event == 'button.exit'):
+        if(windows.activeName == 'layouts'):
+            windows.show('main') # layout manager stays in memory for the next time it is opened.
         else:
-            activeWindow.close()
-            activeWindow = None
+            windows.requestExit() # main() closes everything once its loop ends.
     if(event == sg.TIMEOUT_EVENT):
-        activeWindow.update()
-        activeWindow.finalize()
+        windows.active.update() # changed elements are flushed by the window, no need to finalize.
+        StartupProfiler.finish() # first update of the main window is the first real frame.
     if(event == '-button.main.layout-'):
-        activeWindow.close()
-        activeWindow = None
-        windows['layouts'] = LayoutManager.LayoutManager()
-        activeWindow = windows['layouts']
+        import LayoutManager # imported on first use, it loads every available feature.
+        windows.show('layouts', LayoutManager.LayoutManager)
     if(event == '-button.layouts.save-'):
-        listOfFeatures = activeWindow.getListOfActiveFeats()
-        activeWindow.close()
-        activeWindow = None
-        windows['main'] = DeskClockWindows.MainWindow(listOfFeatures=listOfFeatures)
-        activeWindow = windows['main']
+        descriptors = windows.active.getLayoutDescriptors()
+        slotName = windows.active.getSlotName()
+        windows.get('main').applyLayout(descriptors, slotName) # keeps unchanged features, only rebuilds if needed.
+        windows.show('main')
 
 def closeAllWindows():
     '''
     Close any remaining windows that are stored in memory.
     '''
-    global windows
-    for w in windows.values():
-        if(w):
-            w.close()
+    windows.closeAll()
+    WorkerPool.shutdownPool()
+    TimeSeries = sys.modules.get('TimeSeries') # only loaded once a feature keeps history.
+    if(TimeSeries):
+        TimeSeries.closeAll() # flushes the history files.
+    DeskClockSettings.flushAll() # writes changes still waiting for their debounce.
 
 if __name__ == "__main__":
     main()
\ No newline at end of file
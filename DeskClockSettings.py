@@ -5,45 +5,296 @@
 #	DeskClockSettings.py
 #	Author: Raul Rojas
 #	Contact: rrojas994@gmail.com
-#	Description: 
-#		Module providing a settings object for deskClock.py and allow for 
+#	Description:
+#		Module providing a settings object for deskClock.py and allow for
 #       user preference persistance.
 #=========================================================================
 
 
 import json
+import os
+import threading
+
+SCHEMA_VERSION = 2
+_stores = dict()
+_storesLock = threading.Lock()
 
 class Settings():
     def __init__(self, **Settings):
         self.settings = Settings
-    
+
+
+#------------------------------------------------------------
+#	Schema migrations, fromVersion -> function(data) that
+#       returns the data of fromVersion + 1. "data" is the
+#       whole file, the settings live in data['settings'].
+#------------------------------------------------------------
+def _migrateFrom0(data):
+    # Version 0 files were Settings.__dict__ written by saveSettings(): {"settings": {...}},
+    # files written by loadSettings() nested it once more: {"settings": {"settings": {...}}}.
+    settings = data.get('settings', dict())
+    while(isinstance(settings, dict) and list(settings.keys()) == ['settings'] and isinstance(settings['settings'], dict)):
+        settings = settings['settings']
+    return {'schemaVersion': 1, 'settings': settings if isinstance(settings, dict) else dict()}
+
+def _migrateFrom1(data):
+    # Version 1 layouts gave every feature the layout manager's index as {"timeAdjust": i}. Only
+    # the clocks take that option, it is removed from the other features so they can be built.
+    settings = data['settings']
+    layouts = settings.get('layouts')
+    if(isinstance(layouts, dict)):
+        for entries in layouts.values():
+            for entry in entries if isinstance(entries, list) else []:
+                opts = entry.get('opts') if isinstance(entry, dict) else None
+                if(isinstance(opts, dict) and entry.get('id') not in ('VanillaFeatures.Clock', 'VanillaFeatures.Clock2')):
+                    opts.pop('timeAdjust', None)
+                    if(not(opts)):
+                        del entry['opts']
+    return {'schemaVersion': 2, 'settings': settings}
+
+MIGRATIONS = {
+    0: _migrateFrom0,
+    1: _migrateFrom1
+}
+
+
+'''
+----------------------------------------------------------------------------------------------------------
+    class SettingsStore()
+    Description:
+        Settings kept in memory and written to a JSON file in the background. Changes made close
+        together are written once, "debounce" seconds after the first of them. Writes go to a
+        temporary file that is fsync'd and renamed over the settings file, so a power cut leaves
+        either the old or the new file, never a torn one. Files of older schema versions are
+        migrated when loaded (see MIGRATIONS).
+        Subscribers are called with a dictionary of only the keys that changed, right away on
+        the thread that made the change.
+        Example:
+            store = getStore()
+            token = store.subscribe(self.onSettingsChanged, keys=['militaryTime'])
+            store.set('militaryTime', True)
+            store.unsubscribe(token)
+    Attributes:
+        path: Settings file, None keeps the settings in memory only.
+        debounce: Seconds between the first unsaved change and the write.
+----------------------------------------------------------------------------------------------------------
+'''
+class SettingsStore():
+    def __init__(self, path='Settings.json', debounce=2.0):
+        self.path = path
+        self.debounce = debounce
+        self.values = dict()
+        self.writes = 0
+        self._dirty = False
+        self._timer = None
+        self._lock = threading.RLock()
+        self._writeLock = threading.Lock() # one write at a time, in the order the snapshots were taken.
+        self._subscribers = dict() # token -> (callback, keys or None)
+        self._nextToken = 0
+        self.load()
+
+    def load(self):
+        '''(Re)reads the file, migrating it if it is an older version. Unreadable files give defaults.'''
+        data = None
+        if(self.path):
+            try:
+                with open(self.path, 'r') as f:
+                    data = json.load(f)
+            except (IOError, ValueError):
+                data = None
+        if(not(isinstance(data, dict))):
+            data = {'schemaVersion': SCHEMA_VERSION, 'settings': dict()}
+        version = data.get('schemaVersion', 0)
+        migrated = version < SCHEMA_VERSION
+        while(version < SCHEMA_VERSION):
+            data = MIGRATIONS[version](data)
+            version = data['schemaVersion']
+        with self._lock:
+            changes = self._changes(data['settings'], replace=True)
+            self.values = dict(data['settings'])
+        self._notify(changes)
+        if(migrated):
+            self._markDirty()
+
+    def get(self, key, default=None):
+        with self._lock:
+            return self.values.get(key, default)
+
+    def __getitem__(self, key):
+        with self._lock:
+            return self.values[key]
+
+    def __contains__(self, key):
+        with self._lock:
+            return key in self.values
+
+    def __setitem__(self, key, value):
+        self.set(key, value)
+
+    def set(self, key, value):
+        self.update({key: value})
+
+    def update(self, values: dict, replace=False):
+        '''Sets several keys at once, replace=True also removes the keys not in "values".'''
+        with self._lock:
+            changes = self._changes(values, replace)
+            if(not(changes)):
+                return
+            if(replace):
+                self.values = dict(values)
+            else:
+                self.values.update(values)
+        self._notify(changes)
+        self._markDirty()
+
+    def delete(self, key):
+        with self._lock:
+            if(key not in self.values):
+                return
+            del self.values[key]
+        self._notify({key: None})
+        self._markDirty()
+
+    def subscribe(self, callback, keys=None):
+        '''
+        Calls callback(changes) whenever any of "keys" (every key if None) changes, "changes"
+        holds only the changed keys, a removed key has the value None. Returns a token for
+        unsubscribe().
+        '''
+        with self._lock:
+            self._nextToken += 1
+            self._subscribers[self._nextToken] = (callback, set(keys) if keys is not None else None)
+            return self._nextToken
+
+    def unsubscribe(self, token):
+        with self._lock:
+            self._subscribers.pop(token, None)
+
+    def flush(self, force=False):
+        '''Writes the pending changes now (force writes even without any). Returns True if written.'''
+        # The snapshot is taken and written under the write lock, so a timer flush and a flush
+        # at exit can not share the temporary file or put an older snapshot over a newer one.
+        # Only the snapshot needs self._lock, readers and writers are not held up by the disk.
+        with self._writeLock:
+            with self._lock:
+                if(self._timer is not None):
+                    self._timer.cancel()
+                    self._timer = None
+                if(not(self._dirty or force)):
+                    return False
+                self._dirty = False
+                data = {'schemaVersion': SCHEMA_VERSION, 'settings': dict(self.values)}
+            if(self.path):
+                _atomicWrite(self.path, json.dumps(data, separators=(',', ':')))
+                self.writes += 1
+        return True
+
+    def close(self):
+        self.flush()
+
+    def _changes(self, values, replace):
+        changes = {k: v for k, v in values.items() if k not in self.values or self.values[k] != v}
+        if(replace):
+            changes.update({k: None for k in self.values if k not in values})
+        return changes
+
+    def _notify(self, changes):
+        if(not(changes)):
+            return
+        with self._lock:
+            subscribers = list(self._subscribers.values())
+        for callback, keys in subscribers:
+            wanted = changes if keys is None else {k: v for k, v in changes.items() if k in keys}
+            if(wanted):
+                callback(wanted)
+
+    def _markDirty(self):
+        with self._lock:
+            self._dirty = True
+            if(self.debounce > 0):
+                if(self._timer is None): # later changes ride on the write already scheduled.
+                    self._timer = threading.Timer(self.debounce, self._timerFlush)
+                    self._timer.daemon = True
+                    self._timer.start()
+                return
+        self.flush()
+
+    def _timerFlush(self):
+        with self._lock:
+            self._timer = None
+        self.flush()
+
+
+#------------------------------------------------------------
+#	_atomicWrite()
+#		Description: Replaces a file with "text" so that it is
+#           either fully old or fully new after a power cut.
+#------------------------------------------------------------
+def _atomicWrite(path, text):
+    directory = os.path.dirname(os.path.abspath(path))
+    tmpPath = path + '.tmp'
+    with open(tmpPath, 'w') as f:
+        f.write(text)
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(tmpPath, path)
+    try: # make the rename itself durable.
+        dirFd = os.open(directory, os.O_RDONLY)
+    except OSError:
+        return
+    try:
+        os.fsync(dirFd)
+    except OSError:
+        pass
+    finally:
+        os.close(dirFd)
+
+#------------------------------------------------------------
+#	getStore()
+#		Description: Returns the settings store shared by the
+#           app for a file, loading it on first use.
+#------------------------------------------------------------
+def getStore(fPath='Settings.json'):
+    with _storesLock:
+        store = _stores.get(fPath)
+        if(store is None):
+            store = SettingsStore(fPath)
+            _stores[fPath] = store
+    return store
+
+#------------------------------------------------------------
+#	flushAll()
+#		Description: Writes the pending changes of every store,
+#           call before exiting.
+#------------------------------------------------------------
+def flushAll():
+    with _storesLock:
+        stores = list(_stores.values())
+    for store in stores:
+        store.flush()
 
 #------------------------------------------------------------
 #	loadSettings()
 #		Description: Deserializes a saved settings object if
-#           it exists.
+#           it exists. The values are a copy of the shared
+#           store's, see getStore().
 #------------------------------------------------------------
 def loadSettings(fPath='Settings.json'):
-    try:
-        with open(fPath, 'r') as f:
-            settings = Settings(**json.load(f))
-    except IOError:
-        print('Settings file not found, loading default settings.')
-        settings = Settings()
-    return settings
+    return Settings(**getStore(fPath).values)
 
 #------------------------------------------------------------
 #	saveSettings(settings: Settings)
-#		Description: Serializes a settings object.
+#		Description: Serializes a settings object. The file is
+#           written right away.
 #------------------------------------------------------------
 def saveSettings(settings_obj: Settings, fPath='Settings.json'):
-    inputType = str(type(settings_obj))
-    with open(fPath, 'w') as f:
-        if(inputType == "<class 'DeskClockSettings.Settings'>" or inputType == "<class '__main__.Settings'>"):
-            json.dump(settings_obj.__dict__, f, indent=4)
-        else:
-            raise TypeError("Expecting an object of type: <class 'DeskClockSettings.Settings'>")
-
-s = loadSettings()
-saveSettings(s)
-print('complete')
\ No newline at end of file
+    if(not(isinstance(settings_obj, Settings))):
+        raise TypeError("Expecting an object of type: <class 'DeskClockSettings.Settings'>")
+    store = getStore(fPath)
+    store.update(settings_obj.settings, replace=True)
+    store.flush(force=True)
+
+if __name__ == "__main__":
+    s = loadSettings()
+    saveSettings(s)
+    print('complete')
@@ -12,12 +12,19 @@
 
 import PySimpleGUI as sg 
 import FeatureBlock
-import VanillaFeatures
+import TickScheduler
+import RenderSurface
+import WorkerPool
+import LatencyMonitor
+import LayoutDescriptor
+import DeskClockSettings
+import EventRouter
+import StartupProfiler
+import time
 from typing import List
 
 _fixedResolution = (800, 480) # fixed resolution size for RPi Touch screen
-_screenResolution = sg.Window.get_screen_size()
-_screenResolution = _fixedResolution # Used to test and debug, comment out for variable screen sizes.
+_screenResolution = _fixedResolution # Used to test and debug, use sg.Window.get_screen_size() for variable screen sizes.
 _mainFontType = 'Everson Mono'
 _mainFontPair = (_mainFontType, 16)
 _defaultTheme = 'DarkAmber'
@@ -71,23 +78,62 @@ class DCWindow():
         self.handleEvents(event, values)
         return (event, values)
     
+    def hide(self):
+        '''Hides the window but keeps it in memory so it can be shown again instantly.'''
+        self.window.hide()
+
+    def show(self):
+        self.window.un_hide()
+        self.window.bring_to_front()
+
     def close(self):
         self.window.close()
         del(self)
 
 class MainWindow(DCWindow):
-    def start(self, listOfFeatures=None, timeout=100):
+    def start(self, listOfFeatures=None, timeout=None):
+        self.buildErrors = [] # features of the layout that could not be built, see buildFeature().
+        self.timeout = timeout # upper bound on how long to sleep, None sleeps until the next deadline.
+        self.visible = True
+        self.monitor = LatencyMonitor.getMonitor()
+        self.setFeatures(listOfFeatures)
+
+    def setFeatures(self, listOfFeatures: List[FeatureBlock.FeatureBlock]):
+        '''
+        Builds the window for a list of features. When a window already exists the new one is
+        built before the old one is closed so the screen never shows the desktop in between.
+        '''
         if(not(listOfFeatures)):
-            listOfFeatures = [
-                VanillaFeatures.Clock(0, 1),
-                VanillaFeatures.Clock(0, 0, timeAdjust=-3)
-            ]
+            with StartupProfiler.span('build saved layout'):
+                listOfFeatures = self.buildLayout(self.savedLayout())
+            if(not(listOfFeatures)): # nothing in the saved layout could be built.
+                listOfFeatures = self.buildLayout(self.defaultLayout())
+        oldWindow = self.window
+        oldFeatures = getattr(self, 'features', [])
         self.features = listOfFeatures
-        self.timeout = timeout
-        layout = self.windowLayout(listOfFeatures)
-        self.window = sg.Window(
+        self.featureNames = {id(f): LatencyMonitor.featureName(f) for f in self.features}
+        with StartupProfiler.span('build main window'):
+            self.window = self.buildWindow(listOfFeatures)
+        self.window.bind('<Configure>', EventRouter.RESIZE_EVENT) # filtered in handleEvents().
+        self.windowSize = self.window.size
+        self.surface = RenderSurface.RenderSurface(self.window) # features draw through here so unchanged values are dropped.
+        WorkerPool.getPool().attachWindow(self.window) # background job results are posted to this window.
+        kept = {id(f) for f in self.features}
+        for feature in oldFeatures:
+            if(id(feature) not in kept):
+                feature.detach()
+        for feature in self.features:
+            feature.attach()
+            feature.setVisible(self.visible)
+        self.scheduler = TickScheduler.TickScheduler([f for f in self.features if f.visible], maxTimeout=self.timeout)
+        self.router = EventRouter.EventRouter(self.features) # each event goes to the feature owning its key.
+        if(oldWindow):
+            oldWindow.close()
+
+    def buildWindow(self, listOfFeatures: List[FeatureBlock.FeatureBlock]):
+        return sg.Window(
             title='DeskClock',
-            layout=layout,
+            layout=self.windowLayout(listOfFeatures),
             no_titlebar=True,
             font=_mainFontPair,
             size=_screenResolution,
@@ -100,6 +146,79 @@ class MainWindow(DCWindow):
             finalize=True
             )
 
+    def defaultLayout(self):
+        return [
+            LayoutDescriptor.FeatureDescriptor('VanillaFeatures.Clock', 0, 1),
+            LayoutDescriptor.FeatureDescriptor('VanillaFeatures.Clock', 0, 0, {'timeAdjust': -3})
+        ]
+
+    def savedLayout(self):
+        '''Returns the descriptors of the active layout slot of the settings, or the default layout.'''
+        descriptors = LayoutDescriptor.loadLayout(DeskClockSettings.getStore())
+        return descriptors if descriptors else self.defaultLayout()
+
+    def buildLayout(self, descriptors: List[LayoutDescriptor.FeatureDescriptor]):
+        '''
+        Creates the features of a layout, only their modules are imported. Features that cannot be
+        built (e.g. a plugin that was removed) are left out so the rest of the layout still shows.
+        '''
+        features = []
+        for d in descriptors:
+            feature = self.buildFeature(d)
+            if(feature is not None):
+                features.append(feature)
+        return features
+
+    def buildFeature(self, descriptor: LayoutDescriptor.FeatureDescriptor):
+        '''
+        Returns the feature of a descriptor, or None if it cannot be built. The error is kept in
+        buildErrors and shown at the bottom of the main window until the layout changes.
+        '''
+        try:
+            return descriptor.build()
+        except Exception as e: # any error from a third party feature.
+            self.buildErrors.append('Could not build {}: {}'.format(descriptor.classId, e))
+            return None
+
+    def applyLayout(self, descriptors: List[LayoutDescriptor.FeatureDescriptor], slotName=None):
+        '''
+        Applies a new layout as a diff against the running one. Features whose class and options
+        did not change are kept (with whatever state they have), only new features are created
+        and removed features are detached. The window is rebuilt only if the set of
+        features or their positions changed. With slotName the layout is also saved in that
+        settings slot and shown from it at the next boot. Returns True if the window was rebuilt.
+        '''
+        descriptors = descriptors if descriptors else self.defaultLayout()
+        self.buildErrors = []
+        if(slotName):
+            LayoutDescriptor.saveLayout(DeskClockSettings.getStore(), slotName, descriptors)
+        unused = list(self.features)
+        newFeatures = []
+        changed = False
+        for d in descriptors:
+            feature = None
+            for f in unused:
+                if(LayoutDescriptor.describeFeature(f).sameFeature(d)):
+                    feature = f
+                    break
+            if(feature is None):
+                feature = self.buildFeature(d)
+                changed = True
+                if(feature is None):
+                    continue # left out, the error is shown instead.
+            else:
+                unused.remove(feature)
+                changed = changed or not(feature.descriptor.samePosition(d))
+                feature.posRow = d.posRow
+                feature.posCol = d.posCol
+                feature.descriptor = d
+            newFeatures.append(feature)
+        if(unused): # detached by setFeatures().
+            changed = True
+        if(changed):
+            self.setFeatures(newFeatures)
+        return changed
+
     def windowLayout(self, listOfFeatures: List[FeatureBlock.FeatureBlock]):
         featureLayout = []
         listOfFeatures.sort()
@@ -117,6 +236,8 @@ class MainWindow(DCWindow):
             if(i >= len(listOfFeatures)): # if reached end of feature list.
                 break
         featureLayout += [[sg.Button('Layout', key='-button.main.layout-'), sg.Exit(key='-button.main.exit-')]]
+        if(self.buildErrors):
+            featureLayout += [[sg.Text('\n'.join(self.buildErrors), key='-text.main.errors-', font=(_mainFontPair[0], 10), text_color='orange')]]
 
         layout = [[
             sg.Column(
@@ -137,13 +258,69 @@ class MainWindow(DCWindow):
                 maxC = f.posCol
         return (maxR+1, maxC+1)
 
+    def attend(self, timeout=None, **kwargs):
+        to = timeout if timeout else self.scheduler.getTimeout() # sleep until the earliest feature deadline.
+        event, values = self.read(timeout=to, **kwargs)
+        self.handleEvents(event, values)
+        return (event, values)
+
     def update(self):
-        for feature in self.features:
-            feature.update(self.window)
+        now = time.time()
+        for feature in self.scheduler.popDueFeatures(now): # hidden features are not scheduled.
+            start = time.perf_counter()
+            feature.update(self.surface)
+            self.monitor.record(self.featureNames[id(feature)], 'update', time.perf_counter() - start)
+            self.scheduler.reschedule(feature, now)
+        self.surface.flush()
+        self.monitor.maybeDump()
+
+    def setTheme(self, theme):
+        '''
+        Rebuilds the window with another theme. Features keep their state, subscribers of
+        THEME_EVENT get it once the new elements exist.
+        '''
+        sg.theme(theme)
+        self.setFeatures(list(self.features))
+        self.window.write_event_value(EventRouter.THEME_EVENT, theme)
 
     def handleEvents(self, event, values):
+        if(event == EventRouter.RESIZE_EVENT):
+            size = self.window.size
+            if(size == self.windowSize): # <Configure> is also raised by moves and by every child element.
+                return
+            self.windowSize = size
+        for feature in self.router.route(event):
+            if(not(feature.visible) and not(feature.isJobResult(event))): # suspended.
+                continue
+            start = time.perf_counter()
+            feature.events(event, values, self.surface)
+            self.monitor.record(self.featureNames[id(feature)], 'events', time.perf_counter() - start)
+            if(feature.visible and getattr(feature, 'updateRequested', False)):
+                feature.updateRequested = False
+                self.scheduler.schedule(feature, time.time()) # due on the next timeout.
+        self.surface.flush()
+
+    def hide(self):
+        '''Suspends every feature, nothing is updated until show().'''
+        super().hide()
+        self.visible = False
+        for feature in self.features:
+            feature.setVisible(False)
+            self.scheduler.unschedule(feature)
+
+    def show(self):
+        super().show()
+        self.visible = True
+        now = time.time()
+        for feature in self.features:
+            feature.setVisible(True)
+            feature.updateRequested = False
+            self.scheduler.schedule(feature, now) # redrawn on the next timeout.
+
+    def close(self):
         for feature in self.features:
-            feature.events(event, values, self.window)
+            feature.detach()
+        super().close()
         
 
 class BGWindow(DCWindow):
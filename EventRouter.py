@@ -0,0 +1,104 @@
+#!/usr/bin/python3
+# -*- coding: utf-8 -*-
+
+#=========================================================================
+#	EventRouter.py
+#	Author: Raul Rojas
+#	Contact: rrojas994@gmail.com
+#	Description:
+#		Hands every window event to the feature block that owns it instead
+#       of asking every feature about every event. Element events are
+#       looked up by the safe key that produced them, events that belong
+#       to no element (timeouts, resizes, theme changes) only go to the
+#       features that subscribed to them.
+#=========================================================================
+
+import PySimpleGUI as sg
+
+# Global events a feature can subscribe to with its "globalEvents" attribute.
+TIMEOUT_EVENT = sg.TIMEOUT_EVENT            # every wake up of the main window.
+RESIZE_EVENT = '-event.global.resize-'      # the main window changed size.
+THEME_EVENT = '-event.global.theme-'        # the theme changed, elements have new colors.
+
+'''
+----------------------------------------------------------------------------------------------------------
+    class EventRouter()
+    Description:
+        Routing table from event to features, built from each feature's safeKeys (including the
+        '__jobs__' key background job results are posted with) and its "globalEvents". Finding
+        the features of an event is one dictionary lookup, however many features there are.
+        PySimpleGUI decorates some element events: "key+UP" style suffixes and (key, ...) tuples
+        are routed to the owner of "key".
+    Attributes:
+        routed: Number of events that reached at least one feature.
+        dropped: Number of events no feature owns or subscribed to (e.g. most timeouts).
+----------------------------------------------------------------------------------------------------------
+'''
+class EventRouter():
+    def __init__(self, features=()):
+        self.owners = dict()        # safe key -> feature
+        self.subscribers = dict()   # global event -> [features]
+        self.routed = 0
+        self.dropped = 0
+        for feature in features:
+            self.add(feature)
+
+    def add(self, feature):
+        for key in feature.safeKeys.values():
+            self.owners[key] = feature
+        for event in getattr(feature, 'globalEvents', ()):
+            self.subscribe(feature, event)
+
+    def remove(self, feature):
+        for key in feature.safeKeys.values():
+            if(self.owners.get(key) is feature):
+                del self.owners[key]
+        for event in list(self.subscribers.keys()):
+            self.unsubscribe(feature, event)
+
+    def subscribe(self, feature, event):
+        '''Delivers a global (or any other) event to a feature, in addition to its own keys.'''
+        features = self.subscribers.setdefault(event, [])
+        if(not(any(f is feature for f in features))):
+            features.append(feature)
+
+    def unsubscribe(self, feature, event):
+        features = self.subscribers.get(event)
+        if(features is None):
+            return
+        features[:] = [f for f in features if f is not feature]
+        if(not(features)):
+            del self.subscribers[event]
+
+    def route(self, event):
+        '''Returns the features that must receive an event, owner first, in subscription order.'''
+        owner = self.getOwner(event)
+        subscribers = self.subscribers.get(event, ()) if isinstance(event, str) or event is None else ()
+        if(owner is None):
+            if(subscribers):
+                self.routed += 1
+            else:
+                self.dropped += 1
+            return subscribers
+        self.routed += 1
+        if(subscribers):
+            return [owner] + [f for f in subscribers if f is not owner]
+        return (owner,)
+
+    def getOwner(self, event):
+        if(isinstance(event, tuple)): # e.g. table clicks: (key, '+CLICKED+', (row, col))
+            event = event[0] if event else None
+        if(not(isinstance(event, str))):
+            return None
+        owner = self.owners.get(event)
+        if(owner is None and '+' in event): # e.g. graph drag end: key + '+UP'
+            owner = self.owners.get(event.rsplit('+', 1)[0])
+        return owner
+
+    def getStats(self):
+        return {
+            'keys': len(self.owners),
+            'globalEvents': {event: len(features) for event, features in self.subscribers.items()},
+            'routed': self.routed,
+            'dropped': self.dropped
+        }
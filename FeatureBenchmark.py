@@ -0,0 +1,443 @@
+#!/usr/bin/python3
+# -*- coding: utf-8 -*-
+
+#=========================================================================
+#	FeatureBenchmark.py
+#	Author: Raul Rojas
+#	Contact: rrojas994@gmail.com
+#	Description:
+#		Headless benchmark runner for feature blocks. Features are drawn
+#       on a stub window that records element updates but never opens
+#       Tk, so they can be measured on any machine. Results are written
+#       as JSON so two runs on the same machine can be compared.
+#
+#       Example:
+#           python3 FeatureBenchmark.py VanillaFeatures.Clock --grid 4x4 --out clock.json
+#           python3 FeatureBenchmark.py VanillaFeatures.Clock --grid 4x4 --compare clock.json
+#           python3 FeatureBenchmark.py VanillaFeatures.Stopwatch --rate 60 --kwargs '{"autoStart": true}' --with VanillaFeatures.Clock:4
+#           python3 FeatureBenchmark.py VanillaFeatures.NetworkStatus --leak-check 5
+#=========================================================================
+
+import argparse
+import contextlib
+import importlib
+import json
+import os
+import platform
+import threading
+import time
+import tracemalloc
+from unittest import mock
+import PySimpleGUI as sg
+import EventRouter
+import FeatureBlock
+import LatencyMonitor
+import RenderSurface
+import TickScheduler
+
+_realTime = time.time
+_realMonotonicNs = time.monotonic_ns
+
+#------------------------------------------------------------
+#	class StubElement()
+#		Description: Stand in for a PySimpleGUI element, keeps
+#           the last update and counts how many were made and in
+#           how many ticks (frames) of its window.
+#------------------------------------------------------------
+class StubElement():
+    def __init__(self, key, window=None):
+        self.Key = key
+        self.window = window
+        self.calls = 0
+        self.frames = 0
+        self.lastTick = None
+        self.lastArgs = None
+        self.lastKwargs = None
+
+    def update(self, *args, **kwargs):
+        self.count()
+        self.lastArgs = args
+        self.lastKwargs = kwargs
+
+    def count(self):
+        self.calls += 1
+        tick = self.window.ticks if self.window else None
+        if(tick != self.lastTick or tick is None):
+            self.frames += 1
+            self.lastTick = tick
+
+    def __getattr__(self, name):
+        '''Any other element method (erase(), draw_line(), ...) is accepted and counted.'''
+        if(name.startswith('_')):
+            raise AttributeError(name)
+        def call(*args, **kwargs):
+            self.count()
+        return call
+
+
+'''
+----------------------------------------------------------------------------------------------------------
+    class StubWindow()
+    Description:
+        Stand in for sg.Window. Supports window[key].update(...), refresh(), finalize() and
+        write_event_value() but never draws anything.
+    Attributes:
+        elements: Every element that was accessed, by key.
+        queuedEvents: Events posted with write_event_value() that were not read yet.
+----------------------------------------------------------------------------------------------------------
+'''
+class StubWindow():
+    def __init__(self):
+        self.elements = dict()
+        self.queuedEvents = []
+        self.refreshes = 0
+        self.ticks = 0 # number of read() calls, one per main loop tick.
+
+    def __getitem__(self, key):
+        element = self.elements.get(key)
+        if(element is None):
+            element = StubElement(key, self)
+            self.elements[key] = element
+        return element
+
+    def refresh(self):
+        self.refreshes += 1
+
+    def finalize(self):
+        self.refreshes += 1
+
+    def write_event_value(self, key, value):
+        self.queuedEvents.append((key, value))
+
+    def read(self, timeout=None):
+        self.ticks += 1
+        if(self.queuedEvents):
+            key, value = self.queuedEvents.pop(0)
+            return (key, {key: value})
+        return (sg.TIMEOUT_EVENT, {})
+
+    def getUpdateCount(self):
+        return sum(e.calls for e in self.elements.values())
+
+
+#------------------------------------------------------------
+#	class SimulatedClock()
+#		Description: Replaces time.time(), time.monotonic()
+#           and time.monotonic_ns() while a benchmark runs so
+#           features see time advance at the simulated tick
+#           rate instead of the real one. Only the thread that
+#           drives the features sees simulated time, background
+#           threads (workers, asyncio loops) keep the real
+#           clocks so their timeouts still expire.
+#------------------------------------------------------------
+class SimulatedClock():
+    def __init__(self, start=None):
+        self.startTime = _realTime() if start is None else start
+        self.startMonotonicNs = _realMonotonicNs()
+        self.elapsedNs = 0 # integer so thousands of 1/rate steps do not drift.
+        self.thread = threading.get_ident()
+
+    def time(self):
+        if(threading.get_ident() != self.thread):
+            return _realTime()
+        return self.startTime + self.elapsedNs / 1e9
+
+    def monotonic(self):
+        return self.monotonic_ns() / 1e9
+
+    def monotonic_ns(self):
+        if(threading.get_ident() != self.thread):
+            return _realMonotonicNs()
+        return self.startMonotonicNs + self.elapsedNs
+
+    def advance(self, seconds):
+        self.elapsedNs += int(round(seconds * 1e9))
+
+    def patch(self):
+        '''Returns a context manager that installs the simulated clocks.'''
+        patches = [mock.patch('time.time', self.time), mock.patch('time.monotonic', self.monotonic),
+            mock.patch('time.monotonic_ns', self.monotonic_ns)]
+        stack = contextlib.ExitStack()
+        for p in patches:
+            stack.enter_context(p)
+        return stack
+
+#------------------------------------------------------------
+#	loadFeatureClass()
+#		Description: Returns the class for a "Module.Class"
+#           string.
+#------------------------------------------------------------
+def loadFeatureClass(name: str):
+    moduleName, className = name.rsplit('.', 1)
+    return getattr(importlib.import_module(moduleName), className)
+
+#------------------------------------------------------------
+#	buildGrid()
+#		Description: Creates rows x cols instances of a
+#           feature block class.
+#------------------------------------------------------------
+def buildGrid(featureClass, rows, cols, **featureKwargs):
+    return [featureClass(r, c, **featureKwargs) for r in range(rows) for c in range(cols)]
+
+#------------------------------------------------------------
+#	driveFeatures()
+#		Description: Runs "ticks" simulated ticks at "rate" Hz
+#           the same way MainWindow does: due features get
+#           update(), every tick is a timeout event routed to
+#           its subscribers and the surface is flushed once.
+#------------------------------------------------------------
+def driveFeatures(features, window, ticks, rate, monitor=None, useSurface=True):
+    clock = SimulatedClock()
+    surface = RenderSurface.RenderSurface(window) if useSurface else window
+    names = {id(f): LatencyMonitor.featureName(f) for f in features}
+    for f in features: # same lifecycle as in the main window.
+        f.attach()
+        f.setVisible(True)
+    with clock.patch():
+        scheduler = TickScheduler.TickScheduler(features)
+        router = EventRouter.EventRouter(features)
+        for _ in range(ticks):
+            event, values = window.read()
+            for f in router.route(event):
+                start = time.perf_counter()
+                f.events(event, values, surface)
+                if(monitor):
+                    monitor.record(names[id(f)], 'events', time.perf_counter() - start)
+                if(getattr(f, 'updateRequested', False)):
+                    f.updateRequested = False
+                    scheduler.schedule(f, clock.time())
+            now = clock.time()
+            for f in scheduler.popDueFeatures(now):
+                start = time.perf_counter()
+                f.update(surface)
+                if(monitor):
+                    monitor.record(names[id(f)], 'update', time.perf_counter() - start)
+                scheduler.reschedule(f, now)
+            if(useSurface):
+                surface.flush()
+            clock.advance(1 / rate)
+    return surface
+
+#------------------------------------------------------------
+#	buildFeatures()
+#		Description: Creates the benchmark grid plus any extra
+#           features, extras go in the rows below the grid.
+#------------------------------------------------------------
+def buildFeatures(featureClass, rows, cols, extraFeatures=None, **featureKwargs):
+    features = buildGrid(featureClass, rows, cols, **featureKwargs)
+    for i, (extraClass, count, extraKwargs) in enumerate(extraFeatures or []):
+        features += [extraClass(rows + i, c, **extraKwargs) for c in range(count)]
+    return features
+
+#------------------------------------------------------------
+#	mergeStats()
+#		Description: Merges the per instance latency stats of
+#           a monitor, percentiles are the worst instance's.
+#------------------------------------------------------------
+def mergeStats(monitorStats):
+    calls = dict()
+    for callStats in monitorStats:
+        for call, stats in callStats.items():
+            merged = calls.setdefault(call, {'count': 0, 'p50': [], 'p95': [], 'p99': [], 'max': 0.0, 'overBudget': 0})
+            merged['count'] += stats['count']
+            merged['overBudget'] += stats['overBudget']
+            merged['max'] = max(merged['max'], stats['max'])
+            for p in ('p50', 'p95', 'p99'):
+                merged[p].append(stats[p])
+    for merged in calls.values():
+        for p in ('p50', 'p95', 'p99'):
+            merged[p] = max(merged[p]) if merged[p] else 0.0 # worst instance.
+    return calls
+
+#------------------------------------------------------------
+#	getFrameRates()
+#		Description: Returns {feature class: frames per second}
+#           averaged over its instances. An instance's frames are
+#           the ticks in which its most updated element reached
+#           the window, updates the surface skipped because
+#           nothing changed do not count.
+#------------------------------------------------------------
+def getFrameRates(features, window, seconds):
+    frames = dict()
+    for f in features:
+        frames.setdefault(LatencyMonitor.featureName(f).split('@')[0], []).append(
+            max((window.elements[k].frames for k in f.safeKeys.values() if k in window.elements), default=0))
+    return {name: sum(counts) / len(counts) / seconds if seconds else 0.0 for name, counts in frames.items()}
+
+#------------------------------------------------------------
+#	getResources()
+#		Description: Returns the threads and open file
+#           descriptors of this process.
+#------------------------------------------------------------
+def getResources():
+    threads = {t.ident: t.name for t in threading.enumerate()}
+    fds = dict()
+    try:
+        for fd in os.listdir('/proc/self/fd'):
+            try:
+                fds[int(fd)] = os.readlink(os.path.join('/proc/self/fd', fd))
+            except OSError:
+                pass # closed while listing (e.g. the listing's own descriptor).
+    except OSError:
+        pass # no /proc, only threads are checked.
+    return {'threads': threads, 'fds': fds, 'keys': FeatureBlock.FeatureBlock.getKeyStats()['live']}
+
+'''
+----------------------------------------------------------------------------------------------------------
+    checkLeaks(class, int, int, **kwargs)
+        Description:
+            Builds "count" instances of a feature, runs them through the whole lifecycle (attach,
+            show, a few ticks, hide, detach) "cycles" times and reports the threads, file
+            descriptors and safe keys still held afterwards. One cycle is run first and not
+            counted so shared services a feature starts on first use (the worker pool, the
+            weather service, history files) are not reported.
+        Returns:
+            A dictionary of results that can be written with json, "leaks" is False when clean.
+----------------------------------------------------------------------------------------------------------
+'''
+def checkLeaks(featureClass, cycles=5, count=1, ticks=20, **featureKwargs):
+    def cycle():
+        features = buildGrid(featureClass, 1, count, **featureKwargs)
+        driveFeatures(features, StubWindow(), ticks, 10.0)
+        for f in features:
+            f.setVisible(False)
+            f.detach()
+    cycle()
+    before = getResources()
+    for _ in range(cycles):
+        cycle()
+    deadline = time.monotonic() + 2 # let threads that were told to stop finish.
+    after = getResources()
+    while(set(after['threads']) - set(before['threads']) and time.monotonic() < deadline):
+        time.sleep(0.05)
+        after = getResources()
+    threads = [after['threads'][i] for i in set(after['threads']) - set(before['threads'])]
+    fds = [after['fds'][fd] for fd in set(after['fds']) - set(before['fds'])]
+    keys = after['keys'] - before['keys']
+    return {
+        'feature': '{}.{}'.format(featureClass.__module__, featureClass.__name__),
+        'cycles': cycles,
+        'instances': count,
+        'leakedThreads': sorted(threads),
+        'leakedFds': sorted(fds),
+        'leakedKeys': keys,
+        'leaks': bool(threads or fds or keys)
+    }
+
+'''
+----------------------------------------------------------------------------------------------------------
+    runBenchmark(class, int, int, int, float, bool, list, **kwargs)
+        Description:
+            Builds a rows x cols grid of the feature class and drives it on a stub window. The
+            timed pass measures throughput and per-call latency, a second pass under tracemalloc
+            measures allocations (tracemalloc slows everything down so it is not timed).
+            extraFeatures is a list of (class, count, kwargs) to run next to the grid, e.g. to see
+            how fast a Stopwatch can be driven with a few clocks on the same screen. Set "rate"
+            to the tick rate being tested: "ticksPerSecond" is how many ticks per second the CPU
+            could process (Tk drawing time is not included) and "frameRateHz" is how many
+            frames per simulated second each feature class actually drew.
+        Returns:
+            A dictionary of results that can be written with json.
+----------------------------------------------------------------------------------------------------------
+'''
+def runBenchmark(featureClass, rows=1, cols=1, ticks=600, rate=10.0, useSurface=True, extraFeatures=None, **featureKwargs):
+    monitor = LatencyMonitor.LatencyMonitor(dumpPath=None, sampleSize=max(ticks, 1) * 2)
+    features = buildFeatures(featureClass, rows, cols, extraFeatures, **featureKwargs)
+    window = StubWindow()
+    start = time.perf_counter()
+    surface = driveFeatures(features, window, ticks, rate, monitor=monitor, useSurface=useSurface)
+    elapsed = time.perf_counter() - start
+
+    allocFeatures = buildFeatures(featureClass, rows, cols, extraFeatures, **featureKwargs)
+    tracemalloc.start()
+    before = tracemalloc.take_snapshot()
+    driveFeatures(allocFeatures, StubWindow(), ticks, rate, useSurface=useSurface)
+    after = tracemalloc.take_snapshot()
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+    allocDiff = after.compare_to(before, 'filename')
+
+    monitorStats = monitor.getStats()
+    perClass = dict()
+    for name, callStats in monitorStats.items():
+        perClass.setdefault(name.split('@')[0], []).append(callStats)
+
+    simulatedSeconds = ticks / rate
+    return {
+        'feature': '{}.{}'.format(featureClass.__module__, featureClass.__name__),
+        'grid': [rows, cols],
+        'extraFeatures': ['{}.{} x{}'.format(c.__module__, c.__name__, n) for c, n, _ in (extraFeatures or [])],
+        'instances': len(features),
+        'ticks': ticks,
+        'rateHz': rate,
+        'useSurface': useSurface,
+        'elapsedSeconds': elapsed,
+        'ticksPerSecond': ticks / elapsed if elapsed else 0.0,
+        'frameRateHz': getFrameRates(features, window, simulatedSeconds),
+        'realtimeFactor': simulatedSeconds / elapsed if elapsed else 0.0,
+        'calls': mergeStats(monitorStats.values()),
+        'perClass': {name: mergeStats(stats) for name, stats in perClass.items()},
+        'elementUpdates': window.getUpdateCount(),
+        'updatesSkipped': surface.skipped if useSurface else 0,
+        'allocatedBlocks': sum(d.count_diff for d in allocDiff if d.count_diff > 0),
+        'allocatedBytes': sum(d.size_diff for d in allocDiff if d.size_diff > 0),
+        'peakTracedBytes': peak,
+        'machine': platform.node(),
+        'python': platform.python_version()
+    }
+
+#------------------------------------------------------------
+#	compareResults()
+#		Description: Returns a list of printable lines
+#           comparing the numeric results of two runs.
+#------------------------------------------------------------
+def compareResults(old: dict, new: dict):
+    lines = []
+    if(old.get('machine') != new.get('machine')):
+        lines.append('WARNING: results come from different machines ({} vs {}).'.format(old.get('machine'), new.get('machine')))
+    def walk(prefix, a, b):
+        for k, v in b.items():
+            if(isinstance(v, dict) and isinstance(a.get(k), dict)):
+                walk(prefix + k + '.', a[k], v)
+            elif(isinstance(v, (int, float)) and not(isinstance(v, bool)) and isinstance(a.get(k), (int, float))):
+                change = ((v - a[k]) / a[k] * 100) if a[k] else 0.0
+                lines.append('{:<32} {:>14.4f} -> {:>14.4f} ({:+.1f}%)'.format(prefix + k, a[k], v, change))
+    walk('', old, new)
+    return lines
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description='Headless feature block benchmark.')
+    parser.add_argument('feature', help='Feature class to benchmark, e.g. VanillaFeatures.Clock')
+    parser.add_argument('--grid', default='1x1', help='Rows x columns of instances, e.g. 4x4')
+    parser.add_argument('--ticks', type=int, default=600, help='Number of simulated ticks.')
+    parser.add_argument('--rate', type=float, default=10.0, help='Simulated ticks per second.')
+    parser.add_argument('--no-surface', action='store_true', help='Draw directly on the window instead of through a RenderSurface.')
+    parser.add_argument('--kwargs', default='{}', help='JSON dictionary of keyword arguments for the feature.')
+    parser.add_argument('--with', dest='extra', action='append', default=[], metavar='CLASS[:COUNT]',
+        help='Extra feature to run next to the grid, e.g. --with VanillaFeatures.Clock:4 (repeatable).')
+    parser.add_argument('--out', help='Write the results to this JSON file.')
+    parser.add_argument('--compare', help='Compare the results to a previous JSON results file.')
+    parser.add_argument('--leak-check', type=int, metavar='CYCLES',
+        help='Instead of benchmarking, check that the feature releases its threads, files and keys.')
+    args = parser.parse_args()
+
+    if(args.leak_check):
+        results = checkLeaks(loadFeatureClass(args.feature), cycles=args.leak_check, **json.loads(args.kwargs))
+        print(json.dumps(results, indent=4))
+        raise SystemExit(1 if results['leaks'] else 0)
+
+    rows, cols = [int(n) for n in args.grid.lower().split('x')]
+    extraFeatures = []
+    for extra in args.extra:
+        name, _, count = extra.partition(':')
+        extraFeatures.append((loadFeatureClass(name), int(count) if count else 1, dict()))
+    results = runBenchmark(loadFeatureClass(args.feature), rows, cols, ticks=args.ticks, rate=args.rate,
+        useSurface=not(args.no_surface), extraFeatures=extraFeatures, **json.loads(args.kwargs))
+    print(json.dumps(results, indent=4))
+    if(args.compare):
+        with open(args.compare, 'r') as f:
+            print('\n'.join(compareResults(json.load(f), results)))
+    if(args.out):
+        with open(args.out, 'w') as f:
+            json.dump(results, f, indent=4)
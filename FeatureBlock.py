@@ -9,6 +9,72 @@
 import PySimpleGUI as sg
 import abc
 import time
+import WorkerPool
+import LatencyMonitor
+
+
+'''
+----------------------------------------------------------------------------------------------------------
+    class KeyAllocator()
+    Description:
+        Hands out unique element keys. The first feature asking for a key gets it as is, the next
+        ones get "key<#>:1", "key<#>:2", etc. Every base key has its own counter and a list of the
+        numbers released by removed features, so allocating and releasing a key is O(1) no matter
+        how many features were ever created, and rebuilding a layout reuses the same keys.
+    Attributes:
+        keys: Set of the keys in use (FeatureBlock.globalKeySet).
+----------------------------------------------------------------------------------------------------------
+'''
+class KeyAllocator():
+    separator = '<#>:'
+
+    def __init__(self, keySet=None):
+        self.keys = keySet if keySet is not None else set()
+        self.allocations = 0
+        self.releases = 0
+        self._next = dict() # base key -> next number never handed out.
+        self._free = dict() # base key -> numbers released and not reused yet.
+
+    def allocate(self, key: str):
+        self.allocations += 1
+        base = key.split(self.separator)[0]
+        if(key not in self.keys):
+            self._next.setdefault(base, 1)
+            self.keys.add(key)
+            return key
+        free = self._free.get(base)
+        while(free):
+            candidate = '{}{}{}'.format(base, self.separator, free.pop())
+            if(candidate not in self.keys): # could have been taken by asking for it by name.
+                self.keys.add(candidate)
+                return candidate
+        count = self._next.get(base, 1)
+        candidate = '{}{}{}'.format(base, self.separator, count)
+        while(candidate in self.keys):
+            count += 1
+            candidate = '{}{}{}'.format(base, self.separator, count)
+        self._next[base] = count + 1
+        self.keys.add(candidate)
+        return candidate
+
+    def release(self, key: str):
+        if(key not in self.keys):
+            return
+        self.keys.discard(key)
+        self.releases += 1
+        base, _, count = key.rpartition(self.separator)
+        if(base and count.isdigit()):
+            self._free.setdefault(base, []).append(int(count))
+
+    def getStats(self):
+        '''Returns the number of live keys, of numbered keys ever handed out and of those free for reuse.'''
+        return {
+            'live': len(self.keys),
+            'allocated': sum(self._next.values()), # every base key plus its numbered keys.
+            'free': sum(len(f) for f in self._free.values()),
+            'allocations': self.allocations,
+            'releases': self.releases
+        }
 
 
 '''
@@ -20,19 +86,30 @@ import time
     Attributes:
         globalKeySet: This is a set that contains unique keys that are being used by various
             other feature blocks.
+        keyAllocator: KeyAllocator handing out the keys of globalKeySet, see getKeyStats().
+        featureVersion, defaultSize: Plugin metadata, keep them plain literals so the
+            FeatureRegistry can read them without importing your module.
 ----------------------------------------------------------------------------------------------------------
 '''
 class FeatureBlock(metaclass=abc.ABCMeta):
     globalKeySet = set()
+    keyAllocator = KeyAllocator(globalKeySet)
+    featureVersion = '1.0'  # shown by the layout manager, read from the source without importing it.
+    defaultSize = (1, 1)    # (rows, columns) of the layout grid the feature takes by default.
 
     def __init__(self, posRow, posCol):
         ''' 
         If you need to override to set your own features attributes, be sure to call "super().__init__()" as
         these attributes may be necessary.
         '''
-        self.safeKeys = self.__generateSafeKeys(self.myFeaturesKeys())
+        featuresKeys = dict(self.myFeaturesKeys())
+        featuresKeys['__jobs__'] = '-job.{}-'.format(type(self).__name__) # event key for background job results.
+        self.safeKeys = self.__generateSafeKeys(featuresKeys)
         self.posRow = posRow
         self.posCol = posCol
+        self.attached = False   # elements were created in the main window, see attach().
+        self.visible = False    # on screen, update() is only called while visible.
+        self._jobKeys = set()   # jobs submitted and not cancelled, cancelled by detach().
     
     @classmethod
     def __subclasshook__(cls, subclass):
@@ -46,16 +123,23 @@ class FeatureBlock(metaclass=abc.ABCMeta):
         '''Generates Safe keys'''
         safeKeys = dict()
         for k in featuresKeys:
-            v = str(featuresKeys[k])
-            count = 0
-            while(v in FeatureBlock.globalKeySet):
-                count += 1
-                v = v.split('<#>:')
-                v = '{}<#>:{}'.format(v[0], count)
-            safeKeys[k] = v
-            FeatureBlock.globalKeySet.add(v)
+            safeKeys[k] = FeatureBlock.keyAllocator.allocate(str(featuresKeys[k]))
+        self._keysReleased = False
         return safeKeys
 
+    def releaseKeys(self):
+        '''Returns this feature's safe keys so new features can use them, call when the feature is removed.'''
+        if(self._keysReleased): # they may already belong to another feature.
+            return
+        for v in self.safeKeys.values():
+            FeatureBlock.keyAllocator.release(v)
+        self._keysReleased = True
+
+    @staticmethod
+    def getKeyStats():
+        '''Live versus allocated safe keys, a growing "live" count means features are not released.'''
+        return FeatureBlock.keyAllocator.getStats()
+
     @abc.abstractmethod
     def getFeatureDescription(self) -> str:
         '''
@@ -100,6 +184,120 @@ class FeatureBlock(metaclass=abc.ABCMeta):
         '''
         raise NotImplementedError
 
+    '''
+    ----------------------------------------------------------------------------------------------------------
+        events() only receives the events of your own elements (your safeKeys) and your job results. Events
+        that belong to no element are only delivered if you list them in "globalEvents", e.g.:
+            globalEvents = (EventRouter.TIMEOUT_EVENT,)     # every wake up of the main window
+        See EventRouter for the available global events. Prefer update() and nextDeadline() over timeouts.
+    ----------------------------------------------------------------------------------------------------------
+    '''
+    globalEvents = ()
+
+    '''
+    ----------------------------------------------------------------------------------------------------------
+        The main window only wakes up when a feature needs to be updated. By default a feature is updated
+        on every "updateInterval" boundary of the wall clock (every second for 1, every minute for 60, etc.).
+        Override "updateInterval" for a different cadence or override nextDeadline() for anything more
+        specific. Returning None from nextDeadline() means the feature only changes on events.
+    ----------------------------------------------------------------------------------------------------------
+    '''
+    updateInterval = 1
+
+    def nextDeadline(self, now: float):
+        '''
+        Returns the time (in seconds since the epoch) at which update() should next be called.
+        '''
+        interval = self.updateInterval
+        return (now // interval + 1) * interval
+
+    def requestUpdate(self):
+        '''
+        Call from events() when the feature needs update() right away, e.g. a stopwatch that was
+        just started after returning None from nextDeadline() while it was stopped.
+        '''
+        self.updateRequested = True
+
+    '''
+    ----------------------------------------------------------------------------------------------------------
+        Blocking work (web requests, pings, etc.) must never run inside update() or events(). Hand it to
+        submitJob() instead, it runs in the shared WorkerPool and the result comes back as an event:
+            def update(self, window):
+                self.submitJob('outdoorTemp', WeatherUtils.getOutdoorTemp, timeout=10)
+            def events(self, event, values, window):
+                if(self.isJobResult(event)):
+                    result = values[event]  # WorkerPool.JobResult
+                    if(result.ok):
+                        window[self.safeKeys['temp']].update(result.value)
+        Jobs with the same jobKey are shared, if another feature already started 'outdoorTemp' both
+        features receive the same result.
+    ----------------------------------------------------------------------------------------------------------
+    '''
+    def submitJob(self, jobKey, fn, *args, timeout=None, **kwargs):
+        self._jobKeys.add(jobKey)
+        return WorkerPool.getPool().submit(jobKey, self.safeKeys['__jobs__'], fn, *args, timeout=timeout, **kwargs)
+
+    def cancelJob(self, jobKey):
+        self._jobKeys.discard(jobKey)
+        WorkerPool.getPool().cancel(jobKey, self.safeKeys['__jobs__'])
+
+    '''
+    ----------------------------------------------------------------------------------------------------------
+        Lifecycle. The main window moves every feature through these states and calls the matching
+        hook, override the hooks you need:
+            onAttach()  The feature was added to the main window. Start listeners, open files, etc.
+                        here rather than in __init__() (the layout manager may build features it
+                        never shows).
+            onShow()    The feature is on screen, update() will be called again.
+            onHide()    The feature is off screen (e.g. the layout manager is open). update() is not
+                        called and events are not delivered (except job results) until onShow().
+            onDetach()  The feature was removed from the layout or its window closed, release
+                        everything it holds. Its jobs are cancelled and its keys released after.
+        attach(), setVisible() and detach() drive the states, only the window layer calls them.
+    ----------------------------------------------------------------------------------------------------------
+    '''
+    def onAttach(self):
+        pass
+
+    def onShow(self):
+        pass
+
+    def onHide(self):
+        pass
+
+    def onDetach(self):
+        pass
+
+    def attach(self):
+        if(not(self.attached)):
+            self.attached = True
+            self.onAttach()
+
+    def setVisible(self, visible: bool):
+        if(not(self.attached) or visible == self.visible):
+            return
+        self.visible = visible
+        if(visible):
+            self.onShow()
+        else:
+            self.onHide()
+
+    def detach(self):
+        '''Also releases the jobs and keys of a feature that was never attached.'''
+        wasAttached = self.attached
+        self.setVisible(False)
+        self.attached = False
+        try:
+            if(wasAttached):
+                self.onDetach()
+        finally:
+            for jobKey in list(self._jobKeys):
+                self.cancelJob(jobKey)
+            self.releaseKeys()
+
+    def isJobResult(self, event):
+        return event == self.safeKeys['__jobs__']
+
     def __eq__(self, other):
         return self.posRow == other.posRow and self.posCol == other.posCol
 
@@ -167,7 +365,7 @@ def TestMyFeature(myFeatureClass, numOfRows=1, numOfInst=1):
         layout.append(cols)
     # print(str(layout))
     window = sg.Window(title='Your Feature Test', layout=layout, size=(800, 480), finalize=True, resizable=True)
-    timed = False # used to time how long a timout event takes to handle feature block.
+    monitor = LatencyMonitor.LatencyMonitor(dumpPath=None) # time every call, summary is printed when the window closes.
     while True:
         event, values = window.read(50)
         if(event != sg.TIMEOUT_EVENT and event != sg.WINDOW_CLOSED):
@@ -176,21 +374,17 @@ def TestMyFeature(myFeatureClass, numOfRows=1, numOfInst=1):
             window.close()
             break
         else:
-            if(not(timed) or event != sg.TIMEOUT_EVENT):
-                start = time.time()
             for f in featureList:
-                if(not(timed) or event != sg.TIMEOUT_EVENT):
-                    singleStart = time.time()
-                
+                name = LatencyMonitor.featureName(f)
+                start = time.perf_counter()
                 f.events(event, values, window)
+                monitor.record(name, 'events', time.perf_counter() - start)
+                start = time.perf_counter()
                 f.update(window)
+                monitor.record(name, 'update', time.perf_counter() - start)
                 window.finalize()
-                
-                if(not(timed) or event != sg.TIMEOUT_EVENT):
-                    singleTimeDelta = time.time() - singleStart
-                    print("A single element took {:.5f}ms to handle.".format(singleTimeDelta*1000))
-            if(not(timed) or event != sg.TIMEOUT_EVENT):
-                timedelta = time.time() - start
-                print("All elements to a total time of {:.5f}ms to handle".format(timedelta*1000))
-                timed = True
+    for name, calls in monitor.getStats().items():
+        for call, stats in calls.items():
+            print('{} {}(): p50 {:.3f}ms | p95 {:.3f}ms | p99 {:.3f}ms | max {:.3f}ms | over budget {}/{}'.format(
+                name, call, stats['p50'], stats['p95'], stats['p99'], stats['max'], stats['overBudget'], stats['count']))
     return all(testResults)
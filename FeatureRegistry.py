@@ -0,0 +1,301 @@
+#!/usr/bin/python3
+# -*- coding: utf-8 -*-
+
+#=========================================================================
+#	FeatureRegistry.py
+#	Author: Raul Rojas
+#	Contact: rrojas994@gmail.com
+#	Description:
+#		Discovers feature blocks from the built in modules, plugin
+#       directories and the "deskclock.features" entry point group
+#       without importing them. Feature modules are read with the ast
+#       module and what was found is cached in a manifest file keyed by
+#       each file's mtime, size and hash, so only new or changed files are
+#       ever read again. A feature's module is imported when it is used.
+#=========================================================================
+
+import ast
+import hashlib
+import importlib
+import importlib.util
+import json
+import os
+import sys
+
+_sharedRegistry = None
+_manifestVersion = 1
+_defaultPluginDir = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'plugins')
+_defaultManifestPath = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'FeatureManifest.json')
+
+#------------------------------------------------------------
+#	class FeatureInfo()
+#		Description: What the registry knows about a feature
+#           block without importing it.
+#------------------------------------------------------------
+class FeatureInfo():
+    def __init__(self, classId, name, description='', defaultSize=(1, 1), version='1.0', path=None, moduleName=None):
+        self.classId = classId          # "Module.Class", used by layout descriptors.
+        self.name = name                # class name, shown in the layout manager.
+        self.description = description
+        self.defaultSize = tuple(defaultSize)
+        self.version = version
+        self.path = path                # source file the feature was found in.
+        self.moduleName = moduleName    # module name the file is imported as.
+
+    def toDict(self):
+        d = dict(self.__dict__)
+        d['defaultSize'] = list(self.defaultSize)
+        return d
+
+    @staticmethod
+    def fromDict(d):
+        return FeatureInfo(**d)
+
+    def __repr__(self):
+        return str(self.__dict__)
+
+
+'''
+----------------------------------------------------------------------------------------------------------
+    class FeatureRegistry()
+    Description:
+        Lists every available feature block. Sources are searched in this order, the first
+        feature found for a classId wins:
+            1. builtinModules (VanillaFeatures).
+            2. Every *.py file in pluginDirs, imported under the file's name.
+            3. Entry points in the "deskclock.features" group ("package.module:Class").
+        Plugin classes are recognised by subclassing FeatureBlock.FeatureBlock (or another
+        feature of the same file). The description is the string returned by
+        getFeatureDescription() (or the class docstring when it is not a plain string) and
+        "featureVersion"/"defaultSize" are read from the class attributes.
+    Attributes:
+        manifestPath: File the discovery results are cached in, None disables the cache. Defaults
+            to FeatureManifest.json next to this module, whatever the working directory is.
+----------------------------------------------------------------------------------------------------------
+'''
+class FeatureRegistry():
+    def __init__(self, pluginDirs=None, builtinModules=('VanillaFeatures',), entryPointGroup='deskclock.features',
+            manifestPath=_defaultManifestPath):
+        self.pluginDirs = list(pluginDirs) if pluginDirs else [_defaultPluginDir]
+        self.builtinModules = list(builtinModules)
+        self.entryPointGroup = entryPointGroup
+        self.manifestPath = manifestPath
+        self.features = dict() # classId -> FeatureInfo
+        self._manifest = self._loadManifest()
+        self._manifestChanged = False
+        self._discovered = False
+
+    def addPluginDir(self, path):
+        if(path not in self.pluginDirs):
+            self.pluginDirs.append(path)
+            self._discovered = False
+
+    def discover(self):
+        '''Finds every feature block and returns a list of FeatureInfo, sorted by source order.'''
+        self.features = dict()
+        seenFiles = set()
+        for moduleName in self.builtinModules:
+            spec = importlib.util.find_spec(moduleName)
+            if(spec and spec.origin):
+                self._addFile(spec.origin, moduleName, seenFiles)
+        for pluginDir in self.pluginDirs:
+            if(not(os.path.isdir(pluginDir))):
+                continue
+            for fileName in sorted(os.listdir(pluginDir)):
+                if(fileName.endswith('.py') and not(fileName.startswith('_'))):
+                    self._addFile(os.path.join(pluginDir, fileName), fileName[:-3], seenFiles)
+        for moduleName, className in self._entryPoints():
+            try:
+                spec = importlib.util.find_spec(moduleName)
+            except (ImportError, ValueError):
+                continue
+            if(spec and spec.origin):
+                self._addFile(spec.origin, moduleName, seenFiles, onlyClass=className)
+        for path in list(self._manifest['files'].keys()): # forget files that no longer exist.
+            if(path not in seenFiles):
+                del self._manifest['files'][path]
+                self._manifestChanged = True
+        if(self._manifestChanged):
+            self.saveManifest()
+        self._discovered = True
+        return list(self.features.values())
+
+    def getFeatures(self):
+        if(not(self._discovered)):
+            self.discover()
+        return list(self.features.values())
+
+    def get(self, classId):
+        if(not(self._discovered)):
+            self.discover()
+        return self.features.get(classId)
+
+    def loadClass(self, classId):
+        '''
+        Imports the module of a feature and returns its class. Works before discover() was run,
+        plugin file locations are taken from the manifest so booting does not scan any directory.
+        '''
+        moduleName, className = classId.rsplit('.', 1)
+        module = sys.modules.get(moduleName)
+        if(module is None):
+            info = self.features.get(classId) or self._findInManifest(classId)
+            if(info and info.path and not(self._isImportable(moduleName, info.path))):
+                spec = importlib.util.spec_from_file_location(moduleName, info.path)
+                module = importlib.util.module_from_spec(spec)
+                sys.modules[moduleName] = module
+                try:
+                    spec.loader.exec_module(module)
+                except BaseException:
+                    del sys.modules[moduleName]
+                    raise
+            else:
+                module = importlib.import_module(moduleName)
+        return getattr(module, className)
+
+    def saveManifest(self):
+        if(self.manifestPath):
+            tmpPath = self.manifestPath + '.tmp'
+            try:
+                with open(tmpPath, 'w') as f:
+                    json.dump(self._manifest, f)
+                os.replace(tmpPath, self.manifestPath)
+            except OSError: # read only install, discovery still works, it is only not cached.
+                try:
+                    os.remove(tmpPath)
+                except OSError:
+                    pass
+        self._manifestChanged = False # not retried until something changes again.
+
+    def _isImportable(self, moduleName, path):
+        spec = importlib.util.find_spec(moduleName) if moduleName not in sys.modules else None
+        return spec is not None and spec.origin is not None and os.path.abspath(spec.origin) == os.path.abspath(path)
+
+    def _findInManifest(self, classId):
+        for entry in self._manifest['files'].values():
+            for d in entry['features']:
+                if(d['classId'] == classId):
+                    return FeatureInfo.fromDict(d)
+        return None
+
+    def _entryPoints(self):
+        try:
+            from importlib.metadata import entry_points
+        except ImportError:
+            return []
+        try:
+            eps = entry_points(group=self.entryPointGroup)
+        except TypeError: # python < 3.10
+            eps = entry_points().get(self.entryPointGroup, [])
+        points = []
+        for ep in eps:
+            moduleName, _, className = ep.value.partition(':')
+            if(className):
+                points.append((moduleName.strip(), className.strip()))
+        return points
+
+    def _addFile(self, path, moduleName, seenFiles, onlyClass=None):
+        path = os.path.abspath(path)
+        seenFiles.add(path)
+        for d in self._scanFile(path, moduleName):
+            info = FeatureInfo.fromDict(d)
+            if(onlyClass and info.name != onlyClass):
+                continue
+            self.features.setdefault(info.classId, info)
+
+    def _scanFile(self, path, moduleName):
+        '''Returns the cached feature dictionaries for a file, re-reading it only when it changed.'''
+        try:
+            st = os.stat(path)
+        except OSError:
+            return []
+        entry = self._manifest['files'].get(path)
+        if(entry and entry['mtime'] == st.st_mtime and entry['size'] == st.st_size and entry['module'] == moduleName):
+            return entry['features']
+        with open(path, 'rb') as f:
+            source = f.read()
+        digest = hashlib.sha1(source).hexdigest()
+        if(entry and entry['sha1'] == digest and entry['module'] == moduleName): # touched but not changed.
+            entry['mtime'] = st.st_mtime
+            entry['size'] = st.st_size
+            self._manifestChanged = True
+            return entry['features']
+        features = [info.toDict() for info in parseFeatures(source, path, moduleName)]
+        self._manifest['files'][path] = {'mtime': st.st_mtime, 'size': st.st_size, 'sha1': digest,
+            'module': moduleName, 'features': features}
+        self._manifestChanged = True
+        return features
+
+    def _loadManifest(self):
+        if(self.manifestPath):
+            try:
+                with open(self.manifestPath, 'r') as f:
+                    manifest = json.load(f)
+                if(manifest.get('version') == _manifestVersion):
+                    return manifest
+            except (IOError, ValueError):
+                pass
+        return {'version': _manifestVersion, 'files': dict()}
+
+
+#------------------------------------------------------------
+#	parseFeatures()
+#		Description: Finds the feature block classes in a
+#           python source file without importing it.
+#------------------------------------------------------------
+def parseFeatures(source, path=None, moduleName=None):
+    try:
+        tree = ast.parse(source)
+    except SyntaxError:
+        return []
+    featureClasses = {'FeatureBlock': ({}, '')} # class name -> (attributes, description), subclasses inherit them.
+    found = []
+    for node in tree.body:
+        if(not(isinstance(node, ast.ClassDef))):
+            continue
+        baseNames = [b.attr if isinstance(b, ast.Attribute) else getattr(b, 'id', None) for b in node.bases]
+        parents = [featureClasses[b] for b in baseNames if b in featureClasses]
+        if(not(parents)):
+            continue
+        attrs = dict(parents[0][0])
+        attrs.update(_classAttributes(node))
+        description = _description(node) or parents[0][1]
+        featureClasses[node.name] = (attrs, description)
+        found.append(FeatureInfo(
+            classId='{}.{}'.format(moduleName, node.name),
+            name=node.name,
+            description=description,
+            defaultSize=attrs.get('defaultSize', (1, 1)),
+            version=str(attrs.get('featureVersion', '1.0')),
+            path=path,
+            moduleName=moduleName
+        ))
+    return found
+
+def _classAttributes(node):
+    attrs = dict()
+    for item in node.body:
+        if(isinstance(item, ast.Assign) and len(item.targets) == 1 and isinstance(item.targets[0], ast.Name)):
+            try:
+                attrs[item.targets[0].id] = ast.literal_eval(item.value)
+            except ValueError:
+                pass
+    return attrs
+
+def _description(node):
+    for item in node.body:
+        if(isinstance(item, ast.FunctionDef) and item.name == 'getFeatureDescription'):
+            for stmt in item.body:
+                if(isinstance(stmt, ast.Return) and isinstance(stmt.value, ast.Constant) and isinstance(stmt.value.value, str)):
+                    return stmt.value.value
+    return ast.get_docstring(node) or ''
+
+#------------------------------------------------------------
+#	getRegistry()
+#		Description: Returns the registry shared by the app,
+#           creating it on first use.
+#------------------------------------------------------------
+def getRegistry():
+    global _sharedRegistry
+    if(_sharedRegistry is None):
+        _sharedRegistry = FeatureRegistry()
+    return _sharedRegistry
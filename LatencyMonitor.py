@@ -0,0 +1,135 @@
+#!/usr/bin/python3
+# -*- coding: utf-8 -*-
+
+#=========================================================================
+#	LatencyMonitor.py
+#	Author: Raul Rojas
+#	Contact: rrojas994@gmail.com
+#	Description:
+#		Records how long every feature block takes to handle its update()
+#       and events() calls. Keeps a rolling window of samples per call so
+#       percentiles can be reported and periodically dumps them to a JSON
+#       file to find out which feature is eating the CPU.
+#=========================================================================
+
+import json
+import time
+from collections import deque
+
+_sharedMonitor = None
+
+#------------------------------------------------------------
+#	class LatencyHistogram()
+#		Description: Rolling window of latency samples (ms)
+#           for a single feature call.
+#------------------------------------------------------------
+class LatencyHistogram():
+    def __init__(self, sampleSize=500, budget=25.0):
+        self.samples = deque(maxlen=sampleSize)
+        self.budget = budget
+        self.count = 0
+        self.overBudget = 0
+        self.max = 0.0
+
+    def add(self, ms):
+        self.samples.append(ms)
+        self.count += 1
+        if(ms > self.budget):
+            self.overBudget += 1
+        if(ms > self.max):
+            self.max = ms
+
+    def percentile(self, p, ordered=None):
+        '''Nearest rank percentile of the samples in the rolling window.'''
+        ordered = ordered if ordered is not None else sorted(self.samples)
+        if(not(ordered)):
+            return 0.0
+        index = min(len(ordered) - 1, max(0, int(round(p / 100 * len(ordered))) - 1))
+        return ordered[index]
+
+    def getStats(self):
+        ordered = sorted(self.samples)
+        return {
+            'count': self.count,
+            'p50': self.percentile(50, ordered),
+            'p95': self.percentile(95, ordered),
+            'p99': self.percentile(99, ordered),
+            'max': self.max,
+            'overBudget': self.overBudget,
+            'overBudgetRatio': self.overBudget / self.count if self.count else 0.0
+        }
+
+
+'''
+----------------------------------------------------------------------------------------------------------
+    class LatencyMonitor()
+    Description:
+        Keeps a LatencyHistogram for every (feature, call) pair. The window wraps each call with
+        time.perf_counter() and hands the duration to record(). Use getStats() to read the
+        numbers or look at the JSON file, it is rewritten at most once every dumpInterval seconds.
+    Attributes:
+        budget: A call taking longer than this (ms) counts as blowing the tick budget.
+        sampleSize: Number of most recent samples percentiles are computed from.
+        dumpPath: JSON file the stats are written to, None disables dumping.
+        dumpInterval: Minimum number of seconds between dumps.
+----------------------------------------------------------------------------------------------------------
+'''
+class LatencyMonitor():
+    def __init__(self, budget=25.0, sampleSize=500, dumpPath='FeatureLatency.json', dumpInterval=300):
+        self.budget = budget
+        self.sampleSize = sampleSize
+        self.dumpPath = dumpPath
+        self.dumpInterval = dumpInterval
+        self.histograms = dict()
+        self._lastDump = time.monotonic()
+
+    def record(self, name, call, seconds):
+        '''Adds a sample, name is the feature name and call is "update" or "events".'''
+        key = (name, call)
+        histogram = self.histograms.get(key)
+        if(histogram is None):
+            histogram = LatencyHistogram(self.sampleSize, self.budget)
+            self.histograms[key] = histogram
+        histogram.add(seconds * 1000)
+
+    def getStats(self, name=None):
+        '''Returns {featureName: {call: stats}} for every feature or only the one given.'''
+        stats = dict()
+        for (feature, call), histogram in self.histograms.items():
+            if(name is None or name == feature):
+                stats.setdefault(feature, dict())[call] = histogram.getStats()
+        return stats
+
+    def reset(self):
+        self.histograms.clear()
+
+    def dump(self, fPath=None):
+        fPath = fPath if fPath else self.dumpPath
+        with open(fPath, 'w') as f:
+            json.dump({'budgetMs': self.budget, 'time': time.time(), 'features': self.getStats()}, f, indent=4)
+        self._lastDump = time.monotonic()
+
+    def maybeDump(self):
+        '''Dumps the stats if dumpInterval seconds have passed since the last dump.'''
+        if(self.dumpPath and time.monotonic() - self._lastDump >= self.dumpInterval):
+            self.dump()
+
+
+#------------------------------------------------------------
+#	featureName()
+#		Description: Name used to report a feature block,
+#           class name and grid position.
+#------------------------------------------------------------
+def featureName(feature):
+    return '{}@{},{}'.format(type(feature).__name__, feature.posRow, feature.posCol)
+
+#------------------------------------------------------------
+#	getMonitor()
+#		Description: Returns the monitor shared by all windows,
+#           creating it on first use.
+#------------------------------------------------------------
+def getMonitor():
+    global _sharedMonitor
+    if(_sharedMonitor is None):
+        _sharedMonitor = LatencyMonitor()
+    return _sharedMonitor
@@ -0,0 +1,149 @@
+#!/usr/bin/python3
+# -*- coding: utf-8 -*-
+
+#=========================================================================
+#	LayoutDescriptor.py
+#	Author: Raul Rojas
+#	Contact: rrojas994@gmail.com
+#	Description:
+#		Provides a lightweight description of a feature block in a layout
+#       (which class, where it goes and how it is configured) so layouts
+#       can be compared, applied and saved without creating feature
+#       instances. Layouts are saved as named slots in the settings store.
+#=========================================================================
+
+import FeatureRegistry
+
+LAYOUTS_KEY = 'layouts'             # settings key: {slot name: [descriptor dictionaries]}
+ACTIVE_LAYOUT_KEY = 'activeLayout'  # settings key: name of the slot shown at boot.
+
+'''
+----------------------------------------------------------------------------------------------------------
+    class FeatureDescriptor()
+    Description:
+        Describes one feature block of a layout. Two descriptors describe the same feature when
+        their class and options match, the position is not part of that comparison so a feature
+        that only moved can be kept.
+    Attributes:
+        classId: "Module.Class" of the feature block, e.g. "VanillaFeatures.Clock".
+        posRow: Row of the feature in the main window.
+        posCol: Column of the feature in the main window.
+        options: Keyword arguments given to the feature's constructor.
+----------------------------------------------------------------------------------------------------------
+'''
+class FeatureDescriptor():
+    def __init__(self, classId, posRow=0, posCol=0, options=None):
+        self.classId = classId
+        self.posRow = posRow
+        self.posCol = posCol
+        self.options = dict(options) if options else dict()
+
+    def sameFeature(self, other):
+        '''Returns True if both descriptors create the same feature (position is ignored).'''
+        return other is not None and self.classId == other.classId and self.options == other.options
+
+    def samePosition(self, other):
+        return other is not None and self.posRow == other.posRow and self.posCol == other.posCol
+
+    def getClass(self):
+        return FeatureRegistry.getRegistry().loadClass(self.classId)
+
+    def toDict(self):
+        '''Compact form saved in the settings: {"id": classId, "pos": [row, col], "opts": options}.'''
+        d = {'id': self.classId, 'pos': [self.posRow, self.posCol]}
+        if(self.options):
+            d['opts'] = dict(self.options)
+        return d
+
+    @staticmethod
+    def fromDict(d):
+        '''Returns the descriptor of a toDict() dictionary, raises ValueError if it is malformed.'''
+        try:
+            row, col = d.get('pos', (0, 0))
+            return FeatureDescriptor(str(d['id']), int(row), int(col), d.get('opts'))
+        except (AttributeError, KeyError, TypeError, ValueError) as e:
+            raise ValueError('Malformed layout entry: {}'.format(d)) from e
+
+    def build(self):
+        '''Creates the feature block instance and remembers this descriptor on it.'''
+        feature = self.getClass()(self.posRow, self.posCol, **self.options)
+        feature.descriptor = self
+        return feature
+
+    def __repr__(self):
+        return 'FeatureDescriptor({}, {}, {}, {})'.format(self.classId, self.posRow, self.posCol, self.options)
+
+
+#------------------------------------------------------------
+#	describeFeature()
+#		Description: Returns the descriptor of a feature
+#           block instance. Instances that were not built
+#           from a descriptor are described by their class
+#           and position only.
+#------------------------------------------------------------
+def describeFeature(feature):
+    descriptor = getattr(feature, 'descriptor', None)
+    if(descriptor is None):
+        cls = type(feature)
+        descriptor = FeatureDescriptor('{}.{}'.format(cls.__module__, cls.__name__), feature.posRow, feature.posCol)
+        feature.descriptor = descriptor
+    return descriptor
+
+#------------------------------------------------------------
+#	getLayoutNames()
+#		Description: Returns the names of the layout slots
+#           saved in a settings store.
+#------------------------------------------------------------
+def getLayoutNames(store):
+    return list(store.get(LAYOUTS_KEY, dict()).keys())
+
+#------------------------------------------------------------
+#	getActiveLayoutName()
+#		Description: Returns the name of the slot shown at boot
+#           or None if no layout was saved yet.
+#------------------------------------------------------------
+def getActiveLayoutName(store):
+    name = store.get(ACTIVE_LAYOUT_KEY)
+    return name if name in store.get(LAYOUTS_KEY, dict()) else None
+
+#------------------------------------------------------------
+#	loadLayout()
+#		Description: Returns the descriptors saved in a slot
+#           (the active slot if name is None) or None if there
+#           is no such slot. Malformed entries are skipped.
+#------------------------------------------------------------
+def loadLayout(store, name=None):
+    name = getActiveLayoutName(store) if name is None else name
+    entries = store.get(LAYOUTS_KEY, dict()).get(name)
+    if(entries is None):
+        return None
+    descriptors = []
+    for entry in entries:
+        try:
+            descriptors.append(FeatureDescriptor.fromDict(entry))
+        except ValueError:
+            continue
+    return descriptors
+
+#------------------------------------------------------------
+#	saveLayout()
+#		Description: Saves descriptors in a slot, replacing
+#           what it held, and makes it the active slot.
+#------------------------------------------------------------
+def saveLayout(store, name, descriptors, activate=True):
+    layouts = dict(store.get(LAYOUTS_KEY, dict())) # a new dictionary so the store sees the change.
+    layouts[name] = [d.toDict() for d in descriptors]
+    values = {LAYOUTS_KEY: layouts}
+    if(activate):
+        values[ACTIVE_LAYOUT_KEY] = name
+    store.update(values)
+
+#------------------------------------------------------------
+#	deleteLayout()
+#		Description: Removes a slot, the active slot falls
+#           back to the defaults at the next boot.
+#------------------------------------------------------------
+def deleteLayout(store, name):
+    layouts = dict(store.get(LAYOUTS_KEY, dict()))
+    if(layouts.pop(name, None) is not None):
+        store.set(LAYOUTS_KEY, layouts)
@@ -1,23 +1,35 @@
-import sys, inspect
 import PySimpleGUI as sg 
-import VanillaFeatures
+import FeatureRegistry
+import LayoutDescriptor
+import DeskClockSettings
 from DeskClockWindows import DCWindow
 
 class LayoutManager(DCWindow):
     def start(self, thirdPartyFeatures=None):
-        self.vanillaFeats = inspect.getmembers(VanillaFeatures, inspect.isclass)
+        '''thirdPartyFeatures: list of extra plugin directories to search for feature blocks.'''
+        registry = FeatureRegistry.getRegistry()
+        for pluginDir in (thirdPartyFeatures or []):
+            registry.addPluginDir(pluginDir)
+        self.vanillaFeats = [(info.name, info) for info in registry.getFeatures()] # listed from the manifest, nothing is imported.
         self.vanillaFeatsDict = {}
         for f in self.vanillaFeats:
-            self.vanillaFeatsDict[f[0]] = f[1]
+            self.vanillaFeatsDict.setdefault(f[0], f[1])
         self.availableFeatures = []
         self.nextAvailableIndex = 0
         self.activeFeatures = []
+        self.activeOptions = [] # options of each active feature, as loaded from its slot.
         self.boxDimensions = (300, 200)
         self.buttonSize = (35,2)
         self.numOfRows = 2
         self.numOfCol = 2
         self.maxNumberOfFeatures = self.numOfRows * self.numOfCol
         self.selectedFeature = None
+        self.store = DeskClockSettings.getStore()
+        self.slotNames = LayoutDescriptor.getLayoutNames(self.store)
+        for name in ['Layout 1', 'Layout 2', 'Layout 3']: # empty slots to pick from, a new name can be typed in.
+            if(name not in self.slotNames):
+                self.slotNames.append(name)
+        self.slotName = LayoutDescriptor.getActiveLayoutName(self.store) or self.slotNames[0]
         self.defaultButtonColor = sg.theme_button_color()
         self.buttonSelectedColor = (self.defaultButtonColor[0], 'gray')
         print(self.defaultButtonColor)
@@ -25,6 +37,7 @@ class LayoutManager(DCWindow):
             self.availableFeatures.append(sg.Button(feat[0], key=f'button.available.{i}', size=self.buttonSize))
         for i in range(self.maxNumberOfFeatures): # Maximum features.
             self.activeFeatures.append(sg.Button(' ', key=f'button.active.{i}', visible=True, size=self.buttonSize))
+            self.activeOptions.append(dict())
 
         self.window = sg.Window(
             title='Layout Manager', 
@@ -38,6 +51,7 @@ class LayoutManager(DCWindow):
         )
         for f in self.activeFeatures:
             f.update(visible=False)
+        self.loadSlot(self.slotName)
         self.window.finalize()
 
     def windowLayout(self):
@@ -62,6 +76,10 @@ class LayoutManager(DCWindow):
                 sg.Text(' ', key='feedbackText', auto_size_text=True, size=(50, 1), text_color='dark red'),
                 sg.Text(f'Rows: {self.numOfRows} | Columns: {self.numOfCol} | Max Elements: {self.maxNumberOfFeatures}', key='text.dimensions', size=(30, 1))
             ]])],
+            [sg.Column(justification='center', element_justification='center', layout=[[
+                sg.Text('Layout slot:'),
+                sg.Combo(self.slotNames, default_value=self.slotName, key='-combo.layouts.slot-', enable_events=True, size=(20, 1))
+            ]])],
             [sg.Column(element_justification='center', justification='center', layout=[[sg.Frame('Feature Description', element_justification='center', layout=[[
                 sg.Column(size=infoSize, element_justification='center', justification='center', layout=[
                     [
@@ -80,8 +98,13 @@ class LayoutManager(DCWindow):
         return layout
 
     def addElementToActive(self, element: sg.Button):
+        self.addFeatureToActive(element.GetText())
+
+    def addFeatureToActive(self, name: str, options=None):
+        '''options: constructor options of a feature loaded from a slot, new features have none.'''
         if(len(self.activeFeatures) != self.nextAvailableIndex): # not at last index.
-            self.activeFeatures[self.nextAvailableIndex].update(text=element.GetText(), visible=True)
+            self.activeFeatures[self.nextAvailableIndex].update(text=name, visible=True)
+            self.activeOptions[self.nextAvailableIndex] = dict(options) if options else dict()
             self.nextAvailableIndex += 1
         else:
             self.window['feedbackText'].update("Can't add, max number of elements reached.")
@@ -89,6 +112,8 @@ class LayoutManager(DCWindow):
     def removeElementFromActive(self, element):
         location = int(element.Key.split('.')[-1])
         element.update(text=' ') # reset button text
+        del self.activeOptions[location] # the options move up with the buttons below.
+        self.activeOptions.append(dict())
         for i in enumerate(range(self.nextAvailableIndex), start=location): # enumerate a range because we need a start index which range does not provide.
             i = i[0]
             if(len(self.activeFeatures)-1 != i):
@@ -104,17 +129,47 @@ class LayoutManager(DCWindow):
         if(self.nextAvailableIndex != len(self.activeFeatures)):
                 self.window['feedbackText'].update(' ')
 
+    def clearActive(self):
+        self.removeButtonFocus()
+        for f in self.activeFeatures:
+            f.update(text=' ', visible=False)
+        self.activeOptions = [dict() for _ in self.activeFeatures]
+        self.nextAvailableIndex = 0
+
+    def loadSlot(self, name: str):
+        '''Shows the features saved in a layout slot in the active list, a new slot starts empty.'''
+        self.clearActive()
+        self.slotName = name
+        names = {info.classId: featName for featName, info in self.vanillaFeats}
+        descriptors = LayoutDescriptor.loadLayout(self.store, name) or []
+        for d in sorted(descriptors, key=lambda d: (d.posRow, d.posCol)):
+            if(d.classId in names): # features that are no longer installed are dropped.
+                self.addFeatureToActive(names[d.classId], d.options) # saved again as they were.
+
+    def getSlotName(self):
+        '''Returns the slot the layout will be saved in, the name typed in the combo if any.'''
+        name = str(self.window['-combo.layouts.slot-'].get()).strip()
+        return name if name else self.slotName
+
     def getFeatureDescription(self, element):
-        element = element
+        info = self.vanillaFeatsDict.get(element.GetText())
+        if(info is None):
+            return ''
+        return '{} (v{})'.format(info.description, info.version) if info.description else 'v{}'.format(info.version)
 
     def handleEvents(self, event, values):
         # button selected
         if(event[:17] == 'button.available.'):
             self.focusButton(self._getElementWithKey(self.availableFeatures, event))
             self.enableAddButton()
+            self.window['text.featureDescription'].update(self.getFeatureDescription(self.selectedFeature))
         if(event[:13] == 'button.active'):
             self.focusButton(self._getElementWithKey(self.activeFeatures, event))
             self.enableRemoveButton()
+            self.window['text.featureDescription'].update(self.getFeatureDescription(self.selectedFeature))
+
+        if(event == '-combo.layouts.slot-'):
+            self.loadSlot(values[event])
 
         # adding/Removing Feature
         if(event == 'button.addFeature'):
@@ -163,20 +218,25 @@ class LayoutManager(DCWindow):
     def _getClassFromFeats(self, name: str):
         for pair in self.vanillaFeats:
             if(pair[0] == name):
-                return pair[1]
+                return FeatureRegistry.getRegistry().loadClass(pair[1].classId)
 
-    def getListOfActiveFeats(self):
-        feats = []
+    def getLayoutDescriptors(self):
+        '''Describes the active features without creating any feature instances.'''
+        descriptors = []
         row = 0
         col = 0
         for i, button in enumerate(self.activeFeatures[:self.nextAvailableIndex]):
-            feats.append(self.vanillaFeatsDict[button.GetText()](row, col, timeAdjust=i))
+            classId = self.vanillaFeatsDict[button.GetText()].classId
+            descriptors.append(LayoutDescriptor.FeatureDescriptor(classId, row, col, self.activeOptions[i])) # options do not depend on the position, so applyLayout() keeps unchanged features.
             if(i >= (self.numOfCol-1)+(row * self.numOfCol)):
                 row += 1
                 col = 0
             else:
                 col += 1
-        return feats
+        return descriptors
+
+    def getListOfActiveFeats(self):
+        return [d.build() for d in self.getLayoutDescriptors()]
 
 
 # layouts = LayoutManager()
@@ -10,10 +10,29 @@
 #       various sources for information based on the user of this application. 
 #=========================================================================
 
-import requests
-from bs4 import BeautifulSoup
+import json
+import os
+import socket
+import struct
+import threading
+import time
 import SysUtils
+import WorkerPool
+try:
+    import fcntl
+except ImportError: # not available on windows, interface discovery falls back to ifconfig.
+    fcntl = None
 currentIpData = None
+_probeEngine = None
+_ipTableExtractor = None
+
+_SIOCGIFFLAGS = 0x8913
+_SIOCGIFADDR = 0x8915
+_SIOCGIFNETMASK = 0x891b
+_IFF_UP = 0x1
+_IFF_BROADCAST = 0x2
+_IFF_LOOPBACK = 0x8
+_IFF_RUNNING = 0x40
 
 #------------------------------------------------------------
 #	class IpData()
@@ -33,6 +52,141 @@ class IpData():
     def __repr__(self):
         return str(self.__dict__)
 
+'''
+----------------------------------------------------------------------------------------------------------
+    class PublicIpLookup()
+    Description:
+        Cached public IP/location lookup. The last good result is kept in memory and in a small
+        JSON file so a cold boot shows the last known location right away. Results younger
+        than "ttl" seconds are served without touching the network. Older results are still
+        served (stale-while-revalidate) while one WorkerPool job fetches a new one.
+        Failed fetches back off exponentially (retryDelay doubling up to maxBackoff) so a
+        dead network or a down site is not hammered. HTTP connections are reused through one
+        requests.Session.
+    Attributes:
+        url: Page to scrape, point it at a local server for testing.
+        ttl: Seconds a result is considered fresh.
+        cachePath: JSON file the last result is persisted to, None keeps it in memory only.
+----------------------------------------------------------------------------------------------------------
+'''
+class PublicIpLookup():
+    def __init__(self, url='https://www.whatismyip.org/my-ip-address', ttl=3600, cachePath='PublicIpCache.json',
+            timeout=10, retryDelay=30, maxBackoff=1800):
+        self.url = url
+        self.ttl = ttl
+        self.cachePath = cachePath
+        self.timeout = timeout
+        self.retryDelay = retryDelay
+        self.maxBackoff = maxBackoff
+        self.data = None
+        self.fetchedAt = 0
+        self.failures = 0
+        self.nextAttempt = 0
+        self._session = None
+        self._lock = threading.Lock()
+        self._refreshing = False
+        self._loadCache()
+
+    def isFresh(self):
+        return self.data is not None and time.time() - self.fetchedAt < self.ttl
+
+    def get(self, allowStale=True, eventKey=None):
+        '''
+        Returns the cached IpData. A fresh result is returned as is. A stale one is returned
+        right away (allowStale) while a refresh runs in the background, see
+        refreshInBackground(). With nothing cached (or allowStale=False) the fetch runs here.
+        Returns None if nothing could be fetched.
+        '''
+        if(self.isFresh()):
+            return self.data
+        if(self.data is not None and allowStale):
+            self.refreshInBackground(eventKey)
+            return self.data
+        self.refresh()
+        return self.data
+
+    def refreshInBackground(self, eventKey=None):
+        '''
+        Runs refresh() in the shared WorkerPool, at most one at a time. With an eventKey the
+        JobResult (value True when new data was fetched) is posted to the pool's window with
+        write_event_value() like any other job. Returns True if a refresh was started.
+        '''
+        with self._lock:
+            if(self._refreshing or time.time() < self.nextAttempt):
+                return False
+            self._refreshing = True
+        try:
+            WorkerPool.getPool().submit('publicIp.refresh', eventKey, self._backgroundRefresh, timeout=self.timeout * 2)
+        except RuntimeError: # the pool was shut down (exiting), try again on the next get().
+            self._refreshing = False
+            return False
+        return True
+
+    def _backgroundRefresh(self):
+        try:
+            return self.refresh()
+        finally:
+            self._refreshing = False
+
+    def refresh(self):
+        '''Fetches a new result unless backing off. Returns True on success.'''
+        if(time.time() < self.nextAttempt):
+            return False
+        try:
+            page = self._getSession().get(self.url, timeout=self.timeout)
+            page.raise_for_status()
+            data = parseIpData(page.content)
+        except Exception: # requests raises many types, any failure is treated the same.
+            data = None
+        if(data is None):
+            self.failures += 1
+            self.nextAttempt = time.time() + min(self.maxBackoff, self.retryDelay * 2 ** (self.failures - 1))
+            return False
+        self.failures = 0
+        self.nextAttempt = 0
+        self.data = data
+        self.fetchedAt = time.time()
+        self._saveCache()
+        return True
+
+    def _getSession(self):
+        if(self._session is None):
+            import requests # imported on first use so importing this module stays cheap.
+            self._session = requests.Session()
+        return self._session
+
+    def _loadCache(self):
+        if(not(self.cachePath)):
+            return
+        try:
+            with open(self.cachePath, 'r') as f:
+                cached = json.load(f)
+            self.data = IpData(**cached['data'])
+            self.fetchedAt = float(cached['fetchedAt'])
+        except (IOError, ValueError, KeyError, TypeError):
+            pass # no usable cache, the first get() fetches.
+
+    def _saveCache(self):
+        if(not(self.cachePath)):
+            return
+        tmpPath = self.cachePath + '.tmp'
+        with open(tmpPath, 'w') as f:
+            json.dump({'fetchedAt': self.fetchedAt, 'url': self.url, 'data': self.data.__dict__}, f)
+        os.replace(tmpPath, self.cachePath)
+
+_publicIpLookup = None
+
+#------------------------------------------------------------
+#	getPublicIpLookup()
+#		Description: Returns the public IP lookup shared by
+#           the app, creating it on first use.
+#------------------------------------------------------------
+def getPublicIpLookup():
+    global _publicIpLookup
+    if(_publicIpLookup is None):
+        _publicIpLookup = PublicIpLookup()
+    return _publicIpLookup
+
 #------------------------------------------------------------
 #	getPublicIP()
 #		Description: requests from "WhatIsMyIP.org" for public 
@@ -40,20 +194,44 @@ class IpData():
 #------------------------------------------------------------
 def getPublicIP():
     global currentIpData
-    if(currentIpData is None):
-        currentIpData = getPublicIpData()
-    return currentIpData.ip
+    currentIpData = getPublicIpData()
+    return currentIpData.ip if currentIpData else None
 
 #------------------------------------------------------------
 #	getPublicIpData()
 #		Description: Creates and returns an object containg ip data.
 #           Will return none if object cannot be created 
-#           because of missing or unexpected data.
+#           because of missing or unexpected data. Served from
+#           the PublicIpLookup cache, see its description.
 #------------------------------------------------------------
 def getPublicIpData():
-    page = requests.get('https://www.whatismyip.org/my-ip-address')
-    soup = BeautifulSoup(page.content, 'html.parser')
-    tableData = [d.text for d in soup.find_all('td')]
+    return getPublicIpLookup().get()
+
+#------------------------------------------------------------
+#	getIpTableExtractor()
+#		Description: Returns the extractor of the table cells
+#           of the whatismyip.org page (label and value pairs),
+#           creating it on first use.
+#------------------------------------------------------------
+def getIpTableExtractor():
+    global _ipTableExtractor
+    if(_ipTableExtractor is None):
+        import ScrapeUtils # imported on first use so importing this module stays cheap.
+        _ipTableExtractor = ScrapeUtils.Extractor('ipTable',
+            ScrapeUtils.Regex(r'<td\b[^>]*>(.*?)</td>', many=True),
+            ScrapeUtils.Tag('td', many=True),
+            validate=lambda cells: len(cells) % 2 == 0)
+    return _ipTableExtractor
+
+#------------------------------------------------------------
+#	parseIpData()
+#		Description: Creates an IpData object from the
+#           whatismyip.org page. Will return none if object
+#           cannot be created because of missing or unexpected
+#           data.
+#------------------------------------------------------------
+def parseIpData(content):
+    tableData = getIpTableExtractor().extract(content) or []
     dataDict = {    # setup a dictionary with default values in keys
         'ip': None,
         'city': None,
@@ -77,6 +255,124 @@ def getPublicIpData():
             
     return IpData(**dataDict) # return an IpData instance, input unpacked dictionary.
 
+#------------------------------------------------------------
+#	class InterfaceInfo()
+#		Description: State of one network interface as read
+#           from the kernel.
+#------------------------------------------------------------
+class InterfaceInfo():
+    __slots__ = ('name', 'address', 'netmask', 'flags')
+
+    def __init__(self, name, address=None, netmask=None, flags=0):
+        self.name = name
+        self.address = address  # IPv4 address or None when there is none.
+        self.netmask = netmask
+        self.flags = flags      # IFF_* flags from SIOCGIFFLAGS.
+
+    @property
+    def isUp(self):
+        return bool(self.flags & _IFF_UP)
+
+    @property
+    def isRunning(self):
+        '''True when the link is up (cable plugged in, wifi associated).'''
+        return bool(self.flags & _IFF_RUNNING)
+
+    @property
+    def isBroadcast(self):
+        return bool(self.flags & _IFF_BROADCAST)
+
+    @property
+    def isLoopback(self):
+        return bool(self.flags & _IFF_LOOPBACK)
+
+    def state(self):
+        '''Everything that is compared to detect a change.'''
+        return (self.address, self.netmask, self.flags & (_IFF_UP | _IFF_RUNNING | _IFF_BROADCAST))
+
+    def __repr__(self):
+        return str({k: getattr(self, k) for k in self.__slots__})
+
+
+'''
+----------------------------------------------------------------------------------------------------------
+    class InterfaceMonitor()
+    Description:
+        Reads the network interfaces straight from the kernel with socket ioctls, no processes
+        are started. One socket is kept open for the ioctls. poll() re-reads every interface
+        (a few system calls each) and calls the listeners only when an address, the link
+        state or the set of interfaces changed, so a feature can poll every second for
+        almost nothing.
+    Attributes:
+        interfaces: Last snapshot, dictionary of interface name -> InterfaceInfo.
+----------------------------------------------------------------------------------------------------------
+'''
+class InterfaceMonitor():
+    def __init__(self):
+        if(fcntl is None):
+            raise OSError('Reading interfaces from the kernel is only supported on Linux.')
+        self._sock = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+        self._listeners = []
+        self.interfaces = self._read()
+
+    def addListener(self, callback):
+        '''callback(changes: dict of name -> (old InterfaceInfo or None, new InterfaceInfo or None), interfaces).'''
+        self._listeners.append(callback)
+
+    def removeListener(self, callback):
+        if(callback in self._listeners):
+            self._listeners.remove(callback)
+
+    def poll(self):
+        '''Re-reads the interfaces, notifies the listeners if something changed and returns the changes.'''
+        current = self._read()
+        changes = dict()
+        for name in self.interfaces.keys() | current.keys():
+            old = self.interfaces.get(name)
+            new = current.get(name)
+            if(old is None or new is None or old.state() != new.state()):
+                changes[name] = (old, new)
+        self.interfaces = current
+        if(changes):
+            for callback in list(self._listeners):
+                callback(changes, current)
+        return changes
+
+    def close(self):
+        self._sock.close()
+
+    def _ioctl(self, request, name):
+        return fcntl.ioctl(self._sock.fileno(), request, struct.pack('256s', name.encode()[:15]))
+
+    def _read(self):
+        interfaces = dict()
+        for _, name in socket.if_nameindex():
+            try:
+                flags = struct.unpack_from('H', self._ioctl(_SIOCGIFFLAGS, name), 16)[0]
+            except OSError:
+                continue # interface disappeared while reading.
+            info = InterfaceInfo(name, flags=flags)
+            try:
+                info.address = socket.inet_ntoa(self._ioctl(_SIOCGIFADDR, name)[20:24])
+                info.netmask = socket.inet_ntoa(self._ioctl(_SIOCGIFNETMASK, name)[20:24])
+            except OSError: # no IPv4 address assigned.
+                pass
+            interfaces[name] = info
+        return interfaces
+
+_interfaceMonitor = None
+
+#------------------------------------------------------------
+#	getInterfaceMonitor()
+#		Description: Returns the interface monitor shared by
+#           the app, creating it on first use.
+#------------------------------------------------------------
+def getInterfaceMonitor():
+    global _interfaceMonitor
+    if(_interfaceMonitor is None):
+        _interfaceMonitor = InterfaceMonitor()
+    return _interfaceMonitor
+
 #------------------------------------------------------------
 #	getIPs()
 #		Description: returns a dictionary containing the 
@@ -84,8 +380,19 @@ def getPublicIpData():
 #           corresponding IP's (value) if available. 
 #------------------------------------------------------------
 def getIPs():
-    out = SysUtils.runSys('ifconfig | grep -E "BROADCAST|netmask"')
-    outLines = out.splitlines()
+    if(fcntl is None):
+        return _getIPsFromIfconfig()
+    monitor = getInterfaceMonitor()
+    monitor.poll()
+    ips = {}
+    for name, info in monitor.interfaces.items():
+        if(info.isBroadcast): # same NIC's ifconfig listed as BROADCAST.
+            ips[name] = info.address if info.address else 'No Connection'
+    return ips
+
+def _getIPsFromIfconfig():
+    out = SysUtils.runSys('ifconfig', cacheTtl=1) # no shell, the grep is done here.
+    outLines = [line for line in out.splitlines() if('BROADCAST' in line or 'netmask' in line)]
     ips = {}
     for i, line in enumerate(outLines):
         if('BROADCAST' in line): # This line contains the logical name for NIC
@@ -101,25 +408,42 @@ def getIPs():
 #	checkConnections()
 #		Description: adjusts the values of the dictionary 
 #           returned from getIPs() to reflect any lost IP 
-#           connections. Will take at most 1 second
-#           if no connection.
+#           connections. Every NIC's default gateway (or its
+#           .1 address when it has no default route) is probed
+#           at the same time, takes at most "deadline" seconds
+#           in total.
 #------------------------------------------------------------
-def checkConnections(iPs: dict):
+def checkConnections(iPs: dict, deadline=2.0):
+    global _probeEngine
+    import ConnectivityProbe # imported on first use so importing this module stays cheap.
+    import TimeSeries
+    if(_probeEngine is None):
+        _probeEngine = ConnectivityProbe.ProbeEngine()
+    _probeEngine.deadline = deadline
+    gateways = ConnectivityProbe.getDefaultGateways()
+    targets = []
     for nic in iPs.keys():
         if ('No Connection' in iPs[nic]):
             continue
-        else:
-            localIP = iPs[nic].split('.')[:-1]
-            localIP.append('1')
-            localIP = '.'.join(localIP)
-            print(localIP)
-            # pingResult = runSys(f'ping -c 1 -W 2 {localIP}')
-            pingResult = SysUtils.runSys(f'ping -c 1 -W 2 -I {nic} {localIP}')
-            if('0 received, 100% packet loss' in pingResult):
-                iPs[nic] = 'No Connection'
-            else:
-                continue
+        gateway = gateways.get(nic)
+        if(gateway is None):
+            gateway = '.'.join(iPs[nic].split('.')[:-1] + ['1']) # no default route on this NIC, guess.
+        targets.append(ConnectivityProbe.ProbeTarget(gateway, sourceAddress=iPs[nic], name=nic))
+    results = _probeEngine.run(targets)
+    for nic, latency in results.items():
+        TimeSeries.getSeries('latency.' + nic).add(latency) # lost probes leave a gap.
+        if(latency is None):
+            iPs[nic] = 'No Connection'
+    return iPs
 
+#------------------------------------------------------------
+#	getProbeEngine()
+#		Description: Returns the probe engine used by
+#           checkConnections(), its history holds the latency
+#           and loss of every gateway probed so far.
+#------------------------------------------------------------
+def getProbeEngine():
+    return _probeEngine
 
 if __name__ == "__main__":
     # print(getPublicIP())
@@ -0,0 +1,96 @@
+#!/usr/bin/python3
+# -*- coding: utf-8 -*-
+
+#=========================================================================
+#	RenderSurface.py
+#	Author: Raul Rojas
+#	Contact: rrojas994@gmail.com
+#	Description:
+#		Provides a change detecting layer that sits between feature blocks
+#       and a PySimpleGUI window. Element updates that would not change
+#       what is on screen are dropped and the remaining ones are applied
+#       to the window in a single flush per tick.
+#=========================================================================
+
+'''
+----------------------------------------------------------------------------------------------------------
+    class RenderSurface()
+    Description:
+        Feature blocks use a RenderSurface exactly like a window:
+            surface[self.safeKeys['time']].update('12:00', text_color='red')
+        Every argument given to update() is compared against the last value sent for that
+        element. Unchanged arguments are skipped, changed ones are queued until flush().
+        Positional arguments are cached by position so "update('12:00')" and
+        "update(value='12:00')" are treated as different arguments, use one form per key.
+    Attributes:
+        window: The PySimpleGUI window the updates are applied to.
+        skipped: Number of update arguments that were dropped because nothing changed.
+        applied: Number of element update() calls made on the real window.
+        flushes: Number of flushes that changed something on screen.
+----------------------------------------------------------------------------------------------------------
+'''
+class RenderSurface():
+    def __init__(self, window=None):
+        self.window = window
+        self._cache = dict()    # key -> {argument: last value sent}
+        self._pending = dict()  # key -> {argument: value waiting for flush}
+        self.skipped = 0
+        self.applied = 0
+        self.flushes = 0
+
+    def __getitem__(self, key):
+        return _ElementProxy(self, key)
+
+    def update(self, key, *args, **kwargs):
+        '''Queues an element update, dropping every argument that matches the cached value.'''
+        cached = self._cache.setdefault(key, dict())
+        changes = dict(enumerate(args))
+        changes.update(kwargs)
+        for arg, value in changes.items():
+            if(arg in cached and cached[arg] == value):
+                self.skipped += 1
+                continue
+            cached[arg] = value
+            self._pending.setdefault(key, dict())[arg] = value
+
+    def flush(self):
+        '''
+        Applies every queued change to the window in one pass and refreshes it once.
+        Returns the number of elements that were updated.
+        '''
+        if(not(self._pending)):
+            return 0
+        pending = self._pending
+        self._pending = dict()
+        for key, changes in pending.items():
+            args = [changes.pop(i) for i in sorted(a for a in changes if isinstance(a, int))]
+            self.window[key].update(*args, **changes)
+        self.applied += len(pending)
+        self.flushes += 1
+        self.window.refresh()
+        return len(pending)
+
+    def invalidate(self, key=None):
+        '''Forgets cached values so the next update is always applied (all keys when key is None).'''
+        if(key is None):
+            self._cache.clear()
+        else:
+            self._cache.pop(key, None)
+
+    def getStats(self):
+        return {'skipped': self.skipped, 'applied': self.applied, 'flushes': self.flushes}
+
+
+class _ElementProxy():
+    '''Stand in for an element returned by surface[key], anything besides update() is passed to the real element.'''
+    __slots__ = ('_surface', '_key')
+
+    def __init__(self, surface, key):
+        self._surface = surface
+        self._key = key
+
+    def update(self, *args, **kwargs):
+        self._surface.update(self._key, *args, **kwargs)
+
+    def __getattr__(self, name):
+        return getattr(self._surface.window[self._key], name)
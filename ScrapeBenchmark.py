@@ -0,0 +1,119 @@
+#!/usr/bin/python3
+# -*- coding: utf-8 -*-
+
+#=========================================================================
+#	ScrapeBenchmark.py
+#	Author: Raul Rojas
+#	Contact: rrojas994@gmail.com
+#	Description:
+#		Compares the ScrapeUtils extractors against the full BeautifulSoup
+#       parse the scrapers used to do, over the saved pages in fixtures/.
+#       Every extractor strategy is also measured on its own so a slow
+#       fallback shows up before the fast path stops matching.
+#
+#       Example:
+#           python3 ScrapeBenchmark.py --runs 50 --out scrape.json
+#           python3 ScrapeBenchmark.py --compare scrape.json
+#=========================================================================
+
+import argparse
+import json
+import os
+import platform
+import time
+import tracemalloc
+import NetworkingUtils
+import ScrapeUtils
+import WeatherUtils
+from FeatureBenchmark import compareResults
+
+_fixtureDir = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'fixtures')
+
+#------------------------------------------------------------
+#	Legacy parsers, what the scrapers did before ScrapeUtils.
+#------------------------------------------------------------
+def legacyIpTable(content):
+    from bs4 import BeautifulSoup
+    soup = BeautifulSoup(content, 'html.parser')
+    return [d.text for d in soup.find_all('td')]
+
+def legacyTemperature(content):
+    from bs4 import BeautifulSoup
+    soup = BeautifulSoup(content, 'html.parser')
+    temp = soup.find('span', class_='_-_-components-src-organism-CurrentConditions-CurrentConditions--tempValue--MHmYY')
+    return temp.text
+
+# fixture file -> (legacy parser, extractor)
+cases = {
+    'whatismyip.html': (legacyIpTable, NetworkingUtils.getIpTableExtractor()),
+    'weather.html': (legacyTemperature, WeatherUtils.temperatureExtractor)
+}
+
+#------------------------------------------------------------
+#	measure()
+#		Description: Returns the best time in ms of "runs" calls
+#           of parse(content) and the peak traced memory of
+#           one more call, which is not timed.
+#------------------------------------------------------------
+def measure(parse, content, runs):
+    best = None
+    for _ in range(runs):
+        start = time.perf_counter()
+        parse(content)
+        elapsed = time.perf_counter() - start
+        best = elapsed if best is None else min(best, elapsed)
+    tracemalloc.start()
+    parse(content)
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+    return {'bestMs': best * 1000, 'peakBytes': peak}
+
+'''
+----------------------------------------------------------------------------------------------------------
+    runBenchmark(int)
+        Description:
+            Parses every fixture with the legacy parser, the extractor and each strategy of the
+            extractor on its own. Strategies that find nothing in the fixture are still timed, a
+            fallback has to read the whole page before giving up.
+        Returns:
+            A dictionary of results that can be written with json.
+----------------------------------------------------------------------------------------------------------
+'''
+def runBenchmark(runs=20):
+    results = {'runs': runs, 'fixtures': dict(), 'machine': platform.node(), 'python': platform.python_version()}
+    for fileName, (legacy, extractor) in cases.items():
+        with open(os.path.join(_fixtureDir, fileName), 'rb') as f:
+            content = f.read()
+        page = ScrapeUtils.decodePage(content)
+        fixture = {
+            'sizeBytes': len(content),
+            'legacy': measure(legacy, content, runs),
+            'extractor': measure(extractor.extract, content, runs),
+            'strategy': extractor.lastStrategy,
+            'value': extractor.extract(content),
+            'strategies': dict()
+        }
+        for i, strategy in enumerate(extractor.strategies):
+            stats = measure(strategy.run, page, runs)
+            stats['found'] = bool(strategy.run(page))
+            fixture['strategies']['{}.{}'.format(i, type(strategy).__name__)] = stats
+        fixture['speedup'] = fixture['legacy']['bestMs'] / fixture['extractor']['bestMs'] if fixture['extractor']['bestMs'] else 0.0
+        results['fixtures'][fileName] = fixture
+    return results
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description='Extractor vs full parse benchmark over the saved fixtures.')
+    parser.add_argument('--runs', type=int, default=20, help='Timed runs per parser, the best one is kept.')
+    parser.add_argument('--out', help='Write the results to this JSON file.')
+    parser.add_argument('--compare', help='Compare the results to a previous JSON results file.')
+    args = parser.parse_args()
+
+    results = runBenchmark(args.runs)
+    print(json.dumps(results, indent=4, ensure_ascii=False))
+    if(args.compare):
+        with open(args.compare, 'r') as f:
+            print('\n'.join(compareResults(json.load(f), results)))
+    if(args.out):
+        with open(args.out, 'w') as f:
+            json.dump(results, f, indent=4, ensure_ascii=False)
@@ -0,0 +1,202 @@
+#!/usr/bin/python3
+# -*- coding: utf-8 -*-
+
+#=========================================================================
+#	ScrapeUtils.py
+#	Author: Raul Rojas
+#	Contact: rrojas994@gmail.com
+#	Description:
+#		Declarative extraction of values from downloaded web pages. An
+#       Extractor lists strategies (regex, streamed tag match, css
+#       selector) that are tried in order until one finds something, so
+#       a page change only breaks the fast path and not the scraper.
+#       None of the strategies build a full tree of the page.
+#=========================================================================
+
+import html
+import re
+from html.parser import HTMLParser
+
+_tagPattern = re.compile(r'<[^>]+>')
+
+#------------------------------------------------------------
+#	cleanText()
+#		Description: Removes tags and entities from a piece of
+#           html and strips the whitespace around it.
+#------------------------------------------------------------
+def cleanText(fragment: str):
+    return html.unescape(_tagPattern.sub('', fragment)).strip()
+
+#------------------------------------------------------------
+#	decodePage()
+#		Description: Returns page content (bytes or str) as str.
+#------------------------------------------------------------
+def decodePage(content):
+    if(isinstance(content, bytes)):
+        return content.decode('utf-8', errors='replace')
+    return content
+
+
+#------------------------------------------------------------
+#	class Regex()
+#		Description: Strategy, runs a regular expression over
+#           the raw page. Cheapest strategy, but the most
+#           fragile, use it first with a safer fallback.
+#------------------------------------------------------------
+class Regex():
+    def __init__(self, pattern, group=1, many=False, flags=re.S | re.I):
+        self.pattern = re.compile(pattern, flags) if isinstance(pattern, str) else pattern
+        self.group = group
+        self.many = many
+
+    def run(self, page: str):
+        if(self.many):
+            return [cleanText(m.group(self.group)) for m in self.pattern.finditer(page)]
+        m = self.pattern.search(page)
+        return cleanText(m.group(self.group)) if m else None
+
+
+class _StopParsing(Exception):
+    pass
+
+class _TagTextCollector(HTMLParser):
+    '''Streams through a page and keeps only the text of the matching tags.'''
+    def __init__(self, strategy):
+        super().__init__(convert_charrefs=True)
+        self.strategy = strategy
+        self.results = []
+        self._depth = 0 # > 0 while inside a matching tag.
+        self._text = []
+
+    def handle_starttag(self, tag, attrs):
+        if(self._depth):
+            if(tag == self.strategy.tag):
+                self._depth += 1
+        elif(tag == self.strategy.tag and self.strategy.matches(attrs)):
+            self._depth = 1
+            self._text = []
+
+    def handle_endtag(self, tag):
+        if(self._depth and tag == self.strategy.tag):
+            self._depth -= 1
+            if(not(self._depth)):
+                self.results.append(''.join(self._text).strip())
+                if(not(self.strategy.many)):
+                    raise _StopParsing() # found it, skip the rest of the page.
+
+    def handle_data(self, data):
+        if(self._depth):
+            self._text.append(data)
+
+#------------------------------------------------------------
+#	class Tag()
+#		Description: Strategy, streams the page through the
+#           standard library html parser and returns the text
+#           of the tags with the given name and attributes. No
+#           tree is built and parsing stops at the first match
+#           unless many=True. Attribute values are matched
+#           exactly, as one of the words of a class attribute,
+#           or with re.search when a compiled pattern is given.
+#------------------------------------------------------------
+class Tag():
+    def __init__(self, tag, attrs=None, many=False):
+        self.tag = tag
+        self.attrs = dict(attrs) if attrs else dict()
+        self.many = many
+
+    def matches(self, attrs):
+        attrs = dict(attrs)
+        for name, wanted in self.attrs.items():
+            value = attrs.get(name)
+            if(value is None):
+                return False
+            if(hasattr(wanted, 'search')):
+                if(not(wanted.search(value))):
+                    return False
+            elif(value != wanted and not(name == 'class' and wanted in value.split())):
+                return False
+        return True
+
+    def run(self, page: str):
+        collector = _TagTextCollector(self)
+        try:
+            collector.feed(page)
+            collector.close()
+        except _StopParsing:
+            pass
+        if(self.many):
+            return collector.results
+        return collector.results[0] if collector.results else None
+
+
+#------------------------------------------------------------
+#	class Css()
+#		Description: Strategy, css selector through
+#           BeautifulSoup. Only the tags named in "tags" are
+#           kept in the tree (SoupStrainer), give them when you
+#           can. Slowest strategy, use it as the last fallback.
+#------------------------------------------------------------
+class Css():
+    def __init__(self, selector, tags=None, many=False):
+        self.selector = selector
+        self.tags = tags
+        self.many = many
+
+    def run(self, page: str):
+        from bs4 import BeautifulSoup, SoupStrainer
+        strainer = SoupStrainer(self.tags) if self.tags else None
+        soup = BeautifulSoup(page, 'html.parser', parse_only=strainer)
+        if(self.many):
+            return [e.get_text().strip() for e in soup.select(self.selector)]
+        element = soup.select_one(self.selector)
+        return element.get_text().strip() if element else None
+
+
+'''
+----------------------------------------------------------------------------------------------------------
+    class Extractor()
+    Description:
+        A named value to pull out of a page and the strategies to try, in order. The first
+        strategy returning something (a non empty string or list, or a list accepted by
+        "validate") wins.
+        Example:
+            temperature = Extractor('temperature',
+                Tag('span', {'data-testid': 'TemperatureValue'}),
+                Css('span[class*="tempValue"]', tags='span'))
+            temperature.extract(page.content)
+    Attributes:
+        validate: Optional function(result) -> bool used to reject a strategy's result and
+            move on to the next one (e.g. a table with the wrong number of cells).
+        lastStrategy: Index of the strategy that produced the last result, handy to notice
+            that the fast path stopped working.
+----------------------------------------------------------------------------------------------------------
+'''
+class Extractor():
+    def __init__(self, name, *strategies, validate=None, default=None):
+        self.name = name
+        self.strategies = strategies
+        self.validate = validate
+        self.default = default
+        self.lastStrategy = None
+
+    def extract(self, content):
+        page = decodePage(content)
+        for i, strategy in enumerate(self.strategies):
+            try:
+                result = strategy.run(page)
+            except Exception: # a broken strategy must not stop the fallbacks.
+                continue
+            if(result and (self.validate is None or self.validate(result))):
+                self.lastStrategy = i
+                return result
+        self.lastStrategy = None
+        return self.default
+
+#------------------------------------------------------------
+#	extractAll()
+#		Description: Runs several extractors over one page and
+#           returns a dictionary of name -> value.
+#------------------------------------------------------------
+def extractAll(content, extractors):
+    page = decodePage(content)
+    return {e.name: e.extract(page) for e in extractors}
@@ -0,0 +1,106 @@
+#!/usr/bin/python3
+# -*- coding: utf-8 -*-
+
+#=========================================================================
+#	StartupProfiler.py
+#	Author: Raul Rojas
+#	Contact: rrojas994@gmail.com
+#	Description:
+#		Records a timeline of DeskClock's cold start (imports, window
+#       builds, first paint) so start up regressions can be tracked.
+#       Recording is always on and costs a few microseconds, the timeline
+#       is only printed and written to disk when requested with
+#       "--startup-profile" or the DESKCLOCK_STARTUP_PROFILE variable.
+#=========================================================================
+
+import json
+import os
+import sys
+import time
+from contextlib import contextmanager
+
+_t0 = time.perf_counter() # import this module first so the timeline starts as early as possible.
+_events = []
+_finished = False # nothing is recorded after the first frame, later window rebuilds are not start up.
+enabled = '--startup-profile' in sys.argv or bool(os.environ.get('DESKCLOCK_STARTUP_PROFILE'))
+
+#------------------------------------------------------------
+#	processAge()
+#		Description: Returns how many seconds ago the process
+#           was started by the OS (includes interpreter start
+#           up, which happens before any of our code runs).
+#           Returns None where /proc is not available.
+#------------------------------------------------------------
+def processAge():
+    try:
+        with open('/proc/self/stat', 'r') as f:
+            startTicks = int(f.read().rsplit(')', 1)[1].split()[19])
+        with open('/proc/uptime', 'r') as f:
+            uptime = float(f.read().split()[0])
+        return uptime - startTicks / os.sysconf('SC_CLK_TCK')
+    except (OSError, ValueError, IndexError):
+        return None
+
+_interpreterStart = processAge() # seconds between process start and this module being imported.
+
+#------------------------------------------------------------
+#	mark()
+#		Description: Records that a start up step finished.
+#------------------------------------------------------------
+def mark(label: str):
+    if(not(_finished)):
+        _events.append((label, time.perf_counter() - _t0, None))
+
+#------------------------------------------------------------
+#	span()
+#		Description: Context manager recording how long the
+#           wrapped start up step took.
+#------------------------------------------------------------
+@contextmanager
+def span(label: str):
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        end = time.perf_counter()
+        if(not(_finished)):
+            _events.append((label, end - _t0, end - start))
+
+#------------------------------------------------------------
+#	getTimeline()
+#		Description: Returns the timeline as a list of
+#           dictionaries, times are in ms since this module
+#           was imported.
+#------------------------------------------------------------
+def getTimeline():
+    return [{'step': label, 'atMs': at * 1000, 'durationMs': None if d is None else d * 1000} for label, at, d in _events]
+
+def report():
+    lines = []
+    if(_interpreterStart is not None):
+        lines.append('{:>10.1f}ms  interpreter start up'.format(_interpreterStart * 1000))
+    for e in getTimeline():
+        duration = '' if e['durationMs'] is None else ' ({:.1f}ms)'.format(e['durationMs'])
+        lines.append('{:>10.1f}ms  {}{}'.format(e['atMs'], e['step'], duration))
+    return '\n'.join(lines)
+
+def dump(fPath='StartupTimeline.json'):
+    with open(fPath, 'w') as f:
+        json.dump({'time': time.time(), 'interpreterStartMs': None if _interpreterStart is None else _interpreterStart * 1000,
+            'timeline': getTimeline()}, f, indent=4)
+
+#------------------------------------------------------------
+#	finish()
+#		Description: Called once the first frame is on screen,
+#           prints and saves the timeline when profiling is
+#           enabled.
+#------------------------------------------------------------
+def finish():
+    global _finished
+    if(_finished):
+        return
+    mark('first paint')
+    _finished = True
+    if(enabled):
+        print(report())
+        dump()
@@ -0,0 +1,240 @@
+#!/usr/bin/python3
+# -*- coding: utf-8 -*-
+
+#=========================================================================
+#	SysMetrics.py
+#	Author: Raul Rojas
+#	Contact: rrojas994@gmail.com
+#	Description:
+#		Cheap sampling of the machine's own health (CPU use and
+#       temperature, load, memory, Raspberry Pi throttling) straight from
+#       /proc and /sys. Files are opened once and re-read with pread into
+#       preallocated buffers, no process is spawned and a sample takes a
+#       few tens of microseconds.
+#=========================================================================
+
+import array
+import os
+import re
+import time
+import TimeSeries
+
+_cpuPattern = re.compile(rb'^cpu\s+(\d+) (\d+) (\d+) (\d+) (\d+) (\d+) (\d+)(?: (\d+))?')
+_memTotalPattern = re.compile(rb'MemTotal:\s+(\d+)')
+_memAvailablePattern = re.compile(rb'MemAvailable:\s+(\d+)')
+_loadPattern = re.compile(rb'^(\S+) (\S+) (\S+)')
+_intPattern = re.compile(rb'^\s*(?:0x)?([0-9a-fA-F]+)')
+_sharedSampler = None
+
+# Bits of the Raspberry Pi firmware's get_throttled value.
+THROTTLED_FLAGS = {
+    0x1: 'under-voltage',
+    0x2: 'frequency capped',
+    0x4: 'throttled',
+    0x8: 'temperature limit'
+}
+
+#------------------------------------------------------------
+#	class ProcFile()
+#		Description: A /proc or /sys file kept open and re-read
+#           from offset 0 into the same buffer every time.
+#------------------------------------------------------------
+class ProcFile():
+    def __init__(self, path, bufferSize=4096):
+        self.path = path
+        self.fd = os.open(path, os.O_RDONLY)
+        self.buffer = bytearray(bufferSize)
+        self.length = 0
+
+    def read(self):
+        '''Re-reads the file, returns the number of valid bytes at the start of self.buffer.'''
+        if(hasattr(os, 'preadv')):
+            self.length = os.preadv(self.fd, [self.buffer], 0)
+        else:
+            data = os.pread(self.fd, len(self.buffer), 0)
+            self.length = len(data)
+            self.buffer[:self.length] = data
+        return self.length
+
+    def search(self, pattern):
+        '''Returns the pattern's match in the last read contents or None.'''
+        return pattern.search(self.buffer, 0, self.length)
+
+    def close(self):
+        if(self.fd is not None):
+            os.close(self.fd)
+            self.fd = None
+
+
+#------------------------------------------------------------
+#	class SystemSample()
+#		Description: One set of readings. Values that cannot be
+#           read on this machine stay None.
+#------------------------------------------------------------
+class SystemSample():
+    __slots__ = ('time', 'cpuPercent', 'load1', 'load5', 'load15', 'memTotal', 'memAvailable', 'memPercent',
+        'temperature', 'throttled', 'cpuFreqMHz')
+
+    def __init__(self):
+        for name in self.__slots__:
+            setattr(self, name, None)
+
+    def getThrottledFlags(self):
+        '''Returns the names of the throttling conditions active right now.'''
+        if(not(self.throttled)):
+            return []
+        return [name for bit, name in THROTTLED_FLAGS.items() if self.throttled & bit]
+
+    def toDict(self):
+        return {name: getattr(self, name) for name in self.__slots__}
+
+    def __repr__(self):
+        return str(self.toDict())
+
+
+'''
+----------------------------------------------------------------------------------------------------------
+    class SysMetricsSampler()
+    Description:
+        Reads /proc/stat, /proc/meminfo, /proc/loadavg, the CPU thermal zone, the CPU frequency
+        and the Raspberry Pi firmware's throttling state. Every file is opened once, missing
+        ones are skipped. CPU use is the delta of the /proc/stat counters since the previous
+        sample, kept in a preallocated array. sample() updates one SystemSample in place and
+        returns it, copy the values that must be kept. Calls closer together than minInterval
+        return the last sample, so several features can share one sampler without shrinking
+        the CPU delta.
+    Attributes:
+        history: Record cpu use and temperature in the "system.cpu" / "system.temperature"
+            TimeSeries.
+----------------------------------------------------------------------------------------------------------
+'''
+class SysMetricsSampler():
+    def __init__(self, minInterval=0.5, history=True, thermalZone=None):
+        self.minInterval = minInterval
+        self.history = history
+        self.current = SystemSample()
+        self.lastSampleTime = 0.0
+        self._cpuPrevious = array.array('Q', [0] * 8)
+        self._cpuNow = array.array('Q', [0] * 8)
+        self._hasPrevious = False
+        self._files = dict()
+        self._open('stat', '/proc/stat', 8192)
+        self._open('meminfo', '/proc/meminfo')
+        self._open('loadavg', '/proc/loadavg', 128)
+        self._open('thermal', thermalZone or findCpuThermalZone(), 64)
+        self._open('cpuFreq', '/sys/devices/system/cpu/cpu0/cpufreq/scaling_cur_freq', 64)
+        self._open('throttled', '/sys/devices/platform/soc/soc:firmware/get_throttled', 64)
+
+    def _open(self, name, path, bufferSize=4096):
+        if(path is None):
+            return
+        try:
+            self._files[name] = ProcFile(path, bufferSize)
+        except OSError:
+            pass # not available on this machine, the value stays None.
+
+    def sample(self):
+        now = time.monotonic()
+        if(self._hasPrevious and now - self.lastSampleTime < self.minInterval):
+            return self.current
+        s = self.current
+        s.time = time.time()
+        self._sampleCpu(s)
+        f = self._files.get('meminfo')
+        if(f and f.read()):
+            total, available = f.search(_memTotalPattern), f.search(_memAvailablePattern)
+            if(total and available):
+                s.memTotal = int(total.group(1)) * 1024
+                s.memAvailable = int(available.group(1)) * 1024
+                s.memPercent = 100.0 * (s.memTotal - s.memAvailable) / s.memTotal if s.memTotal else 0.0
+        f = self._files.get('loadavg')
+        if(f and f.read()):
+            m = f.search(_loadPattern)
+            if(m):
+                s.load1, s.load5, s.load15 = float(m.group(1)), float(m.group(2)), float(m.group(3))
+        value = self._readInt('thermal')
+        s.temperature = value / 1000.0 if value is not None else None
+        value = self._readInt('cpuFreq')
+        s.cpuFreqMHz = value / 1000.0 if value is not None else None
+        s.throttled = self._readInt('throttled', 16)
+        self.lastSampleTime = now
+        if(self.history):
+            TimeSeries.getSeries('system.cpu').add(s.cpuPercent, s.time)
+            TimeSeries.getSeries('system.temperature').add(s.temperature, s.time)
+        return s
+
+    def _sampleCpu(self, s):
+        f = self._files.get('stat')
+        if(not(f and f.read())):
+            return
+        m = f.search(_cpuPattern)
+        if(not(m)):
+            return
+        now, previous = self._cpuNow, self._cpuPrevious
+        for i in range(8):
+            field = m.group(i + 1)
+            now[i] = int(field) if field else 0
+        if(self._hasPrevious):
+            total = sum(now) - sum(previous)
+            idle = (now[3] + now[4]) - (previous[3] + previous[4]) # idle + iowait
+            s.cpuPercent = 100.0 * (total - idle) / total if total > 0 else 0.0
+        self._cpuPrevious, self._cpuNow = now, previous # swap, no new arrays.
+        self._hasPrevious = True
+
+    def _readInt(self, name, base=10):
+        f = self._files.get(name)
+        if(not(f)):
+            return None
+        try:
+            if(not(f.read())):
+                return None
+        except OSError:
+            return None
+        m = f.search(_intPattern)
+        return int(m.group(1), base) if m else None
+
+    def close(self):
+        for f in self._files.values():
+            f.close()
+        self._files = dict()
+
+
+#------------------------------------------------------------
+#	findCpuThermalZone()
+#		Description: Returns the temp file of the thermal zone
+#           of the CPU (the first zone when none is named after
+#           the CPU), or None if there is none.
+#------------------------------------------------------------
+def findCpuThermalZone(root='/sys/class/thermal'):
+    try:
+        zones = sorted(z for z in os.listdir(root) if z.startswith('thermal_zone'))
+    except OSError:
+        return None
+    for zone in zones:
+        try:
+            with open(os.path.join(root, zone, 'type'), 'r') as f:
+                if('cpu' in f.read().lower()):
+                    return os.path.join(root, zone, 'temp')
+        except OSError:
+            continue
+    return os.path.join(root, zones[0], 'temp') if zones else None
+
+#------------------------------------------------------------
+#	getSampler()
+#		Description: Returns the sampler shared by the app,
+#           creating it on first use.
+#------------------------------------------------------------
+def getSampler():
+    global _sharedSampler
+    if(_sharedSampler is None):
+        _sharedSampler = SysMetricsSampler()
+    return _sharedSampler
+
+
+if __name__ == "__main__":
+    sampler = SysMetricsSampler(history=False)
+    sampler.sample()
+    time.sleep(1)
+    start = time.perf_counter()
+    print(sampler.sample())
+    print('sample took {:.1f} us'.format((time.perf_counter() - start) * 1e6))
@@ -2,22 +2,301 @@
 #	SysUtils.py
 #	Author: Raul Rojas
 #	Contact: rrojas994@gmail.com
-#	Description: 
+#	Description:
 #		Provides some utilities that involve the system or OS operations.
+#       Commands are run from an argument list (no shell is spawned),
+#       always with a timeout, and every command is counted and timed.
 #=========================================================================
 
+import asyncio
+import os
+import shlex
+import signal
 import subprocess
+import threading
+import time
+
+_sharedRunner = None
+
+#------------------------------------------------------------
+#	class CommandError()
+#		Description: Raised for a command that failed, timed
+#           out or could not be started. Subclasses SystemError
+#           which is what runSys() always raised.
+#------------------------------------------------------------
+class CommandError(SystemError):
+    def __init__(self, message, result=None):
+        super().__init__(message)
+        self.result = result
+
+#------------------------------------------------------------
+#	class CommandResult()
+#		Description: Outcome of one command. stdout and stderr
+#           are decoded text. returncode is 127 when the
+#           program was not found, like a shell would say.
+#------------------------------------------------------------
+class CommandResult():
+    def __init__(self, argv, returncode=None, stdout='', stderr='', duration=0.0, timedOut=False, cached=False):
+        self.argv = argv
+        self.returncode = returncode
+        self.stdout = stdout
+        self.stderr = stderr
+        self.duration = duration
+        self.timedOut = timedOut
+        self.cached = cached
+
+    @property
+    def ok(self):
+        return self.returncode == 0 and not(self.timedOut)
+
+    def check(self):
+        '''Raises a CommandError unless the command succeeded, returns self otherwise.'''
+        if(self.timedOut):
+            raise CommandError(f'System command timed out after {self.duration:.1f}s: "{shlex.join(self.argv)}"', self)
+        if(self.returncode != 0):
+            raise CommandError(f'An error occured when running system command: "{shlex.join(self.argv)}" '
+                f'(exit code {self.returncode})\n{self.stderr}', self)
+        return self
+
+    def __repr__(self):
+        return 'CommandResult({}, returncode={}, duration={:.3f}, timedOut={}, cached={})'.format(
+            self.argv, self.returncode, self.duration, self.timedOut, self.cached)
+
+#------------------------------------------------------------
+#	class CommandStats()
+#		Description: Count and run time of the commands
+#           spawned for one program.
+#------------------------------------------------------------
+class CommandStats():
+    def __init__(self):
+        self.count = 0
+        self.failures = 0
+        self.timeouts = 0
+        self.cacheHits = 0
+        self.totalSeconds = 0.0
+        self.maxSeconds = 0.0
+
+    def toDict(self):
+        d = dict(self.__dict__)
+        d['averageSeconds'] = self.totalSeconds / self.count if self.count else 0.0
+        return d
+
+
+'''
+----------------------------------------------------------------------------------------------------------
+    class CommandRunner()
+    Description:
+        Runs system commands without a shell. Commands are argument lists (a string is split
+        with shlex, pipes and redirections are not supported, do that work in python). Every
+        command gets a timeout, when it expires the command's whole process group is killed
+        so children it started (e.g. ping from a script) do not outlive it.
+        With cacheTtl > 0 the result of an identical command (same argv and input) is reused
+        for that many seconds instead of spawning it again.
+        Example:
+            runner = CommandRunner(timeout=5)
+            runner.run(['vcgencmd', 'measure_temp']).check().stdout
+            runner.runMany([['ping', '-c1', 'a'], ['ping', '-c1', 'b']])
+            for line in runner.stream(['journalctl', '-f'], timeout=60): ...
+    Attributes:
+        timeout: Default timeout in seconds.
+        cacheTtl: Default seconds a result is reused, 0 disables the cache.
+        stats: Dictionary of program name -> CommandStats, see getStats().
+----------------------------------------------------------------------------------------------------------
+'''
+class CommandRunner():
+    def __init__(self, timeout=10, cacheTtl=0):
+        self.timeout = timeout
+        self.cacheTtl = cacheTtl
+        self.stats = dict()
+        self._cache = dict() # (argv, input) -> (expires, CommandResult)
+        self._lock = threading.Lock()
+
+    def run(self, argv, timeout=None, cacheTtl=None, input=None, check=False):
+        '''Runs a command to completion and returns a CommandResult (raises CommandError if check).'''
+        argv = _toArgv(argv)
+        timeout = self.timeout if timeout is None else timeout
+        result = self._getCached(argv, input, cacheTtl)
+        if(result is None):
+            start = time.perf_counter()
+            try:
+                proc = subprocess.Popen(argv, stdin=subprocess.PIPE if input is not None else subprocess.DEVNULL,
+                    stdout=subprocess.PIPE, stderr=subprocess.PIPE, start_new_session=True)
+            except OSError as e:
+                result = _notStarted(argv, e)
+            else:
+                timedOut = False
+                try:
+                    stdout, stderr = proc.communicate(_encode(input), timeout=timeout)
+                except subprocess.TimeoutExpired:
+                    timedOut = True
+                    _killGroup(proc)
+                    stdout, stderr = proc.communicate()
+                result = CommandResult(argv, proc.returncode, _decode(stdout), _decode(stderr),
+                    time.perf_counter() - start, timedOut)
+            self._record(result, input, cacheTtl)
+        return result.check() if check else result
+
+    async def runAsync(self, argv, timeout=None, cacheTtl=None, input=None, check=False):
+        '''asyncio version of run(), many of them can run at the same time on one thread.'''
+        argv = _toArgv(argv)
+        timeout = self.timeout if timeout is None else timeout
+        result = self._getCached(argv, input, cacheTtl)
+        if(result is None):
+            start = time.perf_counter()
+            try:
+                proc = await asyncio.create_subprocess_exec(*argv,
+                    stdin=subprocess.PIPE if input is not None else subprocess.DEVNULL,
+                    stdout=subprocess.PIPE, stderr=subprocess.PIPE, start_new_session=True)
+            except OSError as e:
+                result = _notStarted(argv, e)
+            else:
+                timedOut = False
+                try:
+                    stdout, stderr = await asyncio.wait_for(proc.communicate(_encode(input)), timeout)
+                except asyncio.TimeoutError:
+                    timedOut = True
+                    _killGroup(proc)
+                    stdout, stderr = await proc.communicate()
+                result = CommandResult(argv, proc.returncode, _decode(stdout), _decode(stderr),
+                    time.perf_counter() - start, timedOut)
+            self._record(result, input, cacheTtl)
+        return result.check() if check else result
+
+    def runMany(self, commands, timeout=None, cacheTtl=None):
+        '''Runs every argument list at the same time, returns their CommandResults in order.'''
+        async def runAll():
+            return await asyncio.gather(*[self.runAsync(argv, timeout, cacheTtl) for argv in commands])
+        return asyncio.run(runAll())
+
+    def stream(self, argv, timeout=None):
+        '''
+        Runs a command and yields its stdout line by line as it is printed, for long running
+        tools. The command is killed when the timeout expires (None waits forever) or when the
+        generator is closed early. Raises CommandError if the program cannot be started.
+        '''
+        argv = _toArgv(argv)
+        start = time.perf_counter()
+        try:
+            proc = subprocess.Popen(argv, stdin=subprocess.DEVNULL, stdout=subprocess.PIPE,
+                stderr=subprocess.DEVNULL, start_new_session=True, text=True, bufsize=1)
+        except OSError as e:
+            result = _notStarted(argv, e)
+            self._record(result)
+            raise CommandError(result.stderr, result)
+        expired = threading.Event()
+        def expire():
+            expired.set()
+            _killGroup(proc)
+        timer = threading.Timer(timeout, expire) if timeout else None
+        if(timer):
+            timer.daemon = True
+            timer.start()
+        try:
+            for line in proc.stdout:
+                yield line.rstrip('\n')
+        finally:
+            if(timer):
+                timer.cancel()
+            if(proc.poll() is None):
+                _killGroup(proc) # closed early.
+            proc.stdout.close()
+            proc.wait()
+            self._record(CommandResult(argv, proc.returncode, duration=time.perf_counter() - start,
+                timedOut=expired.is_set()))
+
+    def getStats(self):
+        '''Returns {program: {count, failures, timeouts, cacheHits, totalSeconds, maxSeconds, averageSeconds}}.'''
+        with self._lock:
+            return {name: stats.toDict() for name, stats in self.stats.items()}
+
+    def clearCache(self):
+        with self._lock:
+            self._cache.clear()
+
+    def _getCached(self, argv, input, cacheTtl):
+        ttl = self.cacheTtl if cacheTtl is None else cacheTtl
+        if(ttl <= 0):
+            return None
+        with self._lock:
+            entry = self._cache.get((tuple(argv), input))
+            if(entry is None or entry[0] < time.monotonic()):
+                return None
+            self._getStats(argv).cacheHits += 1
+        result = entry[1]
+        return CommandResult(result.argv, result.returncode, result.stdout, result.stderr, result.duration, cached=True)
+
+    def _record(self, result, input=None, cacheTtl=None):
+        ttl = self.cacheTtl if cacheTtl is None else cacheTtl
+        with self._lock:
+            stats = self._getStats(result.argv)
+            stats.count += 1
+            stats.totalSeconds += result.duration
+            stats.maxSeconds = max(stats.maxSeconds, result.duration)
+            if(result.timedOut):
+                stats.timeouts += 1
+            elif(result.returncode != 0):
+                stats.failures += 1
+            if(ttl > 0 and result.ok): # failures are retried on the next call.
+                self._cache[(tuple(result.argv), input)] = (time.monotonic() + ttl, result)
+                if(len(self._cache) > 256):
+                    now = time.monotonic()
+                    self._cache = {k: e for k, e in self._cache.items() if e[0] >= now}
+
+    def _getStats(self, argv):
+        name = os.path.basename(argv[0]) if argv else ''
+        stats = self.stats.get(name)
+        if(stats is None):
+            stats = CommandStats()
+            self.stats[name] = stats
+        return stats
+
+
+def _toArgv(argv):
+    return shlex.split(argv) if isinstance(argv, str) else [str(a) for a in argv]
+
+def _encode(input):
+    return input.encode('utf-8') if isinstance(input, str) else input
+
+def _decode(output):
+    return output.decode('utf-8', errors='replace') if output else ''
+
+def _notStarted(argv, error):
+    return CommandResult(argv, 127, stderr=f'Could not run "{shlex.join(argv)}": {error}')
+
+def _killGroup(proc):
+    '''Kills a process started with start_new_session=True and everything it started.'''
+    try:
+        os.killpg(proc.pid, signal.SIGKILL)
+    except (ProcessLookupError, PermissionError):
+        try:
+            proc.kill()
+        except ProcessLookupError:
+            pass
+
+#------------------------------------------------------------
+#	getRunner()
+#		Description: Returns the command runner shared by the
+#           app, creating it on first use.
+#------------------------------------------------------------
+def getRunner():
+    global _sharedRunner
+    if(_sharedRunner is None):
+        _sharedRunner = CommandRunner()
+    return _sharedRunner
 
 #------------------------------------------------------------
 #	runsSys()
-#		Description: Executes a system command and returns 
-#           the output from stdout. Raises a SystemError 
-#           exception if the command outputs to stderr.
-#------------------------------------------------------------
-def runSys(inputCommand: str):
-    out = subprocess.Popen(inputCommand, stdout=subprocess.PIPE, stderr=subprocess.PIPE, shell=True)
-    stdout, stderr = out.communicate()
-    if(stderr):
-        errorMsg = f'An error occured when running system command: "{inputCommand}"\n' + stderr
-        raise SystemError(errorMsg)
-    return stdout.decode('utf-8').strip()
+#		Description: Executes a system command and returns
+#           the output from stdout. Raises a SystemError
+#           exception if the command outputs to stderr, fails
+#           or takes longer than "timeout" seconds. The
+#           command is split like a shell would but no shell
+#           runs it, so pipes and redirections do not work.
+#------------------------------------------------------------
+def runSys(inputCommand, timeout=10, cacheTtl=0):
+    result = getRunner().run(inputCommand, timeout=timeout, cacheTtl=cacheTtl)
+    if(result.stderr or not(result.ok)):
+        command = inputCommand if isinstance(inputCommand, str) else shlex.join(result.argv)
+        errorMsg = f'An error occured when running system command: "{command}"\n' + result.stderr
+        raise CommandError(errorMsg, result)
+    return result.stdout.strip()
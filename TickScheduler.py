@@ -0,0 +1,89 @@
+#!/usr/bin/python3
+# -*- coding: utf-8 -*-
+
+#=========================================================================
+#	TickScheduler.py
+#	Author: Raul Rojas
+#	Contact: rrojas994@gmail.com
+#	Description:
+#		Provides a deadline driven scheduler for feature blocks. Each
+#       feature reports when it next needs to be updated and the main
+#       loop sleeps until the earliest of those deadlines instead of
+#       polling at a fixed rate.
+#=========================================================================
+
+import heapq
+import itertools
+import math
+import time
+
+'''
+----------------------------------------------------------------------------------------------------------
+    class TickScheduler()
+    Description:
+        Keeps a min-heap of (deadline, feature) pairs. The window asks the scheduler how long
+        it may sleep (getTimeout()) and, once woken by a timeout, which features are due
+        (popDueFeatures()). Features are rescheduled using their own nextDeadline() method.
+    Attributes:
+        minTimeout: Smallest timeout in ms that will be handed to the window read.
+        maxTimeout: Largest timeout in ms that will be handed to the window read, None
+            allows the window to block until an event when nothing is scheduled.
+----------------------------------------------------------------------------------------------------------
+'''
+class TickScheduler():
+    def __init__(self, features=None, minTimeout=1, maxTimeout=None):
+        self.minTimeout = minTimeout
+        self.maxTimeout = maxTimeout
+        self._heap = []
+        self._entries = {}  # id(feature) -> heap entry, used to invalidate stale entries.
+        self._counter = itertools.count() # tie breaker so features are never compared.
+        now = time.time()
+        for f in (features or []):
+            self.schedule(f, now) # everything is due immediately so the first frame is drawn.
+
+    def schedule(self, feature, deadline):
+        '''Schedules a feature for an absolute deadline (epoch seconds). None unschedules it.'''
+        self.unschedule(feature)
+        if(deadline is None):
+            return
+        entry = [deadline, next(self._counter), feature, True]
+        self._entries[id(feature)] = entry
+        heapq.heappush(self._heap, entry)
+
+    def reschedule(self, feature, now=None):
+        '''Schedules a feature using its own nextDeadline() method.'''
+        now = time.time() if now is None else now
+        self.schedule(feature, feature.nextDeadline(now))
+
+    def unschedule(self, feature):
+        entry = self._entries.pop(id(feature), None)
+        if(entry):
+            entry[3] = False # lazily removed when it reaches the top of the heap.
+
+    def nextDeadline(self):
+        '''Returns the earliest pending deadline or None if nothing is scheduled.'''
+        while(self._heap and not(self._heap[0][3])):
+            heapq.heappop(self._heap)
+        return self._heap[0][0] if self._heap else None
+
+    def getTimeout(self, now=None):
+        '''Returns how many ms the window may sleep before the next feature is due.'''
+        deadline = self.nextDeadline()
+        if(deadline is None):
+            return self.maxTimeout
+        now = time.time() if now is None else now
+        timeout = max(self.minTimeout, math.ceil((deadline - now) * 1000))
+        if(self.maxTimeout is not None):
+            timeout = min(timeout, self.maxTimeout)
+        return timeout
+
+    def popDueFeatures(self, now=None):
+        '''Removes and returns every feature whose deadline has passed.'''
+        now = time.time() if now is None else now
+        due = []
+        while(self._heap and (self._heap[0][0] <= now or not(self._heap[0][3]))):
+            entry = heapq.heappop(self._heap)
+            if(entry[3]):
+                del self._entries[id(entry[2])]
+                due.append(entry[2])
+        return due
@@ -0,0 +1,289 @@
+#!/usr/bin/python3
+# -*- coding: utf-8 -*-
+
+#=========================================================================
+#	TimeSeries.py
+#	Author: Raul Rojas
+#	Contact: rrojas994@gmail.com
+#	Description:
+#		Fixed memory history of sampled values (outdoor temperature, probe
+#       latency, ...). Every series keeps ring buffers at several
+#       resolutions (1 second, 1 minute and 1 hour by default) holding the
+#       min, max, sum and count of each time bucket, so a day or a month
+#       of history can be drawn without keeping every sample. Buffers are
+#       flat arrays that live in a memory mapped file, a sample only
+#       touches the few bytes of its buckets and history survives a
+#       restart. numpy is used for reading when it is installed.
+#=========================================================================
+
+import math
+import mmap
+import os
+import struct
+import threading
+import time
+np = None # numpy, imported on the first read so it does not slow down booting.
+_numpyChecked = False
+
+# (resolution seconds, number of buckets)
+DEFAULT_LEVELS = ((1, 3600), (60, 1440), (3600, 24 * 90))
+
+_magic = b'DCTS'
+_fileVersion = 1
+_headerFormat = '<4sII' # magic, version, number of levels
+_levelFormat = '<qq'    # resolution, capacity
+_columns = ('bucket', 'count', 'sum', 'min', 'max')
+_columnTypes = {'bucket': 'q', 'count': 'q', 'sum': 'd', 'min': 'd', 'max': 'd'} # all 8 bytes wide.
+_seriesDir = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'History') # next to the app, not the working directory.
+_series = dict()
+_seriesLock = threading.Lock()
+
+#------------------------------------------------------------
+#	_getNumpy()
+#		Description: Returns the numpy module or None when it is
+#           not installed, everything works without it.
+#------------------------------------------------------------
+def _getNumpy():
+    global np, _numpyChecked
+    if(not(_numpyChecked)):
+        _numpyChecked = True
+        try:
+            import numpy as np
+        except ImportError:
+            np = None
+    return np
+
+#------------------------------------------------------------
+#	class SeriesLevel()
+#		Description: One ring buffer of a series. Every column
+#           is a typed memoryview over the series' buffer, the
+#           bucket column holds the bucket number (time //
+#           resolution) a slot was last used for so old slots
+#           are recognised without clearing them.
+#------------------------------------------------------------
+class SeriesLevel():
+    def __init__(self, resolution, capacity, buffer, offset):
+        self.resolution = resolution
+        self.capacity = capacity
+        self.views = dict()
+        for name in _columns:
+            self.views[name] = buffer[offset:offset + capacity * 8].cast(_columnTypes[name])
+            offset += capacity * 8
+        self.end = offset
+
+    @staticmethod
+    def size(capacity):
+        return capacity * 8 * len(_columns)
+
+    def add(self, value, t):
+        bucket = int(t // self.resolution)
+        slot = bucket % self.capacity
+        v = self.views
+        if(v['bucket'][slot] != bucket or v['count'][slot] == 0): # slot holds an older bucket, reuse it.
+            v['bucket'][slot] = bucket
+            v['count'][slot] = 1
+            v['sum'][slot] = value
+            v['min'][slot] = value
+            v['max'][slot] = value
+        else:
+            v['count'][slot] += 1
+            v['sum'][slot] += value
+            if(value < v['min'][slot]):
+                v['min'][slot] = value
+            if(value > v['max'][slot]):
+                v['max'][slot] = value
+
+    def read(self, firstBucket, count):
+        '''Returns (mins, maxs, means) of "count" buckets from firstBucket, missing buckets are nan.'''
+        np = _getNumpy()
+        if(np is not None):
+            buckets = np.arange(firstBucket, firstBucket + count, dtype=np.int64)
+            slots = buckets % self.capacity
+            counts = np.frombuffer(self.views['count'], dtype=np.int64)[slots]
+            valid = (np.frombuffer(self.views['bucket'], dtype=np.int64)[slots] == buckets) & (counts > 0)
+            nan = np.nan
+            mins = np.where(valid, np.frombuffer(self.views['min'], dtype=np.float64)[slots], nan)
+            maxs = np.where(valid, np.frombuffer(self.views['max'], dtype=np.float64)[slots], nan)
+            sums = np.frombuffer(self.views['sum'], dtype=np.float64)[slots]
+            means = np.where(valid, sums / np.where(valid, counts, 1), nan)
+            return mins, maxs, means
+        mins, maxs, means = [], [], []
+        v = self.views
+        for bucket in range(firstBucket, firstBucket + count):
+            slot = bucket % self.capacity
+            if(v['bucket'][slot] == bucket and v['count'][slot] > 0):
+                mins.append(v['min'][slot])
+                maxs.append(v['max'][slot])
+                means.append(v['sum'][slot] / v['count'][slot])
+            else:
+                mins.append(math.nan)
+                maxs.append(math.nan)
+                means.append(math.nan)
+        return mins, maxs, means
+
+    def release(self):
+        for view in self.views.values():
+            view.release()
+        self.views = dict()
+
+
+'''
+----------------------------------------------------------------------------------------------------------
+    class Series()
+    Description:
+        History of one value at every resolution in "levels". Memory use is fixed: 40 bytes per
+        bucket plus a small header (288,060 bytes for the 7200 buckets of DEFAULT_LEVELS) no
+        matter how long it runs. With a path
+        the buffers are a memory mapped file, writes go straight to the mapped pages and the
+        kernel writes them back, nothing is ever rewritten as a whole. A file made with other
+        levels is started over.
+        Example:
+            temperature = Series('History/weather.temperature.ts')
+            temperature.add(79.0)
+            start, resolution, mins, maxs, means = temperature.getRange(24 * 3600)
+    Attributes:
+        levels: List of SeriesLevel, finest resolution first.
+        lastValue: Last value added since the series was opened, None before that.
+----------------------------------------------------------------------------------------------------------
+'''
+class Series():
+    def __init__(self, path=None, levels=DEFAULT_LEVELS):
+        self.path = path
+        self.lastValue = None
+        self.lastTime = None
+        self._lock = threading.Lock()
+        self._file = None
+        self._mmap = None
+        header = struct.pack(_headerFormat, _magic, _fileVersion, len(levels))
+        header += b''.join(struct.pack(_levelFormat, r, c) for r, c in levels)
+        size = len(header) + sum(SeriesLevel.size(c) for _, c in levels)
+        if(path):
+            self._buffer = self._openFile(path, header, size)
+        else:
+            self._buffer = bytearray(size)
+            self._buffer[:len(header)] = header
+        view = memoryview(self._buffer)
+        self._view = view
+        self.levels = []
+        offset = len(header)
+        for resolution, capacity in levels:
+            level = SeriesLevel(resolution, capacity, view, offset)
+            offset = level.end
+            self.levels.append(level)
+
+    def _openFile(self, path, header, size):
+        directory = os.path.dirname(path)
+        if(directory):
+            os.makedirs(directory, exist_ok=True)
+        self._file = os.fdopen(os.open(path, os.O_RDWR | os.O_CREAT, 0o644), 'r+b')
+        if(self._file.read(len(header)) != header or os.fstat(self._file.fileno()).st_size != size):
+            self._file.truncate(0) # missing, damaged or made with other levels, start over.
+            self._file.truncate(size)
+            self._file.seek(0)
+            self._file.write(header)
+            self._file.flush()
+        self._mmap = mmap.mmap(self._file.fileno(), size)
+        return self._mmap
+
+    def add(self, value, t=None):
+        '''Adds a sample, t defaults to now. None and nan are ignored (a gap in the history).'''
+        if(value is None or value != value):
+            return
+        t = time.time() if t is None else t
+        with self._lock:
+            for level in self.levels:
+                level.add(float(value), t)
+            self.lastValue = value
+            self.lastTime = t
+
+    def getLevel(self, seconds):
+        '''Returns the finest level that holds "seconds" of history, or the coarsest one.'''
+        for level in self.levels:
+            if(level.resolution * level.capacity >= seconds):
+                return level
+        return self.levels[-1]
+
+    def getRange(self, seconds, end=None):
+        '''
+        Returns (start, resolution, mins, maxs, means) covering the last "seconds" before "end"
+        (now by default) at the finest level holding that much. The lists are numpy arrays when
+        numpy is installed. Buckets without samples are nan.
+        '''
+        end = time.time() if end is None else end
+        level = self.getLevel(seconds)
+        count = min(level.capacity, max(1, int(math.ceil(seconds / level.resolution))))
+        lastBucket = int(end // level.resolution)
+        firstBucket = lastBucket - count + 1
+        with self._lock:
+            mins, maxs, means = level.read(firstBucket, count)
+        return firstBucket * level.resolution, level.resolution, mins, maxs, means
+
+    def flush(self):
+        if(self._mmap is not None):
+            self._mmap.flush()
+
+    def close(self):
+        with self._lock:
+            for level in self.levels:
+                level.release()
+            self.levels = []
+            self._view.release()
+            if(self._mmap is not None):
+                self._mmap.close()
+                self._mmap = None
+            if(self._file is not None):
+                self._file.close()
+                self._file = None
+
+
+#------------------------------------------------------------
+#	minMaxBuckets()
+#		Description: Reduces a series to at most "width"
+#           columns, keeping the min and max of the points
+#           each column covers so spikes are not averaged
+#           away. Returns (mins, maxs), nan where a column has
+#           no data.
+#------------------------------------------------------------
+def minMaxBuckets(mins, maxs, width):
+    count = len(mins)
+    if(count <= width):
+        return list(mins), list(maxs)
+    np = _getNumpy()
+    if(np is not None):
+        perColumn = int(math.ceil(count / width))
+        padded = perColumn * width
+        columns = lambda a: np.concatenate([np.asarray(a, dtype=np.float64), np.full(padded - count, np.nan)]).reshape(width, perColumn)
+        # fmin/fmax skip nan and give nan only when the whole column is nan.
+        return list(np.fmin.reduce(columns(mins), axis=1)), list(np.fmax.reduce(columns(maxs), axis=1))
+    colMins, colMaxs = [], []
+    for c in range(width):
+        lo = [v for v in mins[c * count // width:(c + 1) * count // width] if v == v]
+        hi = [v for v in maxs[c * count // width:(c + 1) * count // width] if v == v]
+        colMins.append(min(lo) if lo else math.nan)
+        colMaxs.append(max(hi) if hi else math.nan)
+    return colMins, colMaxs
+
+#------------------------------------------------------------
+#	getSeries()
+#		Description: Returns the series shared by the app for
+#           a name (e.g. "weather.temperature"), opening its
+#           file in the History directory on first use.
+#------------------------------------------------------------
+def getSeries(name, persist=True):
+    with _seriesLock:
+        series = _series.get(name)
+        if(series is None):
+            series = Series(os.path.join(_seriesDir, name + '.ts') if persist else None)
+            _series[name] = series
+    return series
+
+#------------------------------------------------------------
+#	closeAll()
+#		Description: Flushes and closes every shared series.
+#------------------------------------------------------------
+def closeAll():
+    with _seriesLock:
+        for series in _series.values():
+            series.flush()
+            series.close()
+        _series.clear()
@@ -10,6 +10,11 @@
 #=========================================================================
 
 import time
+from datetime import datetime
+try:
+    import zoneinfo
+except ImportError: # python < 3.9
+    zoneinfo = None
 
 #------------------------------------------------------------
 #	getTime()
@@ -43,13 +48,197 @@ def getTimeZone():
 #           to your local time. 
 #------------------------------------------------------------
 def adjustHourRelLocal(adjustFromLocal=0, inputHour=None):
-    t = time.localtime(time.time())
-    tHour = t.tm_hour if inputHour == None else inputHour
-    hour = tHour + adjustFromLocal
-    hour = hour + 24 if hour < 1 else hour
-    hour = 0 if hour == 24 else hour
-    return hour
-    
+    tHour = time.localtime(time.time()).tm_hour if inputHour is None else inputHour # only read the clock when needed.
+    return (tHour + adjustFromLocal) % 24
+
+#------------------------------------------------------------
+#	formatClock()
+#		Description: Returns ("h:mm", "h mm", "AM"/"PM") for a
+#           24 hour clock hour and minute. The second string is
+#           the blinking (no colon) version of the first.
+#------------------------------------------------------------
+def formatClock(hour24, minute, militaryTime=False):
+    ampm = 'PM' if hour24 >= 12 else 'AM'
+    hour = hour24 - 12 if hour24 > 12 and not(militaryTime) else hour24
+    hour = 12 if hour == 0 and not(militaryTime) else hour
+    return ('{0}:{1:0>2d}'.format(hour, minute), '{0} {1:0>2d}'.format(hour, minute), ampm)
+
+'''
+----------------------------------------------------------------------------------------------------------
+    class ZoneOffsetCache()
+    Description:
+        UTC offset of an IANA time zone (e.g. "America/New_York"), cached until the zone's
+        next transition (DST change). The transition is found once by stepping a day at a
+        time and bisecting down to the second, after that getOffset() is a comparison.
+    Attributes:
+        name: IANA zone name.
+        offset: UTC offset in seconds valid until "validUntil".
+        abbreviation: Zone abbreviation valid until "validUntil" (e.g. "EDT").
+----------------------------------------------------------------------------------------------------------
+'''
+class ZoneOffsetCache():
+    searchDays = 400 # zones without a transition in this many days are re-checked after that.
+
+    def __init__(self, name):
+        if(zoneinfo is None):
+            raise ImportError('Time zones need the zoneinfo module (python 3.9 or newer).')
+        self.name = name
+        self.zone = zoneinfo.ZoneInfo(name)
+        self.offset = 0
+        self.abbreviation = ''
+        self.validFrom = 0
+        self.validUntil = -1
+
+    def _offsetAt(self, epoch):
+        dt = datetime.fromtimestamp(epoch, self.zone)
+        return (int(dt.utcoffset().total_seconds()), dt.tzname())
+
+    def _refresh(self, epoch):
+        self.offset, self.abbreviation = self._offsetAt(epoch)
+        before = epoch
+        after = None
+        for _ in range(self.searchDays):
+            probe = before + 86400
+            if(self._offsetAt(probe) != (self.offset, self.abbreviation)):
+                after = probe
+                break
+            before = probe
+        if(after is None):
+            self.validUntil = before
+        else:
+            while(after - before > 1): # bisect to the first second of the new offset.
+                middle = (before + after) // 2
+                if(self._offsetAt(middle) == (self.offset, self.abbreviation)):
+                    before = middle
+                else:
+                    after = middle
+            self.validUntil = after
+        self.validFrom = epoch
+
+    def getOffset(self, epoch):
+        '''Returns (offset seconds, abbreviation) for an integer epoch.'''
+        if(not(self.validFrom <= epoch < self.validUntil)):
+            self._refresh(epoch)
+        return (self.offset, self.abbreviation)
+
+'''
+----------------------------------------------------------------------------------------------------------
+    class WorldClockEngine()
+    Description:
+        Keeps a ZoneOffsetCache for every zone a clock registered and computes the local hour
+        and minute of all of them in one pass per second (one addition and a divmod per zone).
+----------------------------------------------------------------------------------------------------------
+'''
+class WorldClockEngine():
+    def __init__(self):
+        self.zones = dict() # zone name -> ZoneOffsetCache
+
+    def registerZone(self, name):
+        if(name not in self.zones):
+            self.zones[name] = ZoneOffsetCache(name)
+        return self.zones[name]
+
+    def computeZone(self, name, second):
+        '''Returns (hour, minute, abbreviation) of one zone for an integer epoch.'''
+        offset, abbreviation = self.registerZone(name).getOffset(second)
+        minutes = ((second + offset) // 60) % 1440
+        return (minutes // 60, minutes % 60, abbreviation)
+
+    def computeAll(self, second):
+        '''Returns {zone name: (hour, minute, abbreviation)} for every registered zone.'''
+        return {name: self.computeZone(name, second) for name in self.zones}
+
+_worldClock = WorldClockEngine()
+
+#------------------------------------------------------------
+#	registerZone()
+#		Description: Registers an IANA time zone with the
+#           shared world clock so it is computed with the
+#           others every second. Raises an exception for
+#           unknown zones.
+#------------------------------------------------------------
+def registerZone(name):
+    return _worldClock.registerZone(name)
+
+'''
+----------------------------------------------------------------------------------------------------------
+    class TimeSnapshot()
+    Description:
+        Everything a clock feature needs to know about the current second, computed once and
+        shared by every clock on screen. Use getSnapshot() instead of creating these directly.
+        The local time strings are built when the snapshot is created, strings for other hour
+        adjustments are built the first time a clock asks for them and reused by the rest.
+    Attributes:
+        epoch: time.time() the snapshot was taken at.
+        second: int(epoch), the snapshot is valid for this whole second.
+        local: time.struct_time of the local time.
+        blinkOn: True on even seconds, when a blinking clock shows its colon.
+----------------------------------------------------------------------------------------------------------
+'''
+class TimeSnapshot():
+    __slots__ = ('epoch', 'second', 'local', 'blinkOn', '_clocks', '_zones')
+
+    def __init__(self, epoch):
+        self.epoch = epoch
+        self.second = int(epoch)
+        self.local = time.localtime(self.second)
+        self.blinkOn = self.local.tm_sec % 2 == 0
+        self._clocks = dict() # (militaryTime, adjust or zone name) -> (colon text, blink text, ampm)
+        self._zones = None    # zone name -> (hour, minute, abbreviation), computed for all zones at once.
+        self.getClock(False)
+        self.getClock(True)
+
+    def getClock(self, militaryTime=False, adjust=0):
+        '''Returns ("h:mm", "h mm", "AM"/"PM") for the local time adjusted by "adjust" hours.'''
+        key = (militaryTime, adjust)
+        clock = self._clocks.get(key)
+        if(clock is None):
+            tHour = adjustHourRelLocal(adjustFromLocal=adjust, inputHour=self.local.tm_hour)
+            clock = formatClock(tHour, self.local.tm_min, militaryTime)
+            self._clocks[key] = clock
+        return clock
+
+    def getClockText(self, militaryTime=False, blink=True, adjust=0):
+        '''Returns the (text, ampm) pair a clock should display this second.'''
+        colon, blank, ampm = self.getClock(militaryTime, adjust)
+        return (blank if blink and not(self.blinkOn) else colon, ampm)
+
+    def getZone(self, zoneName):
+        '''Returns (hour, minute, abbreviation) of an IANA time zone this second.'''
+        if(self._zones is None):
+            self._zones = _worldClock.computeAll(self.second) # one batched pass for every zone on screen.
+        zone = self._zones.get(zoneName)
+        if(zone is None): # zone registered after the batch ran.
+            zone = _worldClock.computeZone(zoneName, self.second)
+            self._zones[zoneName] = zone
+        return zone
+
+    def getZoneClockText(self, zoneName, militaryTime=False, blink=True):
+        '''Returns the (text, ampm, abbreviation) a clock showing an IANA time zone should display.'''
+        key = (militaryTime, zoneName)
+        clock = self._clocks.get(key)
+        hour, minute, abbreviation = self.getZone(zoneName)
+        if(clock is None):
+            clock = formatClock(hour, minute, militaryTime)
+            self._clocks[key] = clock
+        colon, blank, ampm = clock
+        return (blank if blink and not(self.blinkOn) else colon, ampm, abbreviation)
+
+_snapshot = None
+
+#------------------------------------------------------------
+#	getSnapshot()
+#		Description: Returns the TimeSnapshot of the current
+#           second. Only the first call in a second does any
+#           work, every other clock gets the same object.
+#------------------------------------------------------------
+def getSnapshot(now=None):
+    global _snapshot
+    now = time.time() if now is None else now
+    if(_snapshot is None or _snapshot.second != int(now)):
+        _snapshot = TimeSnapshot(now)
+    return _snapshot
+
 
 if __name__ == "__main__":
     pass
\ No newline at end of file
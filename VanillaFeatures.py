@@ -2,17 +2,20 @@
 # -*- coding: utf-8 -*-
 import FeatureBlock
 import PySimpleGUI as sg 
-import DeskClockSettings
 import time
 import TimeUtils
 
 class Clock(FeatureBlock.FeatureBlock):
-    def __init__(self, posRow, posCol, font=('Everson Mono', 16), militaryTime=False, blink=True, timeAdjust=0):
+    def __init__(self, posRow, posCol, font=('Everson Mono', 16), militaryTime=False, blink=True, timeAdjust=0, timeZone=None):
+        '''timeZone: IANA time zone name (e.g. "Europe/London") to show instead of local time, overrides timeAdjust.'''
         self.clockFont = font
         self.militaryTime = militaryTime
         self.prevTime = int(time.time())
         self.blink = blink
         self.timeAdjust = timeAdjust
+        self.timeZone = timeZone
+        if(timeZone):
+            TimeUtils.registerZone(timeZone) # computed with every other zone once per second.
         super().__init__(posRow = posRow, posCol = posCol)
 
     def getFeatureDescription(self):
@@ -28,6 +31,7 @@ class Clock(FeatureBlock.FeatureBlock):
         return keys
 
     def getFeatureColumn(self):
+        self.prevTime = None # a new element has to be drawn.
         layout = [[
             sg.Text('00:00', key=self.safeKeys['time'], font=(self.clockFont[0], 64), pad=((0,0), (0,0))),
             sg.Column(element_justification='center', key=self.safeKeys['timeSpecs'], pad=(10,0), layout=[
@@ -38,16 +42,16 @@ class Clock(FeatureBlock.FeatureBlock):
         return sg.Column(layout=layout, element_justification='center', pad=(30,10))
 
     def update(self, window):
-        if(int(time.time()) != self.prevTime):
-            t, ampm = TimeUtils.getTime(militaryTime=self.militaryTime, adjust=self.timeAdjust)
-            tSplit = t.split(':')
-            if(self.blink):
-                t = ':'.join(tSplit[:2]) if int(tSplit[-1]) % 2 == 0 else ' '.join(tSplit[:2])
+        snapshot = TimeUtils.getSnapshot() # shared by every clock, computed once per second.
+        if(snapshot.second != self.prevTime):
+            if(self.timeZone):
+                t, ampm, zone = snapshot.getZoneClockText(self.timeZone, militaryTime=self.militaryTime, blink=self.blink)
+                window[self.safeKeys['timeZone']].update(zone)
             else:
-                t = tSplit[:2]
-            window[self.safeKeys['time']].update(str(':'.join(t.split(':')[:2])))
-            window[self.safeKeys['ampm']].update(str(ampm))
-            self.prevTime = int(time.time())
+                t, ampm = snapshot.getClockText(militaryTime=self.militaryTime, blink=self.blink, adjust=self.timeAdjust)
+            window[self.safeKeys['time']].update(t)
+            window[self.safeKeys['ampm']].update(ampm)
+            self.prevTime = snapshot.second
 
     def events(self, event, value, window):
         pass
@@ -75,6 +79,7 @@ class Clock2(FeatureBlock.FeatureBlock):
         return "Simple clock 2."
 
     def getFeatureColumn(self):
+        self.prevTime = None # a new element has to be drawn.
         layout = [[
             sg.Text('00:00', key=self.safeKeys['time'], font=(self.clockFont[0], 64), pad=((0,0), (0,0))),
             sg.Column(element_justification='center', key=self.safeKeys['timeSpecs'], pad=(10,0), layout=[
@@ -85,16 +90,376 @@ class Clock2(FeatureBlock.FeatureBlock):
         return sg.Column(layout=layout, element_justification='center', pad=(30,10))
 
     def update(self, window):
-        if(int(time.time()) != self.prevTime):
-            t, ampm = TimeUtils.getTime(militaryTime=self.militaryTime, adjust=self.timeAdjust)
-            tSplit = t.split(':')
-            if(self.blink):
-                t = ':'.join(tSplit[:2]) if int(tSplit[-1]) % 2 == 0 else ' '.join(tSplit[:2])
+        snapshot = TimeUtils.getSnapshot() # shared by every clock, computed once per second.
+        if(snapshot.second != self.prevTime):
+            t, ampm = snapshot.getClockText(militaryTime=self.militaryTime, blink=self.blink, adjust=self.timeAdjust)
+            window[self.safeKeys['time']].update(t)
+            window[self.safeKeys['ampm']].update(ampm)
+            self.prevTime = snapshot.second
+
+    def events(self, event, value, window):
+        pass
+
+
+class WorldClock(FeatureBlock.FeatureBlock):
+    updateInterval = 60 # only hours and minutes are shown.
+
+    def __init__(self, posRow, posCol, font=('Everson Mono', 16), militaryTime=False,
+            zones=('America/Los_Angeles', 'America/New_York', 'Europe/London', 'Asia/Tokyo')):
+        '''zones: IANA time zone names to show, one per row.'''
+        self.clockFont = font
+        self.militaryTime = militaryTime
+        self.zones = list(zones)
+        self.prevTime = None
+        for zone in self.zones:
+            TimeUtils.registerZone(zone)
+        super().__init__(posRow = posRow, posCol = posCol)
+
+    def getFeatureDescription(self):
+        return "World clock showing several time zones."
+
+    def myFeaturesKeys(self):
+        keys = dict()
+        for i in range(len(self.zones)):
+            keys[f'time{i}'] = f'-text.WorldClock.time{i}-'
+            keys[f'zone{i}'] = f'-text.WorldClock.zone{i}-'
+        return keys
+
+    def getFeatureColumn(self):
+        self.prevTime = None # a new element has to be drawn.
+        layout = []
+        for i, zone in enumerate(self.zones):
+            city = zone.split('/')[-1].replace('_', ' ')
+            layout.append([
+                sg.Text(city, font=(self.clockFont[0], 12), size=(14, 1)),
+                sg.Text('--:--', key=self.safeKeys[f'time{i}'], font=(self.clockFont[0], 20), size=(8, 1)),
+                sg.Text('', key=self.safeKeys[f'zone{i}'], font=(self.clockFont[0], 10), size=(6, 1))
+            ])
+        return sg.Column(layout=layout, pad=(30,10))
+
+    def update(self, window):
+        snapshot = TimeUtils.getSnapshot()
+        if(snapshot.second // 60 != self.prevTime): # only the minutes are shown.
+            for i, zone in enumerate(self.zones):
+                t, ampm, abbreviation = snapshot.getZoneClockText(zone, militaryTime=self.militaryTime, blink=False)
+                window[self.safeKeys[f'time{i}']].update(t if self.militaryTime else f'{t} {ampm}')
+                window[self.safeKeys[f'zone{i}']].update(abbreviation)
+            self.prevTime = snapshot.second // 60
+
+    def events(self, event, value, window):
+        pass
+
+
+class Stopwatch(FeatureBlock.FeatureBlock):
+    def __init__(self, posRow, posCol, font=('Everson Mono', 16), refreshRate=30, resolution=10, countdown=0, autoStart=False):
+        '''
+        refreshRate: redraws per second while running (20 - 60 is reasonable).
+        resolution: 10 shows tenths, 100 shows hundredths of a second.
+        countdown: seconds to count down from, 0 makes it a stopwatch.
+        '''
+        self.clockFont = font
+        self.refreshRate = refreshRate
+        self.resolution = resolution
+        self.countdownNs = int(countdown * 1e9)
+        self.running = False
+        self.startNs = 0    # time.monotonic_ns() when last started.
+        self.elapsedNs = 0  # time accumulated before the last start.
+        super().__init__(posRow = posRow, posCol = posCol)
+        if(autoStart):
+            self.start()
+
+    def getFeatureDescription(self):
+        return "Stopwatch or countdown timer showing tenths or hundredths of a second."
+
+    def myFeaturesKeys(self):
+        keys = {
+            'display': '-text.Stopwatch.display-',
+            'startStop': '-button.Stopwatch.startStop-',
+            'reset': '-button.Stopwatch.reset-'
+        }
+        return keys
+
+    def getFeatureColumn(self):
+        layout = [
+            [sg.Text(self.formatTime(self.getDisplayNs()), key=self.safeKeys['display'], font=(self.clockFont[0], 48), pad=((0,0), (0,0)))],
+            [sg.Button('Start', key=self.safeKeys['startStop'], size=(8,1)), sg.Button('Reset', key=self.safeKeys['reset'], size=(8,1))]
+        ]
+        return sg.Column(layout=layout, element_justification='center', pad=(30,10))
+
+    def getElapsedNs(self):
+        '''Time measured so far, always derived from the monotonic clock so it never drifts.'''
+        if(self.running):
+            return self.elapsedNs + time.monotonic_ns() - self.startNs
+        return self.elapsedNs
+
+    def getDisplayNs(self):
+        if(self.countdownNs):
+            return max(0, self.countdownNs - self.getElapsedNs())
+        return self.getElapsedNs()
+
+    def formatTime(self, ns):
+        digits = 2 if self.resolution >= 100 else 1
+        fraction = ns // (10 ** (9 - digits))
+        seconds, fraction = divmod(fraction, 10 ** digits)
+        minutes, seconds = divmod(seconds, 60)
+        hours, minutes = divmod(minutes, 60)
+        if(hours):
+            return '{}:{:0>2d}:{:0>2d}.{:0>{}d}'.format(hours, minutes, seconds, fraction, digits)
+        return '{}:{:0>2d}.{:0>{}d}'.format(minutes, seconds, fraction, digits)
+
+    def start(self):
+        if(not(self.running)):
+            self.startNs = time.monotonic_ns()
+            self.running = True
+            self.requestUpdate()
+
+    def stop(self):
+        if(self.running):
+            self.elapsedNs = self.getElapsedNs()
+            self.running = False
+            self.requestUpdate() # draw the exact stopping time.
+
+    def reset(self):
+        self.elapsedNs = 0
+        self.startNs = time.monotonic_ns()
+        self.requestUpdate()
+
+    def nextDeadline(self, now):
+        if(not(self.running)):
+            return None # nothing changes until a button is pressed.
+        period = 1 / self.refreshRate
+        return (now // period + 1) * period
+
+    def update(self, window):
+        displayNs = self.getDisplayNs()
+        if(self.countdownNs and displayNs == 0):
+            self.stop()
+        window[self.safeKeys['display']].update(self.formatTime(displayNs))
+        window[self.safeKeys['startStop']].update(text='Stop' if self.running else 'Start')
+
+    def events(self, event, value, window):
+        if(event == self.safeKeys['startStop']):
+            if(self.running):
+                self.stop()
             else:
-                t = tSplit[:2]
-            window[self.safeKeys['time']].update(str(':'.join(t.split(':')[:2])))
-            window[self.safeKeys['ampm']].update(str(ampm))
-            self.prevTime = int(time.time())
+                self.start()
+        elif(event == self.safeKeys['reset']):
+            self.reset()
+
+
+class NetworkStatus(FeatureBlock.FeatureBlock):
+    def __init__(self, posRow, posCol, font=('Everson Mono', 16)):
+        self.clockFont = font
+        self.changed = True # draw on the first update.
+        super().__init__(posRow = posRow, posCol = posCol)
+
+    def onAttach(self):
+        import NetworkingUtils # imported on first use so layouts without this feature do not load it.
+        NetworkingUtils.getInterfaceMonitor().addListener(self.onInterfacesChanged)
+
+    def onDetach(self):
+        import NetworkingUtils
+        NetworkingUtils.getInterfaceMonitor().removeListener(self.onInterfacesChanged)
+
+    def onShow(self):
+        self.changed = True # interfaces may have changed while hidden, nothing was polled.
+
+    def getFeatureDescription(self):
+        return "Network interfaces and their IP addresses."
+
+    def myFeaturesKeys(self):
+        keys = {
+            'interfaces': '-text.NetworkStatus.interfaces-'
+        }
+        return keys
+
+    def getFeatureColumn(self):
+        self.changed = True # a new element has to be drawn even if nothing changed.
+        layout = [[sg.Text('', key=self.safeKeys['interfaces'], font=(self.clockFont[0], 12), size=(30, 4))]]
+        return sg.Column(layout=layout, pad=(30,10))
+
+    def onInterfacesChanged(self, changes, interfaces):
+        self.changed = True
+
+    def update(self, window):
+        import NetworkingUtils
+        monitor = NetworkingUtils.getInterfaceMonitor()
+        monitor.poll() # a few ioctls, listeners only run when something changed.
+        if(self.changed):
+            lines = []
+            for name, info in monitor.interfaces.items():
+                if(info.isLoopback):
+                    continue
+                state = info.address if info.address else ('up' if info.isRunning else 'down')
+                lines.append('{:<8} {}'.format(name, state))
+            window[self.safeKeys['interfaces']].update('\n'.join(lines))
+            self.changed = False
+
+    def events(self, event, value, window):
+        pass
+
+
+class Weather(FeatureBlock.FeatureBlock):
+    updateInterval = 60 # reads the WeatherService cache and starts its refresh when one is due.
+
+    def __init__(self, posRow, posCol, font=('Everson Mono', 16)):
+        self.clockFont = font
+        self.prevConditions = False # never a state, forces the first draw.
+        super().__init__(posRow = posRow, posCol = posCol)
+
+    def getFeatureDescription(self):
+        return "Current outdoor temperature and conditions."
+
+    def myFeaturesKeys(self):
+        keys = {
+            'temperature': '-text.Weather.temperature-',
+            'phrase': '-text.Weather.phrase-',
+            'status': '-text.Weather.status-'
+        }
+        return keys
+
+    def getFeatureColumn(self):
+        self.prevConditions = False # a new element has to be drawn.
+        layout = [
+            [sg.Text('--°', key=self.safeKeys['temperature'], font=(self.clockFont[0], 48))],
+            [sg.Text('', key=self.safeKeys['phrase'], font=(self.clockFont[0], 12), size=(20, 1))],
+            [sg.Text('', key=self.safeKeys['status'], font=(self.clockFont[0], 10), size=(20, 1))]
+        ]
+        return sg.Column(layout=layout, element_justification='center', pad=(30,10))
+
+    def onDetach(self):
+        import WeatherUtils
+        WeatherUtils.getWeatherService().release() # the refresh job is cancelled by detach().
+
+    def update(self, window):
+        import WeatherUtils # imported on first use so layouts without this feature do not load it.
+        service = WeatherUtils.getWeatherService()
+        if(service.isDue()):
+            self.submitJob('weather.refresh', service.refresh, timeout=service.timeout * 2)
+        conditions = service.get()
+        state = (conditions.temperature, conditions.phrase, conditions.stale) if conditions else None
+        if(state != self.prevConditions):
+            if(conditions):
+                window[self.safeKeys['temperature']].update(conditions.temperature)
+                window[self.safeKeys['phrase']].update(conditions.phrase or '')
+                status = time.strftime('offline, from %H:%M', time.localtime(conditions.fetchedAt)) if conditions.stale else ''
+                window[self.safeKeys['status']].update(status)
+            else:
+                window[self.safeKeys['status']].update('waiting for data')
+            self.prevConditions = state
+
+    def events(self, event, value, window):
+        if(self.isJobResult(event)):
+            self.requestUpdate() # a refresh finished, draw it now.
+
+
+class Sparkline(FeatureBlock.FeatureBlock):
+    def __init__(self, posRow, posCol, font=('Everson Mono', 16), series='weather.temperature', title='Outdoor',
+            seconds=24 * 3600, width=160, height=40, units='°'):
+        '''
+        series: TimeSeries name to draw, e.g. "weather.temperature" or "latency.eth0".
+        seconds: How much history is drawn across the width.
+        '''
+        self.clockFont = font
+        self.seriesName = series
+        self.title = title
+        self.seconds = seconds
+        self.width = width
+        self.height = height
+        self.units = units
+        import TimeSeries # imported on first use so layouts without this feature do not load it.
+        self.updateInterval = TimeSeries.getSeries(series).getLevel(seconds).resolution # one bucket per update.
+        self.drawn = None
+        super().__init__(posRow = posRow, posCol = posCol)
+
+    def getFeatureDescription(self):
+        return "Small graph of the recent history of a value (outdoor temperature, latency)."
+
+    def myFeaturesKeys(self):
+        keys = {
+            'title': '-text.Sparkline.title-',
+            'graph': '-graph.Sparkline.graph-',
+            'range': '-text.Sparkline.range-'
+        }
+        return keys
+
+    def getFeatureColumn(self):
+        self.drawn = None # a new element has to be drawn.
+        layout = [
+            [sg.Text(self.title, key=self.safeKeys['title'], font=(self.clockFont[0], 12), size=(20, 1))],
+            [sg.Graph((self.width, self.height), (0, 0), (self.width, self.height), key=self.safeKeys['graph'])],
+            [sg.Text('', key=self.safeKeys['range'], font=(self.clockFont[0], 10), size=(20, 1))]
+        ]
+        return sg.Column(layout=layout, pad=(30,10))
+
+    def update(self, window):
+        import TimeSeries
+        series = TimeSeries.getSeries(self.seriesName)
+        start, resolution, mins, maxs, means = series.getRange(self.seconds)
+        state = (start, series.lastTime)
+        if(state == self.drawn):
+            return # no new bucket and no new sample.
+        colMins, colMaxs = TimeSeries.minMaxBuckets(mins, maxs, self.width)
+        values = [v for v in colMins + colMaxs if v == v]
+        graph = window[self.safeKeys['graph']]
+        graph.erase()
+        if(values):
+            low, high = min(values), max(values)
+            scale = (self.height - 2) / (high - low) if high > low else 0
+            step = self.width / len(colMins)
+            for i, (lo, hi) in enumerate(zip(colMins, colMaxs)):
+                if(lo == lo): # nan columns are gaps.
+                    x = i * step
+                    graph.draw_line((x, 1 + (lo - low) * scale), (x, 1 + (hi - low) * scale + 1), color='white')
+            last = series.lastValue
+            title = '{} {:.0f}{}'.format(self.title, last, self.units) if last is not None else self.title
+            window[self.safeKeys['title']].update(title)
+            window[self.safeKeys['range']].update('{:.0f}{} - {:.0f}{}'.format(low, self.units, high, self.units))
+        self.drawn = state
+
+    def events(self, event, value, window):
+        pass
+
+
+class SystemHealth(FeatureBlock.FeatureBlock):
+    def __init__(self, posRow, posCol, font=('Everson Mono', 16)):
+        self.clockFont = font
+        super().__init__(posRow = posRow, posCol = posCol)
+
+    def getFeatureDescription(self):
+        return "CPU use and temperature, load, memory and throttling of this machine."
+
+    def myFeaturesKeys(self):
+        keys = {
+            'cpu': '-text.SystemHealth.cpu-',
+            'load': '-text.SystemHealth.load-',
+            'memory': '-text.SystemHealth.memory-',
+            'throttled': '-text.SystemHealth.throttled-'
+        }
+        return keys
+
+    def getFeatureColumn(self):
+        font = (self.clockFont[0], 12)
+        layout = [
+            [sg.Text('CPU', key=self.safeKeys['cpu'], font=font, size=(24, 1))],
+            [sg.Text('Load', key=self.safeKeys['load'], font=font, size=(24, 1))],
+            [sg.Text('Memory', key=self.safeKeys['memory'], font=font, size=(24, 1))],
+            [sg.Text('', key=self.safeKeys['throttled'], font=font, size=(24, 1), text_color='orange')]
+        ]
+        return sg.Column(layout=layout, pad=(30,10))
+
+    def update(self, window):
+        import SysMetrics # imported on first use so layouts without this feature do not load it.
+        s = SysMetrics.getSampler().sample() # a few reads of already open files.
+        cpu = 'CPU {:>3.0f}%'.format(s.cpuPercent) if s.cpuPercent is not None else 'CPU --'
+        if(s.temperature is not None):
+            cpu += '  {:.1f}°C'.format(s.temperature)
+        window[self.safeKeys['cpu']].update(cpu)
+        if(s.load1 is not None):
+            window[self.safeKeys['load']].update('Load {:.2f} {:.2f} {:.2f}'.format(s.load1, s.load5, s.load15))
+        if(s.memPercent is not None):
+            window[self.safeKeys['memory']].update('Memory {:>3.0f}% of {:.1f}G'.format(s.memPercent, s.memTotal / 2**30))
+        window[self.safeKeys['throttled']].update(', '.join(s.getThrottledFlags()))
 
     def events(self, event, value, window):
         pass
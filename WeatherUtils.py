@@ -6,24 +6,230 @@
 #		Provides some weather data gathering utilities. 
 #=========================================================================
 
-import requests
-from bs4 import BeautifulSoup as bSoup 
-import _secrets
-secrets = _secrets.MySecrets()
+import json
+import os
+import re
+import threading
+import time
+import ScrapeUtils
+import TimeSeries
+secrets = None
+_weatherService = None
+
+# Current temperature of a weather.com "today" page.
+# <span data-testid="TemperatureValue" class="_-_-components-src-organism-CurrentConditions-CurrentConditions--tempValue--MHmYY">79°</span>
+temperatureExtractor = ScrapeUtils.Extractor('temperature',
+    ScrapeUtils.Regex(r'<span\b[^>]*data-testid="TemperatureValue"[^>]*>(.*?)</span>'),
+    ScrapeUtils.Tag('span', {'data-testid': 'TemperatureValue'}),
+    ScrapeUtils.Tag('span', {'class': re.compile(r'CurrentConditions--tempValue')}), # class names are hashed per build.
+    ScrapeUtils.Css('span[class*="tempValue"]', tags='span'))
+
+# Short description of the current conditions, e.g. "Partly Cloudy".
+phraseExtractor = ScrapeUtils.Extractor('phrase',
+    ScrapeUtils.Regex(r'<div\b[^>]*data-testid="wxPhrase"[^>]*>(.*?)</div>'),
+    ScrapeUtils.Tag('div', {'data-testid': 'wxPhrase'}),
+    ScrapeUtils.Tag('div', {'class': re.compile(r'CurrentConditions--phraseValue')}))
+
+#------------------------------------------------------------
+#	getSecrets()
+#		Description: Returns the private settings, imported on
+#           first use so this module can be imported without
+#           the _secrets file (e.g. by benchmarks).
+#------------------------------------------------------------
+def getSecrets():
+    global secrets
+    if(secrets is None):
+        import _secrets
+        secrets = _secrets.MySecrets()
+    return secrets
+
+#------------------------------------------------------------
+#	parseOutdoorTemp()
+#		Description: Returns the current temperature text of a
+#           weather page or None if it could not be found.
+#------------------------------------------------------------
+def parseOutdoorTemp(content):
+    return temperatureExtractor.extract(content)
+
+#------------------------------------------------------------
+#	class WeatherConditions()
+#		Description: Current conditions as scraped from the
+#           weather page. "stale" is set by the WeatherService
+#           when the value is older than it should be.
+#------------------------------------------------------------
+class WeatherConditions():
+    def __init__(self, temperature=None, phrase=None, fetchedAt=0, stale=False):
+        self.temperature = temperature  # text as shown on the page, e.g. "79°".
+        self.phrase = phrase
+        self.fetchedAt = fetchedAt
+        self.stale = stale
+
+    def getTemperatureValue(self):
+        '''Returns the temperature as a float or None if it is not a number.'''
+        m = re.search(r'-?\d+(\.\d+)?', self.temperature or '')
+        return float(m.group()) if m else None
+
+    def toDict(self):
+        return {'temperature': self.temperature, 'phrase': self.phrase, 'fetchedAt': self.fetchedAt}
+
+    def __repr__(self):
+        return str(self.__dict__)
+
+#------------------------------------------------------------
+#	parseConditions()
+#		Description: Creates a WeatherConditions object from a
+#           weather page. Returns None if the temperature cannot
+#           be found.
+#------------------------------------------------------------
+def parseConditions(content):
+    page = ScrapeUtils.decodePage(content)
+    temperature = temperatureExtractor.extract(page)
+    if(temperature is None):
+        return None
+    return WeatherConditions(temperature, phraseExtractor.extract(page), time.time())
+
+'''
+----------------------------------------------------------------------------------------------------------
+    class WeatherService()
+    Description:
+        Keeps the current conditions, refreshed every "interval" seconds, and shares them with
+        every weather feature, so features only ever read memory. The service has no thread of
+        its own: a feature checks isDue() and submits refresh() to the WorkerPool with
+        submitJob(), only one refresh runs at a time. The last good result is kept in a small
+        JSON file and served right away on boot. When a fetch fails the last good result is
+        still served, marked stale once it is older than "staleAfter" seconds, and the next
+        attempt backs off exponentially (retryDelay doubling up to maxBackoff). release() closes
+        the HTTP session when no feature needs it.
+    Attributes:
+        url: Page to scrape, None uses the weatherLink of _secrets. Point it at a local server
+            (e.g. serving fixtures/weather.html) for testing.
+        interval: Seconds between refreshes.
+        cachePath: JSON file the last result is persisted to, None keeps it in memory only.
+            The url is not written to it, it can give away the location.
+----------------------------------------------------------------------------------------------------------
+'''
+class WeatherService():
+    def __init__(self, url=None, interval=600, cachePath='WeatherCache.json', timeout=10, retryDelay=60,
+            maxBackoff=3600, staleAfter=None):
+        self.url = url
+        self.interval = interval
+        self.cachePath = cachePath
+        self.timeout = timeout
+        self.retryDelay = retryDelay
+        self.maxBackoff = maxBackoff
+        self.staleAfter = staleAfter if staleAfter is not None else interval * 2
+        self.conditions = None
+        self.failures = 0
+        self.nextAttempt = 0
+        self._session = None
+        self._refreshing = False
+        self._lock = threading.Lock()
+        self._loadCache()
+
+    def isStale(self):
+        return self.conditions is None or time.time() - self.conditions.fetchedAt > self.staleAfter
+
+    def isDue(self):
+        '''True when the conditions are older than "interval" and no refresh or backoff is in the way.'''
+        now = time.time()
+        if(self._refreshing or now < self.nextAttempt):
+            return False
+        return self.conditions is None or now - self.conditions.fetchedAt >= self.interval
+
+    def get(self, wait=False):
+        '''
+        Returns a copy of the last good WeatherConditions with "stale" set, or None if there is
+        none yet. With wait=True a due refresh runs here first, blocking the caller.
+        '''
+        if(wait and self.isDue()):
+            self.refresh()
+        conditions = self.conditions
+        if(conditions is None):
+            return None
+        return WeatherConditions(conditions.temperature, conditions.phrase, conditions.fetchedAt, self.isStale())
+
+    def refresh(self):
+        '''Fetches new conditions unless backing off or already refreshing. Returns True on success.'''
+        with self._lock:
+            if(self._refreshing or time.time() < self.nextAttempt):
+                return False
+            self._refreshing = True
+        try:
+            return self._fetch()
+        finally:
+            self._refreshing = False
+
+    def release(self):
+        '''Closes the HTTP session (unless a refresh is using it), the conditions are kept.'''
+        with self._lock:
+            if(self._refreshing or self._session is None):
+                return
+            session, self._session = self._session, None
+        session.close()
+
+    def _fetch(self):
+        try:
+            page = self._getSession().get(self.url or getSecrets().weatherLink, timeout=self.timeout)
+            page.raise_for_status()
+            conditions = parseConditions(page.content)
+        except Exception: # requests raises many types, any failure is treated the same.
+            conditions = None
+        if(conditions is None):
+            self.failures += 1
+            self.nextAttempt = time.time() + min(self.maxBackoff, self.retryDelay * 2 ** (self.failures - 1))
+            return False
+        self.failures = 0
+        self.nextAttempt = 0
+        self.conditions = conditions
+        TimeSeries.getSeries('weather.temperature').add(conditions.getTemperatureValue(), conditions.fetchedAt)
+        self._saveCache()
+        return True
+
+    def _getSession(self):
+        if(self._session is None):
+            import requests # imported on first use so importing this module stays cheap.
+            self._session = requests.Session()
+        return self._session
+
+    def _loadCache(self):
+        if(not(self.cachePath)):
+            return
+        try:
+            with open(self.cachePath, 'r') as f:
+                cached = json.load(f)
+            self.conditions = WeatherConditions(cached['temperature'], cached.get('phrase'), float(cached['fetchedAt']))
+        except (IOError, ValueError, KeyError, TypeError):
+            pass # no usable cache, wait for the first fetch.
+
+    def _saveCache(self):
+        if(not(self.cachePath)):
+            return
+        tmpPath = self.cachePath + '.tmp'
+        with open(tmpPath, 'w') as f:
+            json.dump(self.conditions.toDict(), f)
+        os.replace(tmpPath, self.cachePath)
+
+#------------------------------------------------------------
+#	getWeatherService()
+#		Description: Returns the weather service shared by the
+#           app, creating it on first use.
+#------------------------------------------------------------
+def getWeatherService():
+    global _weatherService
+    if(_weatherService is None):
+        _weatherService = WeatherService()
+    return _weatherService
 
 #------------------------------------------------------------
 #	getOutdoorTemp()
 #		Description: Retrieves current outdoor temperature of
-#           current location. 
+#           current location. Served from the WeatherService
+#           cache, returns None if it was never fetched.
 #------------------------------------------------------------
 # TODO: Gather data based on an API interface or by IP location data. Currently gets temperature of only one static city.
 def getOutdoorTemp():
-    URL = secrets.weatherLink # hidden Weather link for location privacy reasons.. 
-    page = requests.get(URL)
-    # <span data-testid="TemperatureValue" class="_-_-components-src-organism-CurrentConditions-CurrentConditions--tempValue--MHmYY">79°</span>
-    soup = bSoup(page.content, 'html.parser')
-    temp = soup.find('span', class_='_-_-components-src-organism-CurrentConditions-CurrentConditions--tempValue--MHmYY')
-    return temp.text
+    conditions = getWeatherService().get(wait=True)
+    return conditions.temperature if conditions else None
 
     
 if __name__ == "__main__":
@@ -0,0 +1,79 @@
+#!/usr/bin/python3
+# -*- coding: utf-8 -*-
+
+#=========================================================================
+#	WindowManager.py
+#	Author: Raul Rojas
+#	Contact: rrojas994@gmail.com
+#	Description:
+#		Keeps every DeskClock window that was built in memory and switches
+#       between them by hiding and un-hiding instead of closing and
+#       rebuilding them.
+#=========================================================================
+
+'''
+----------------------------------------------------------------------------------------------------------
+    class WindowManager()
+    Description:
+        Holds DCWindow objects by name. Only one window is active (the one being read) at a
+        time, switching to another window hides the current one and shows the other. A window
+        that has not been built yet is created with the factory passed to show(), so windows
+        that are never opened are never built.
+    Attributes:
+        windows: Dictionary of window name -> DCWindow.
+        activeName: Name of the window being read, None once the app is exiting.
+----------------------------------------------------------------------------------------------------------
+'''
+class WindowManager():
+    def __init__(self):
+        self.windows = dict()
+        self.activeName = None
+
+    @property
+    def active(self):
+        return self.windows.get(self.activeName) if self.activeName else None
+
+    def add(self, name, window, hidden=False):
+        '''Adds an already built window.'''
+        self.windows[name] = window
+        if(hidden):
+            window.hide()
+
+    def get(self, name):
+        return self.windows.get(name)
+
+    def show(self, name, factory=None):
+        '''
+        Makes a window the active one. If it has not been built yet it is built with
+        factory(). The previously active window is hidden, not closed.
+        '''
+        if(name == self.activeName):
+            return self.active
+        window = self.windows.get(name)
+        if(window is None):
+            if(factory is None):
+                raise KeyError(f'Window "{name}" has not been built and no factory was given.')
+            window = factory()
+            self.windows[name] = window
+        else:
+            window.show()
+        previous = self.active
+        self.activeName = name
+        if(previous):
+            previous.hide()
+        return window
+
+    def close(self, name):
+        window = self.windows.pop(name, None)
+        if(window):
+            window.close()
+        if(name == self.activeName):
+            self.activeName = None
+
+    def requestExit(self):
+        '''Makes no window active so the main loop ends, the windows stay open until closeAll().'''
+        self.activeName = None
+
+    def closeAll(self):
+        for name in list(self.windows.keys()):
+            self.close(name)
@@ -0,0 +1,179 @@
+#!/usr/bin/python3
+# -*- coding: utf-8 -*-
+
+#=========================================================================
+#	WorkerPool.py
+#	Author: Raul Rojas
+#	Contact: rrojas994@gmail.com
+#	Description:
+#		Provides a managed thread pool for blocking work (web scraping,
+#       pinging, etc.) so feature blocks never block the GUI loop. Results
+#       are handed back to the GUI thread as window events.
+#=========================================================================
+
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+_sharedPool = None
+
+#------------------------------------------------------------
+#	class JobResult()
+#		Description: Object posted as the event value when a
+#           job finishes, fails, times out or is cancelled.
+#------------------------------------------------------------
+class JobResult():
+    def __init__(self, jobKey, value=None, error=None, timedOut=False):
+        self.jobKey = jobKey
+        self.value = value
+        self.error = error
+        self.timedOut = timedOut
+
+    @property
+    def ok(self):
+        return self.error is None and not(self.timedOut)
+
+    def __repr__(self):
+        return str(self.__dict__)
+
+
+class _Job():
+    def __init__(self, jobKey, eventKey):
+        self.jobKey = jobKey
+        self.eventKeys = [eventKey]
+        self.future = None
+        self.timer = None
+        self.done = False
+
+
+'''
+----------------------------------------------------------------------------------------------------------
+    class WorkerPool()
+    Description:
+        Runs jobs on a small pool of threads. Every job has a key, submitting a job whose key
+        is already running does not start a second one, the caller is added as another
+        listener and receives the same result. When a job ends a JobResult is posted to the
+        attached window with window.write_event_value(eventKey, result) for every listener,
+        so it shows up in the normal read() loop and the feature handles it in events().
+        Python threads can not be killed, a job that times out keeps running in the
+        background but its result is dropped and a timed out JobResult is posted instead.
+    Attributes:
+        window: The PySimpleGUI window results are posted to. Results finishing while no
+            window is attached are dropped.
+----------------------------------------------------------------------------------------------------------
+'''
+class WorkerPool():
+    def __init__(self, maxWorkers=4, window=None):
+        self.window = window
+        self._executor = ThreadPoolExecutor(max_workers=maxWorkers, thread_name_prefix='DeskClockWorker')
+        self._jobs = dict()
+        self._lock = threading.Lock()
+
+    def attachWindow(self, window):
+        self.window = window
+
+    def submit(self, jobKey, eventKey, fn, *args, timeout=None, **kwargs):
+        '''
+        Runs fn(*args, **kwargs) in the pool. Returns True if a new job was started or False
+        if a job with the same key was already running (eventKey is added as a listener).
+        '''
+        with self._lock:
+            job = self._jobs.get(jobKey)
+            if(job):
+                if(eventKey not in job.eventKeys):
+                    job.eventKeys.append(eventKey)
+                return False
+            job = _Job(jobKey, eventKey)
+            job.future = self._executor.submit(fn, *args, **kwargs) # raises RuntimeError after shutdown(), nothing is registered.
+            self._jobs[jobKey] = job
+            if(timeout is not None):
+                job.timer = threading.Timer(timeout, self._timeout, args=(job,))
+                job.timer.daemon = True
+                job.timer.start()
+        job.future.add_done_callback(lambda f: self._finish(job, f))
+        return True
+
+    def cancel(self, jobKey, eventKey=None):
+        '''
+        Stops listening for a job. With an eventKey only that listener is removed, the job is
+        cancelled when no listeners are left. No result is posted for cancelled listeners.
+        '''
+        with self._lock:
+            job = self._jobs.get(jobKey)
+            if(not(job)):
+                return
+            if(eventKey is not None and eventKey in job.eventKeys):
+                job.eventKeys.remove(eventKey)
+            if(eventKey is not None and job.eventKeys):
+                return
+            self._end(job)
+        job.future.cancel() # only stops jobs that have not started yet. Outside the lock, it calls _finish() right away.
+
+    def isPending(self, jobKey):
+        return jobKey in self._jobs
+
+    def shutdown(self, wait=False):
+        with self._lock:
+            jobs = list(self._jobs.values())
+            for job in jobs:
+                self._end(job)
+        for job in jobs:
+            job.future.cancel() # outside the lock, see cancel().
+        self._executor.shutdown(wait=wait)
+
+    def _end(self, job):
+        '''Marks a job as finished, must be called while holding the lock. Returns False if it already was.'''
+        if(job.done):
+            return False
+        job.done = True
+        if(job.timer):
+            job.timer.cancel()
+        if(self._jobs.get(job.jobKey) is job):
+            del self._jobs[job.jobKey]
+        return True
+
+    def _timeout(self, job):
+        with self._lock:
+            if(not(self._end(job))):
+                return
+        self._post(job, JobResult(job.jobKey, timedOut=True))
+
+    def _finish(self, job, future):
+        with self._lock:
+            if(not(self._end(job))):
+                return # timed out or cancelled already.
+        if(future.cancelled()):
+            return
+        error = future.exception()
+        result = JobResult(job.jobKey, error=error) if error else JobResult(job.jobKey, value=future.result())
+        self._post(job, result)
+
+    def _post(self, job, result):
+        window = self.window
+        if(window is None):
+            return
+        for eventKey in job.eventKeys:
+            if(eventKey is not None): # None, a job nobody waits on (e.g. a cache refresh).
+                window.write_event_value(eventKey, result)
+
+
+#------------------------------------------------------------
+#	getPool()
+#		Description: Returns the worker pool shared by all
+#           feature blocks, creating it on first use.
+#------------------------------------------------------------
+def getPool():
+    global _sharedPool
+    if(_sharedPool is None):
+        _sharedPool = WorkerPool()
+    return _sharedPool
+
+#------------------------------------------------------------
+#	shutdownPool()
+#		Description: Shuts down the shared pool if it was
+#           ever created. Running jobs are abandoned.
+#------------------------------------------------------------
+def shutdownPool():
+    global _sharedPool
+    if(_sharedPool is not None):
+        _sharedPool.shutdown()
+        _sharedPool = None
@@ -0,0 +1,125 @@
+import asyncio
+import os
+import socket
+import struct
+import tempfile
+import time
+import unittest
+import ConnectivityProbe
+
+ROUTES = '''Iface	Destination	Gateway 	Flags	RefCnt	Use	Metric	Mask		MTU	Window	IRTT
+eth0	00000000	0101A8C0	0003	0	0	100	00000000	0	0	0
+eth0	0001A8C0	00000000	0001	0	0	100	00FFFFFF	0	0	0
+wlan0	00000000	FE01000A	0003	0	0	600	00000000	0	0	0
+wlan0	00000000	FF01000A	0003	0	0	700	00000000	0	0	0
+tun0	00000000	00000000	0001	0	0	50	00000000	0	0	0
+'''
+
+class GatewayTest(unittest.TestCase):
+    def test_readsDefaultRoutes(self):
+        with tempfile.NamedTemporaryFile('w', suffix='.route', delete=False) as f:
+            f.write(ROUTES)
+        self.addCleanup(os.remove, f.name)
+        gateways = ConnectivityProbe.getDefaultGateways(f.name)
+        self.assertEqual(gateways, {'eth0': '192.168.1.1', 'wlan0': '10.0.1.254'}) # first route wins, tun0 has no gateway.
+
+    def test_missingRouteFile(self):
+        self.assertEqual(ConnectivityProbe.getDefaultGateways('/nonexistent/route'), dict())
+
+
+class ProbeHistoryTest(unittest.TestCase):
+    def test_lossAndAverage(self):
+        history = ConnectivityProbe.ProbeHistory(size=4)
+        self.assertEqual((history.last, history.getLoss(), history.getAverageLatency()), (None, 0.0, None))
+        for latency in (10.0, None, 20.0, None, 30.0): # the first sample falls out.
+            history.add(latency)
+        self.assertEqual(history.last, 30.0)
+        self.assertEqual(history.getLoss(), 0.5)
+        self.assertEqual(history.getAverageLatency(), 25.0)
+
+
+class IcmpPacketTest(unittest.TestCase):
+    def test_checksumOfAnEchoIsZero(self):
+        packet = ConnectivityProbe._icmpEcho(513)
+        self.assertEqual(packet[:2], b'\x08\x00')
+        self.assertEqual(struct.unpack('!H', packet[6:8])[0], 513)
+        self.assertEqual(ConnectivityProbe._checksum(packet), 0)
+
+
+class FakeEngine(ConnectivityProbe.ProbeEngine):
+    '''Answers from a table instead of the network: host -> latency, None or seconds to hang.'''
+    def __init__(self, answers, icmpError=None, **kwargs):
+        super().__init__(**kwargs)
+        self.answers = answers
+        self.icmpError = icmpError
+        self.icmpCalls = 0
+        self.tcpCalls = 0
+
+    async def probeIcmp(self, target):
+        self.icmpCalls += 1
+        if(self.icmpError):
+            raise self.icmpError
+        return await self.answer(target)
+
+    async def probeTcp(self, target):
+        self.tcpCalls += 1
+        return await self.answer(target)
+
+    async def answer(self, target):
+        answer = self.answers[target.host]
+        if(isinstance(answer, tuple)): # ('hang', seconds)
+            await asyncio.sleep(answer[1])
+            return 1.0
+        return answer
+
+
+class ProbeEngineTest(unittest.TestCase):
+    def targets(self):
+        return [ConnectivityProbe.ProbeTarget('fast', name='eth0'), ConnectivityProbe.ProbeTarget('hung', name='wlan0'),
+            ConnectivityProbe.ProbeTarget('down', name='usb0')]
+
+    def test_wholeRunEndsAtTheDeadline(self):
+        engine = FakeEngine({'fast': 3.0, 'hung': ('hang', 30), 'down': None}, deadline=0.2)
+        start = time.monotonic()
+        results = engine.run(self.targets())
+        self.assertLess(time.monotonic() - start, 2)
+        self.assertEqual(results, {'eth0': 3.0, 'wlan0': None, 'usb0': None})
+        self.assertEqual([engine.getHistory(t).last for t in self.targets()], [3.0, None, None])
+        self.assertEqual(engine.getHistory(self.targets()[1]).getLoss(), 1.0)
+
+    def test_fallsBackToTcpWhenPingIsNotAllowed(self):
+        engine = FakeEngine({'fast': 3.0, 'hung': 4.0, 'down': None}, icmpError=PermissionError())
+        self.assertEqual(engine.run(self.targets()), {'eth0': 3.0, 'wlan0': 4.0, 'usb0': None})
+        self.assertIs(engine._icmpAllowed, False)
+        engine.run(self.targets())
+        self.assertEqual(engine.tcpCalls, 6)
+        self.assertLessEqual(engine.icmpCalls, 3) # not tried again once refused.
+
+    def test_otherIcmpErrorsCountAsLost(self):
+        engine = FakeEngine({'fast': 3.0, 'hung': 4.0, 'down': None}, icmpError=OSError('unreachable'))
+        self.assertEqual(engine.run(self.targets()), {'eth0': None, 'wlan0': None, 'usb0': None})
+        self.assertEqual(engine.tcpCalls, 0)
+
+    def test_emptyRun(self):
+        self.assertEqual(ConnectivityProbe.ProbeEngine().run([]), dict())
+
+
+class TcpProbeTest(unittest.TestCase):
+    '''Connects to sockets on 127.0.0.1 only.'''
+    def test_listeningAndRefusingPortsAreReachable(self):
+        listener = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+        self.addCleanup(listener.close)
+        listener.bind(('127.0.0.1', 0))
+        listener.listen(1)
+        closed = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+        closed.bind(('127.0.0.1', 0))
+        closedPort = closed.getsockname()[1]
+        closed.close() # nothing listens, the connect is refused.
+        engine = ConnectivityProbe.ProbeEngine(useIcmp=False, deadline=2)
+        for port in (listener.getsockname()[1], closedPort):
+            target = ConnectivityProbe.ProbeTarget('127.0.0.1', name='lo', tcpPorts=(port,))
+            self.assertIsNotNone(engine.run([target])['lo'], port)
+
+
+if __name__ == '__main__':
+    unittest.main()
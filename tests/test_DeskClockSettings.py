@@ -0,0 +1,115 @@
+import json
+import os
+import tempfile
+import threading
+import time
+import unittest
+import DeskClockSettings
+
+class SettingsStoreTest(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.path = os.path.join(self.tmp.name, 'Settings.json')
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def writeFile(self, data):
+        with open(self.path, 'w') as f:
+            json.dump(data, f)
+
+    def readFile(self):
+        with open(self.path, 'r') as f:
+            return json.load(f)
+
+    def test_migratesVersion0Files(self):
+        self.writeFile({'settings': {'settings': {'militaryTime': True}}}) # nested by the old loadSettings().
+        store = DeskClockSettings.SettingsStore(self.path, debounce=0)
+        self.assertEqual(store.values, {'militaryTime': True})
+        self.assertEqual(self.readFile(), {'schemaVersion': DeskClockSettings.SCHEMA_VERSION,
+            'settings': {'militaryTime': True}}) # the migrated file is written back.
+
+    def test_migratesIndexTimeAdjustOutOfLayouts(self):
+        self.writeFile({'schemaVersion': 1, 'settings': {'layouts': {'main': [
+            {'id': 'VanillaFeatures.Clock', 'pos': [0, 0], 'opts': {'timeAdjust': 0}},
+            {'id': 'VanillaFeatures.Stopwatch', 'pos': [0, 1], 'opts': {'timeAdjust': 1}},
+            {'id': 'VanillaFeatures.WorldClock', 'pos': [1, 0], 'opts': {'timeAdjust': 2, 'militaryTime': True}}
+        ]}}})
+        store = DeskClockSettings.SettingsStore(self.path, debounce=0)
+        self.assertEqual([e.get('opts') for e in store.get('layouts')['main']],
+            [{'timeAdjust': 0}, None, {'militaryTime': True}]) # only the clocks take timeAdjust.
+
+    def test_unreadableFileGivesDefaults(self):
+        with open(self.path, 'w') as f:
+            f.write('{not json')
+        self.assertEqual(DeskClockSettings.SettingsStore(self.path, debounce=0).values, dict())
+
+    def test_debounceWritesOnce(self):
+        store = DeskClockSettings.SettingsStore(self.path, debounce=0.05)
+        for i in range(10):
+            store.set('count', i)
+        self.assertFalse(os.path.exists(self.path))
+        deadline = time.monotonic() + 2
+        while(not(os.path.exists(self.path)) and time.monotonic() < deadline):
+            time.sleep(0.01)
+        time.sleep(0.1)
+        self.assertEqual(store.writes, 1)
+        self.assertEqual(self.readFile()['settings'], {'count': 9})
+
+    def test_flushWritesPendingChangesOnly(self):
+        store = DeskClockSettings.SettingsStore(self.path, debounce=60)
+        self.assertFalse(store.flush())
+        store.set('a', 1)
+        self.assertTrue(store.flush())
+        self.assertFalse(store.flush())
+        self.assertTrue(store.flush(force=True))
+        self.assertEqual(store.writes, 2)
+        self.assertFalse(os.path.exists(self.path + '.tmp'))
+
+    def test_concurrentFlushesKeepTheNewestSnapshot(self):
+        store = DeskClockSettings.SettingsStore(self.path, debounce=0.001)
+        def writer(n):
+            for i in range(100):
+                store.set('writer{}'.format(n), i)
+                store.flush()
+        threads = [threading.Thread(target=writer, args=(n,)) for n in range(4)]
+        for t in threads:
+            t.start()
+        for t in threads:
+            t.join()
+        store.flush()
+        self.assertEqual(self.readFile()['settings'], {'writer{}'.format(n): 99 for n in range(4)})
+
+    def test_subscribersGetOnlyTheirChangedKeys(self):
+        store = DeskClockSettings.SettingsStore(None)
+        everything, clock = [], []
+        store.subscribe(everything.append)
+        token = store.subscribe(clock.append, keys=['militaryTime'])
+        store.update({'militaryTime': True, 'theme': 'Dark'})
+        store.set('theme', 'Dark') # unchanged, nobody is called.
+        store.delete('militaryTime')
+        store.unsubscribe(token)
+        store.set('militaryTime', False)
+        self.assertEqual(everything, [{'militaryTime': True, 'theme': 'Dark'}, {'militaryTime': None}, {'militaryTime': False}])
+        self.assertEqual(clock, [{'militaryTime': True}, {'militaryTime': None}])
+
+    def test_replaceRemovesMissingKeys(self):
+        store = DeskClockSettings.SettingsStore(None)
+        store.update({'a': 1, 'b': 2})
+        store.update({'a': 1}, replace=True)
+        self.assertEqual(store.values, {'a': 1})
+
+
+class LegacyFunctionsTest(unittest.TestCase):
+    def test_saveAndLoadSettings(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            path = os.path.join(tmp, 'Settings.json')
+            DeskClockSettings.saveSettings(DeskClockSettings.Settings(militaryTime=True), path)
+            self.assertEqual(DeskClockSettings.loadSettings(path).settings, {'militaryTime': True})
+            with self.assertRaises(TypeError):
+                DeskClockSettings.saveSettings({'militaryTime': True}, path)
+            DeskClockSettings._stores.pop(path, None) # do not leave a store for a deleted file behind.
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,36 @@
+import unittest
+import EventRouter
+
+class Feature():
+    def __init__(self, keys, globalEvents=()):
+        self.safeKeys = {k: k for k in keys}
+        self.globalEvents = globalEvents
+
+class EventRouterTest(unittest.TestCase):
+    def setUp(self):
+        self.clock = Feature(['-clock-', '-job.Clock-'])
+        self.graph = Feature(['-graph-'], globalEvents=(EventRouter.TIMEOUT_EVENT, EventRouter.RESIZE_EVENT))
+        self.router = EventRouter.EventRouter([self.clock, self.graph])
+
+    def test_elementEventsGoToTheirOwner(self):
+        self.assertEqual(list(self.router.route('-clock-')), [self.clock])
+        self.assertEqual(list(self.router.route('-job.Clock-')), [self.clock])
+
+    def test_decoratedEvents(self):
+        self.assertEqual(list(self.router.route('-graph-+UP')), [self.graph])
+        self.assertEqual(list(self.router.route(('-graph-', '+CLICKED+', (0, 1)))), [self.graph])
+
+    def test_globalEventsOnlyReachSubscribers(self):
+        self.assertEqual(list(self.router.route(EventRouter.TIMEOUT_EVENT)), [self.graph])
+        self.assertEqual(list(self.router.route('-unknown-')), [])
+        self.assertEqual(self.router.getStats()['dropped'], 1)
+
+    def test_removedFeaturesGetNothing(self):
+        self.router.remove(self.graph)
+        self.assertEqual(list(self.router.route('-graph-')), [])
+        self.assertEqual(list(self.router.route(EventRouter.TIMEOUT_EVENT)), [])
+        self.assertEqual(self.router.getStats()['globalEvents'], dict())
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,103 @@
+import unittest
+import FeatureBlock
+from FeatureBlock import KeyAllocator
+
+class KeyAllocatorTest(unittest.TestCase):
+    def test_firstKeyIsKeptAsIs(self):
+        allocator = KeyAllocator()
+        self.assertEqual(allocator.allocate('-text.Clock.time-'), '-text.Clock.time-')
+        self.assertEqual(allocator.allocate('-text.Clock.time-'), '-text.Clock.time-<#>:1')
+        self.assertEqual(allocator.allocate('-text.Clock.time-'), '-text.Clock.time-<#>:2')
+
+    def test_releasedKeysAreReused(self):
+        allocator = KeyAllocator()
+        keys = [allocator.allocate('k') for _ in range(4)] # k, k<#>:1, k<#>:2, k<#>:3
+        allocator.release(keys[2])
+        self.assertEqual(allocator.allocate('k'), keys[2])
+        self.assertEqual(allocator.allocate('k'), 'k<#>:4')
+        allocator.release(keys[0])
+        self.assertEqual(allocator.allocate('k'), 'k') # the plain key is free again.
+
+    def test_releaseIsIdempotent(self):
+        allocator = KeyAllocator()
+        key = allocator.allocate('k')
+        allocator.release(key)
+        allocator.release(key)
+        allocator.release('never handed out')
+        self.assertEqual(allocator.getStats()['releases'], 1)
+        self.assertEqual(allocator.getStats()['live'], 0)
+
+    def test_keysTakenByNameAreSkipped(self):
+        allocator = KeyAllocator()
+        allocator.allocate('k')
+        allocator.allocate('k<#>:1') # asked for by its numbered name.
+        self.assertEqual(allocator.allocate('k'), 'k<#>:2')
+
+    def test_numbersAreCountedPerBaseKey(self):
+        allocator = KeyAllocator()
+        allocator.allocate('a')
+        allocator.allocate('a')
+        allocator.allocate('b')
+        self.assertEqual(allocator.allocate('b'), 'b<#>:1')
+        self.assertEqual(allocator.getStats()['live'], 4)
+
+
+class Probe(FeatureBlock.FeatureBlock):
+    def __init__(self, posRow, posCol):
+        self.calls = []
+        super().__init__(posRow, posCol)
+
+    def getFeatureDescription(self):
+        return 'Test feature.'
+
+    def myFeaturesKeys(self):
+        return {'value': '-text.Probe.value-'}
+
+    def getFeatureColumn(self):
+        return None
+
+    def update(self, window):
+        pass
+
+    def events(self, event, value, window):
+        pass
+
+    def onAttach(self):
+        self.calls.append('attach')
+
+    def onShow(self):
+        self.calls.append('show')
+
+    def onHide(self):
+        self.calls.append('hide')
+
+    def onDetach(self):
+        self.calls.append('detach')
+
+
+class FeatureKeysTest(unittest.TestCase):
+    def test_rebuiltLayoutReusesKeys(self):
+        first = [Probe(0, c) for c in range(3)]
+        keys = sorted(f.safeKeys['value'] for f in first)
+        live = FeatureBlock.FeatureBlock.getKeyStats()['live']
+        for f in first:
+            f.detach()
+        second = [Probe(0, c) for c in range(3)]
+        self.assertEqual(sorted(f.safeKeys['value'] for f in second), keys)
+        self.assertEqual(FeatureBlock.FeatureBlock.getKeyStats()['live'], live)
+        for f in second:
+            f.detach()
+
+    def test_lifecycleHooksRunOnce(self):
+        feature = Probe(0, 0)
+        feature.attach()
+        feature.attach()
+        feature.setVisible(True)
+        feature.setVisible(True)
+        feature.detach()
+        feature.detach()
+        self.assertEqual(feature.calls, ['attach', 'show', 'hide', 'detach'])
+
+
+if __name__ == '__main__':
+    unittest.main()
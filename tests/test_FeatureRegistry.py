@@ -0,0 +1,90 @@
+import os
+import tempfile
+import textwrap
+import unittest
+import FeatureRegistry
+
+PLUGIN_SOURCE = textwrap.dedent('''
+    import FeatureBlock
+
+    class Barometer(FeatureBlock.FeatureBlock):
+        featureVersion = '2.1'
+        defaultSize = (1, 2)
+        def getFeatureDescription(self):
+            return "Air pressure."
+
+    class BigBarometer(Barometer):
+        defaultSize = (2, 2)
+
+    class Helper():
+        pass
+''')
+
+class ParseFeaturesTest(unittest.TestCase):
+    def test_findsSubclassesWithoutImporting(self):
+        infos = FeatureRegistry.parseFeatures(PLUGIN_SOURCE, path='weather.py', moduleName='weather')
+        self.assertEqual([i.classId for i in infos], ['weather.Barometer', 'weather.BigBarometer'])
+        barometer, big = infos
+        self.assertEqual(barometer.description, 'Air pressure.')
+        self.assertEqual(barometer.version, '2.1')
+        self.assertEqual(tuple(barometer.defaultSize), (1, 2))
+
+    def test_subclassInheritsAttributes(self):
+        big = FeatureRegistry.parseFeatures(PLUGIN_SOURCE, moduleName='weather')[1]
+        self.assertEqual(big.description, 'Air pressure.')
+        self.assertEqual(big.version, '2.1')
+        self.assertEqual(tuple(big.defaultSize), (2, 2))
+
+    def test_syntaxErrorGivesNothing(self):
+        self.assertEqual(FeatureRegistry.parseFeatures('class Broken(:', moduleName='broken'), [])
+
+
+class FeatureRegistryTest(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.pluginDir = os.path.join(self.tmp.name, 'plugins')
+        os.makedirs(self.pluginDir)
+        with open(os.path.join(self.pluginDir, 'baro.py'), 'w') as f:
+            f.write(PLUGIN_SOURCE)
+        self.manifestPath = os.path.join(self.tmp.name, 'manifest.json')
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def makeRegistry(self):
+        return FeatureRegistry.FeatureRegistry(pluginDirs=[self.pluginDir], builtinModules=(), entryPointGroup='none',
+            manifestPath=self.manifestPath)
+
+    def test_discoversPluginsAndWritesManifest(self):
+        ids = [info.classId for info in self.makeRegistry().discover()]
+        self.assertEqual(ids, ['baro.Barometer', 'baro.BigBarometer'])
+        self.assertTrue(os.path.exists(self.manifestPath))
+
+    def test_manifestIsReusedAndForgetsRemovedFiles(self):
+        self.makeRegistry().discover()
+        registry = self.makeRegistry()
+        self.assertIsNotNone(registry._findInManifest('baro.Barometer')) # known before any scan.
+        os.remove(os.path.join(self.pluginDir, 'baro.py'))
+        self.assertEqual(registry.discover(), [])
+        self.assertEqual(self.makeRegistry()._manifest['files'], dict())
+
+    def test_defaultManifestDoesNotDependOnWorkingDirectory(self):
+        self.assertTrue(os.path.isabs(FeatureRegistry._defaultManifestPath))
+        self.assertEqual(os.path.dirname(FeatureRegistry._defaultManifestPath),
+            os.path.dirname(os.path.abspath(FeatureRegistry.__file__)))
+
+    def test_unwritableManifestIsSkipped(self):
+        registry = FeatureRegistry.FeatureRegistry(pluginDirs=[self.pluginDir], builtinModules=(), entryPointGroup='none',
+            manifestPath=os.path.join(self.tmp.name, 'missing', 'manifest.json'))
+        self.assertEqual(len(registry.discover()), 2)
+
+    def test_failedManifestSaveLeavesNoTmpFile(self):
+        os.makedirs(self.manifestPath) # os.replace() onto a directory fails after the tmp file was written.
+        registry = self.makeRegistry()
+        self.assertEqual(len(registry.discover()), 2)
+        self.assertFalse(os.path.exists(self.manifestPath + '.tmp'))
+        self.assertFalse(registry._manifestChanged)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,68 @@
+import unittest
+import DeskClockSettings
+import LayoutDescriptor
+from LayoutDescriptor import FeatureDescriptor
+
+class FeatureDescriptorTest(unittest.TestCase):
+    def test_roundTrip(self):
+        descriptor = FeatureDescriptor('VanillaFeatures.Clock', 1, 2, {'militaryTime': True})
+        d = descriptor.toDict()
+        self.assertEqual(d, {'id': 'VanillaFeatures.Clock', 'pos': [1, 2], 'opts': {'militaryTime': True}})
+        copy = FeatureDescriptor.fromDict(d)
+        self.assertTrue(copy.sameFeature(descriptor))
+        self.assertTrue(copy.samePosition(descriptor))
+
+    def test_optionsAreLeftOutWhenEmpty(self):
+        self.assertEqual(FeatureDescriptor('VanillaFeatures.Clock').toDict(), {'id': 'VanillaFeatures.Clock', 'pos': [0, 0]})
+
+    def test_positionIsNotPartOfTheFeature(self):
+        a = FeatureDescriptor('VanillaFeatures.Clock', 0, 0, {'blink': False})
+        self.assertTrue(a.sameFeature(FeatureDescriptor('VanillaFeatures.Clock', 3, 1, {'blink': False})))
+        self.assertFalse(a.sameFeature(FeatureDescriptor('VanillaFeatures.Clock', 0, 0, {'blink': True})))
+        self.assertFalse(a.sameFeature(None))
+
+    def test_malformedEntries(self):
+        for entry in ({'pos': [0, 0]}, {'id': 'A', 'pos': [0]}, {'id': 'A', 'pos': ['x', 0]}, 'A'):
+            with self.assertRaises(ValueError):
+                FeatureDescriptor.fromDict(entry)
+
+
+class LayoutSlotTest(unittest.TestCase):
+    def setUp(self):
+        self.store = DeskClockSettings.SettingsStore(None)
+        self.clocks = [FeatureDescriptor('VanillaFeatures.Clock', 0, c) for c in range(2)]
+
+    def test_noLayoutSavedYet(self):
+        self.assertIsNone(LayoutDescriptor.getActiveLayoutName(self.store))
+        self.assertIsNone(LayoutDescriptor.loadLayout(self.store))
+        self.assertEqual(LayoutDescriptor.getLayoutNames(self.store), [])
+
+    def test_saveActivatesTheSlot(self):
+        LayoutDescriptor.saveLayout(self.store, 'clocks', self.clocks)
+        LayoutDescriptor.saveLayout(self.store, 'network', [FeatureDescriptor('VanillaFeatures.NetworkStatus')], activate=False)
+        self.assertEqual(LayoutDescriptor.getLayoutNames(self.store), ['clocks', 'network'])
+        self.assertEqual(LayoutDescriptor.getActiveLayoutName(self.store), 'clocks')
+        loaded = LayoutDescriptor.loadLayout(self.store)
+        self.assertEqual([(d.classId, d.posRow, d.posCol) for d in loaded], [('VanillaFeatures.Clock', 0, 0), ('VanillaFeatures.Clock', 0, 1)])
+        self.assertEqual(LayoutDescriptor.loadLayout(self.store, 'network')[0].classId, 'VanillaFeatures.NetworkStatus')
+
+    def test_saveNotifiesSubscribers(self):
+        changes = []
+        self.store.subscribe(changes.append, keys=[LayoutDescriptor.LAYOUTS_KEY])
+        LayoutDescriptor.saveLayout(self.store, 'clocks', self.clocks)
+        self.assertEqual(len(changes), 1) # the slots dictionary is replaced, not changed in place.
+
+    def test_malformedEntriesAreSkipped(self):
+        self.store.set(LayoutDescriptor.LAYOUTS_KEY, {'mixed': [{'id': 'VanillaFeatures.Clock', 'pos': [0, 0]}, {'pos': [0, 1]}]})
+        self.assertEqual(len(LayoutDescriptor.loadLayout(self.store, 'mixed')), 1)
+
+    def test_deleteActiveSlot(self):
+        LayoutDescriptor.saveLayout(self.store, 'clocks', self.clocks)
+        LayoutDescriptor.deleteLayout(self.store, 'clocks')
+        LayoutDescriptor.deleteLayout(self.store, 'missing')
+        self.assertEqual(LayoutDescriptor.getLayoutNames(self.store), [])
+        self.assertIsNone(LayoutDescriptor.getActiveLayoutName(self.store)) # back to the defaults.
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,109 @@
+import json
+import os
+import tempfile
+import threading
+import time
+import unittest
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+import NetworkingUtils
+import WorkerPool
+
+FIXTURES = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'fixtures')
+
+class IpPageHandler(BaseHTTPRequestHandler):
+    '''Serves the saved whatismyip.org page, or errors while the server is "down".'''
+    def do_GET(self):
+        self.server.requests += 1
+        self.server.release.wait(5)
+        if(self.server.down):
+            self.send_error(503)
+            return
+        self.send_response(200)
+        self.send_header('Content-Type', 'text/html; charset=utf-8')
+        self.send_header('Content-Length', str(len(self.server.page)))
+        self.end_headers()
+        self.wfile.write(self.server.page)
+
+    def log_message(self, format, *args):
+        pass
+
+
+class PublicIpLookupTest(unittest.TestCase):
+    def setUp(self):
+        self.server = ThreadingHTTPServer(('127.0.0.1', 0), IpPageHandler)
+        self.server.requests = 0
+        self.server.down = False
+        self.server.release = threading.Event()
+        self.server.release.set()
+        with open(os.path.join(FIXTURES, 'whatismyip.html'), 'rb') as f:
+            self.server.page = f.read()
+        self.thread = threading.Thread(target=self.server.serve_forever, daemon=True)
+        self.thread.start()
+        self.url = 'http://127.0.0.1:{}/my-ip-address'.format(self.server.server_address[1])
+        self.tmp = tempfile.TemporaryDirectory()
+        self.cachePath = os.path.join(self.tmp.name, 'PublicIpCache.json')
+
+    def tearDown(self):
+        self.server.release.set()
+        WorkerPool.shutdownPool()
+        self.server.shutdown()
+        self.server.server_close()
+        self.tmp.cleanup()
+
+    def lookup(self, **kwargs):
+        return NetworkingUtils.PublicIpLookup(url=self.url, cachePath=self.cachePath, timeout=5, **kwargs)
+
+    def writeCache(self, ip, age):
+        with open(self.cachePath, 'w') as f:
+            json.dump({'fetchedAt': time.time() - age, 'url': self.url, 'data': NetworkingUtils.IpData(ip=ip).__dict__}, f)
+
+    def test_freshResultSendsNoRequest(self):
+        lookup = self.lookup(ttl=60)
+        self.assertEqual(lookup.get().ip, '203.0.113.42') # nothing cached, fetched here.
+        self.assertEqual(self.server.requests, 1)
+        for _ in range(5):
+            self.assertEqual(lookup.get().ip, '203.0.113.42')
+        self.assertEqual(self.server.requests, 1)
+        self.assertEqual(self.lookup(ttl=60).get().ip, '203.0.113.42') # a new lookup reads the disk cache.
+        self.assertEqual(self.server.requests, 1)
+
+    def test_staleDiskCacheIsServedWhileRevalidating(self):
+        self.writeCache('198.51.100.7', age=120)
+        lookup = self.lookup(ttl=60)
+        self.assertFalse(lookup.isFresh())
+        self.server.release.clear() # hold the response until the stale result was returned.
+        self.assertEqual(lookup.get().ip, '198.51.100.7')
+        self.assertEqual(lookup.get().ip, '198.51.100.7')
+        self.server.release.set()
+        deadline = time.time() + 5
+        while(WorkerPool.getPool().isPending('publicIp.refresh') and time.time() < deadline):
+            time.sleep(0.01)
+        self.assertEqual(self.server.requests, 1) # one refresh for both calls.
+        self.assertEqual(lookup.get().ip, '203.0.113.42')
+        self.assertTrue(lookup.isFresh())
+        with open(self.cachePath, 'r') as f:
+            self.assertEqual(json.load(f)['data']['ip'], '203.0.113.42')
+
+    def test_failuresBackOff(self):
+        self.server.down = True
+        lookup = self.lookup(retryDelay=10, maxBackoff=25)
+        self.assertIsNone(lookup.get())
+        self.assertEqual(lookup.failures, 1)
+        self.assertAlmostEqual(lookup.nextAttempt - time.time(), 10, delta=1)
+        self.assertIsNone(lookup.get()) # still backing off, not sent.
+        self.assertFalse(lookup.refreshInBackground())
+        self.assertEqual(self.server.requests, 1)
+        for delay in (20, 25): # doubles up to maxBackoff.
+            lookup.nextAttempt = 0
+            self.assertFalse(lookup.refresh())
+            self.assertAlmostEqual(lookup.nextAttempt - time.time(), delay, delta=1)
+        self.assertEqual(self.server.requests, 3)
+        self.server.down = False
+        lookup.nextAttempt = 0
+        self.assertTrue(lookup.refresh())
+        self.assertEqual((lookup.failures, lookup.nextAttempt), (0, 0))
+        self.assertEqual(lookup.get().ip, '203.0.113.42')
+
+
+if __name__ == '__main__':
+    unittest.main()
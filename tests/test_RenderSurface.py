@@ -0,0 +1,73 @@
+import unittest
+import RenderSurface
+
+class Element():
+    def __init__(self):
+        self.calls = []
+        self.tooltip = 'tip'
+
+    def update(self, *args, **kwargs):
+        self.calls.append((args, kwargs))
+
+class Window():
+    '''Records what a real PySimpleGUI window would be asked to do.'''
+    def __init__(self):
+        self.elements = dict()
+        self.refreshes = 0
+
+    def __getitem__(self, key):
+        return self.elements.setdefault(key, Element())
+
+    def refresh(self):
+        self.refreshes += 1
+
+class RenderSurfaceTest(unittest.TestCase):
+    def setUp(self):
+        self.window = Window()
+        self.surface = RenderSurface.RenderSurface(self.window)
+
+    def test_updatesWaitForFlush(self):
+        self.surface['-time-'].update('12:00')
+        self.surface['-ampm-'].update('PM', visible=True)
+        self.assertEqual(self.window.elements, dict())
+        self.assertEqual(self.surface.flush(), 2)
+        self.assertEqual(self.window['-time-'].calls, [(('12:00',), {})])
+        self.assertEqual(self.window['-ampm-'].calls, [(('PM',), {'visible': True})])
+        self.assertEqual(self.window.refreshes, 1) # one refresh for every element.
+
+    def test_unchangedArgumentsAreDropped(self):
+        self.surface['-time-'].update('12:00', text_color='red')
+        self.surface.flush()
+        self.surface['-time-'].update('12:00', text_color='red')
+        self.assertEqual(self.surface.flush(), 0)
+        self.surface['-time-'].update('12:00', text_color='blue')
+        self.surface.flush()
+        self.assertEqual(self.window['-time-'].calls[-1], ((), {'text_color': 'blue'}))
+        self.assertEqual(self.window.refreshes, 2)
+        self.assertEqual(self.surface.getStats(), {'skipped': 3, 'applied': 2, 'flushes': 2})
+
+    def test_lastQueuedValueWins(self):
+        self.surface['-time-'].update('12:00')
+        self.surface['-time-'].update('12:01')
+        self.surface.flush()
+        self.assertEqual(self.window['-time-'].calls, [(('12:01',), {})])
+
+    def test_invalidateSendsTheValueAgain(self):
+        self.surface['-time-'].update('12:00')
+        self.surface['-ampm-'].update('PM')
+        self.surface.flush()
+        self.surface.invalidate('-time-')
+        self.surface['-time-'].update('12:00')
+        self.surface['-ampm-'].update('PM')
+        self.assertEqual(self.surface.flush(), 1)
+        self.surface.invalidate()
+        self.surface['-ampm-'].update('PM')
+        self.assertEqual(self.surface.flush(), 1)
+        self.assertEqual(len(self.window['-ampm-'].calls), 2)
+
+    def test_otherAttributesReachTheElement(self):
+        self.assertEqual(self.surface['-time-'].tooltip, 'tip')
+
+
+if __name__ == '__main__':
+    unittest.main()
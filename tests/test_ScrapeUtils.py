@@ -0,0 +1,74 @@
+import importlib.util
+import os
+import re
+import unittest
+import ScrapeUtils
+import WeatherUtils
+import NetworkingUtils
+
+FIXTURES = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'fixtures')
+hasBs4 = importlib.util.find_spec('bs4') is not None
+
+def readFixture(name):
+    with open(os.path.join(FIXTURES, name), 'rb') as f:
+        return f.read()
+
+class StrategyTest(unittest.TestCase):
+    page = '<div><span class="a temp">71&deg;</span><span class="b"><b>x</b>y</span><span class="a">2</span></div>'
+
+    def test_regex(self):
+        self.assertEqual(ScrapeUtils.Regex(r'<span class="a temp">(.*?)</span>').run(self.page), '71°')
+        self.assertEqual(ScrapeUtils.Regex(r'<span class="a[^"]*">(.*?)</span>', many=True).run(self.page), ['71°', '2'])
+        self.assertIsNone(ScrapeUtils.Regex(r'<table>(.*)</table>').run(self.page))
+
+    def test_tagMatchesClassWordsAndPatterns(self):
+        self.assertEqual(ScrapeUtils.Tag('span', {'class': 'temp'}).run(self.page), '71°')
+        self.assertEqual(ScrapeUtils.Tag('span', {'class': 'a'}, many=True).run(self.page), ['71°', '2'])
+        self.assertEqual(ScrapeUtils.Tag('span', {'class': re.compile('^b')}).run(self.page), 'xy')
+        self.assertIsNone(ScrapeUtils.Tag('span', {'id': 'missing'}).run(self.page))
+
+    @unittest.skipUnless(hasBs4, 'BeautifulSoup is not installed')
+    def test_css(self):
+        self.assertEqual(ScrapeUtils.Css('span.temp', tags='span').run(self.page), '71°')
+
+
+class ExtractorTest(unittest.TestCase):
+    def test_fallsBackToTheNextStrategy(self):
+        extractor = ScrapeUtils.Extractor('value', ScrapeUtils.Regex(r'<nope>(.*)</nope>'), ScrapeUtils.Tag('b'))
+        self.assertEqual(extractor.extract(b'<p><b>bold</b></p>'), 'bold')
+        self.assertEqual(extractor.lastStrategy, 1)
+
+    def test_validateRejectsResults(self):
+        extractor = ScrapeUtils.Extractor('cells', ScrapeUtils.Tag('td', many=True), validate=lambda cells: len(cells) % 2 == 0,
+            default=[])
+        self.assertEqual(extractor.extract('<td>1</td><td>2</td>'), ['1', '2'])
+        self.assertEqual(extractor.extract('<td>1</td>'), [])
+        self.assertIsNone(extractor.lastStrategy)
+
+
+class SavedPageTest(unittest.TestCase):
+    '''Every strategy of the app's extractors must work on the saved pages, not only the first one.'''
+    def test_weatherPage(self):
+        page = readFixture('weather.html')
+        conditions = WeatherUtils.parseConditions(page)
+        self.assertEqual(conditions.temperature, '79°')
+        self.assertEqual(conditions.getTemperatureValue(), 79.0)
+        self.assertEqual(conditions.phrase, 'Partly Cloudy')
+        text = ScrapeUtils.decodePage(page)
+        for strategy in WeatherUtils.temperatureExtractor.strategies:
+            if(isinstance(strategy, ScrapeUtils.Css) and not(hasBs4)):
+                continue
+            self.assertEqual(strategy.run(text), '79°', strategy)
+
+    def test_ipPage(self):
+        page = readFixture('whatismyip.html')
+        data = NetworkingUtils.parseIpData(page)
+        self.assertEqual(data.ip, '203.0.113.42')
+        self.assertEqual(data.countryCode, 'US')
+        text = ScrapeUtils.decodePage(page)
+        cells = [s.run(text) for s in NetworkingUtils.getIpTableExtractor().strategies]
+        self.assertEqual(cells[0], cells[1])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,114 @@
+import os
+import tempfile
+import unittest
+import SysMetrics
+
+FILES = {
+    'stat': 'cpu  100 0 100 700 100 0 0 0\ncpu0 100 0 100 700 100 0 0 0\nintr 1\n',
+    'meminfo': 'MemTotal:        1000 kB\nMemFree:          100 kB\nMemAvailable:     250 kB\n',
+    'loadavg': '0.50 0.25 0.10 1/100 1234\n',
+    'thermal': '48312\n',
+    'cpuFreq': '1500000\n',
+    'throttled': '50005\n'
+}
+
+class SamplerTest(unittest.TestCase):
+    '''The sampler reads temporary /proc style files instead of the machine's.'''
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(self.tmp.cleanup)
+        for name, text in FILES.items():
+            self.write(name, text)
+
+    def path(self, name):
+        return os.path.join(self.tmp.name, name)
+
+    def write(self, name, text):
+        with open(self.path(name), 'w') as f: # same file, the sampler keeps it open.
+            f.write(text)
+
+    def makeSampler(self, names=FILES.keys(), minInterval=0):
+        sampler = SysMetrics.SysMetricsSampler(minInterval=minInterval, history=False)
+        sampler.close()
+        for name in names:
+            sampler._open(name, self.path(name))
+        self.addCleanup(sampler.close)
+        return sampler
+
+    def test_readsEveryValue(self):
+        s = self.makeSampler().sample()
+        self.assertIsNone(s.cpuPercent) # needs a previous sample.
+        self.assertEqual((s.memTotal, s.memAvailable, s.memPercent), (1024000, 256000, 75.0))
+        self.assertEqual((s.load1, s.load5, s.load15), (0.5, 0.25, 0.1))
+        self.assertEqual(s.temperature, 48.312)
+        self.assertEqual(s.cpuFreqMHz, 1500.0)
+        self.assertEqual(s.throttled, 0x50005)
+        self.assertEqual(s.getThrottledFlags(), ['under-voltage', 'throttled'])
+
+    def test_cpuPercentIsTheDeltaBetweenSamples(self):
+        sampler = self.makeSampler()
+        sampler.sample()
+        self.write('stat', 'cpu  150 0 150 900 100 0 0 0\n') # 100 busy out of 300.
+        self.assertAlmostEqual(sampler.sample().cpuPercent, 100 / 3)
+        self.write('stat', 'cpu  450 0 150 900 100 0 0 0\n')
+        self.assertEqual(sampler.sample().cpuPercent, 100.0)
+        self.assertEqual(sampler.sample().cpuPercent, 0.0) # nothing changed.
+
+    def test_callsWithinMinIntervalReuseTheSample(self):
+        sampler = self.makeSampler(minInterval=60)
+        first = sampler.sample()
+        self.write('thermal', '60000\n')
+        self.write('stat', 'cpu  150 0 150 900 100 0 0 0\n')
+        second = sampler.sample()
+        self.assertIs(second, first)
+        self.assertEqual((second.temperature, second.cpuPercent), (48.312, None))
+        sampler.lastSampleTime -= 60
+        self.assertEqual(sampler.sample().temperature, 60.0)
+
+    def test_missingFilesLeaveValuesNone(self):
+        sampler = self.makeSampler(names=('stat', 'loadavg'))
+        sampler._open('thermal', self.path('missing'))
+        s = sampler.sample()
+        self.assertEqual(s.load1, 0.5)
+        for name in ('memTotal', 'memPercent', 'temperature', 'cpuFreqMHz', 'throttled'):
+            self.assertIsNone(getattr(s, name), name)
+        self.assertEqual(s.getThrottledFlags(), [])
+
+    def test_emptyOrGarbledFiles(self):
+        sampler = self.makeSampler()
+        self.write('stat', '')
+        self.write('thermal', 'n/a\n')
+        self.write('meminfo', 'MemTotal: 1000 kB\n') # no MemAvailable on old kernels.
+        s = sampler.sample()
+        self.assertIsNone(s.cpuPercent)
+        self.assertIsNone(s.temperature)
+        self.assertIsNone(s.memPercent)
+
+
+class ThermalZoneTest(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(self.tmp.cleanup)
+
+    def addZone(self, zone, zoneType):
+        os.makedirs(os.path.join(self.tmp.name, zone))
+        with open(os.path.join(self.tmp.name, zone, 'type'), 'w') as f:
+            f.write(zoneType + '\n')
+
+    def test_prefersTheCpuZone(self):
+        self.addZone('thermal_zone0', 'acpitz')
+        self.addZone('thermal_zone1', 'cpu-thermal')
+        self.assertEqual(SysMetrics.findCpuThermalZone(self.tmp.name), os.path.join(self.tmp.name, 'thermal_zone1', 'temp'))
+
+    def test_fallsBackToTheFirstZone(self):
+        self.addZone('thermal_zone1', 'gpu')
+        self.addZone('thermal_zone0', 'acpitz')
+        self.assertEqual(SysMetrics.findCpuThermalZone(self.tmp.name), os.path.join(self.tmp.name, 'thermal_zone0', 'temp'))
+
+    def test_noZones(self):
+        self.assertIsNone(SysMetrics.findCpuThermalZone(self.tmp.name))
+        self.assertIsNone(SysMetrics.findCpuThermalZone(os.path.join(self.tmp.name, 'missing')))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,118 @@
+import os
+import sys
+import tempfile
+import time
+import unittest
+import SysUtils
+
+def python(code):
+    return [sys.executable, '-c', code]
+
+def isGone(pid, wait=5):
+    '''True once a process is gone (or only a zombie waiting for its parent).'''
+    deadline = time.monotonic() + wait
+    while(time.monotonic() < deadline):
+        try:
+            with open(f'/proc/{pid}/stat', 'r') as f:
+                if(f.read().rsplit(')', 1)[1].split()[0] == 'Z'):
+                    return True
+        except OSError:
+            return True
+        time.sleep(0.02)
+    return False
+
+class CommandRunnerTest(unittest.TestCase):
+    def setUp(self):
+        self.runner = SysUtils.CommandRunner(timeout=10)
+        self.tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(self.tmp.cleanup)
+        self.counter = os.path.join(self.tmp.name, 'runs')
+
+    def counting(self, output='out'):
+        '''A command that leaves a mark every time it really runs.'''
+        return python(f'open({self.counter!r}, "a").write("x"); print({output!r})')
+
+    def runs(self):
+        if(not(os.path.exists(self.counter))):
+            return 0
+        with open(self.counter, 'r') as f:
+            return len(f.read())
+
+    def test_runReturnsOutputWithoutAShell(self):
+        result = self.runner.run(python('import sys; print(sys.argv[1:])') + ['a b', '$HOME', '|'])
+        self.assertTrue(result.ok)
+        self.assertEqual(result.stdout.strip(), "['a b', '$HOME', '|']")
+        self.assertEqual(self.runner.run(python('print(input().upper())'), input='abc').stdout.strip(), 'ABC')
+
+    def test_failuresAndMissingPrograms(self):
+        result = self.runner.run(python('import sys; sys.stderr.write("bad"); sys.exit(3)'))
+        self.assertEqual((result.returncode, result.stderr, result.ok), (3, 'bad', False))
+        with self.assertRaises(SystemError): # CommandError is what runSys() always raised.
+            result.check()
+        missing = self.runner.run(['/nonexistent/program'])
+        self.assertEqual(missing.returncode, 127)
+        self.assertEqual(self.runner.getStats()['program']['failures'], 1)
+
+    def test_timeoutKillsTheWholeProcessGroup(self):
+        code = ('import subprocess, sys, time; '
+            'child = subprocess.Popen([sys.executable, "-c", "import time; time.sleep(60)"]); '
+            'print(child.pid, flush=True); time.sleep(60)')
+        start = time.monotonic()
+        result = self.runner.run(python(code), timeout=0.5)
+        self.assertLess(time.monotonic() - start, 10)
+        self.assertTrue(result.timedOut)
+        self.assertFalse(result.ok)
+        self.assertTrue(isGone(int(result.stdout.split()[0]))) # the grandchild did not outlive it.
+        with self.assertRaises(SysUtils.CommandError):
+            result.check()
+        self.assertEqual(self.runner.getStats()[os.path.basename(sys.executable)]['timeouts'], 1)
+
+    def test_cachedResultsAreReusedUntilTheTtl(self):
+        first = self.runner.run(self.counting(), cacheTtl=1)
+        second = self.runner.run(self.counting(), cacheTtl=1)
+        self.assertEqual(self.runs(), 1)
+        self.assertEqual((first.cached, second.cached), (False, True))
+        self.assertEqual(second.stdout, first.stdout)
+        self.runner.run(self.counting(), cacheTtl=1, input='other') # input is part of the cache key.
+        self.assertEqual(self.runs(), 2)
+        time.sleep(1.1)
+        self.assertFalse(self.runner.run(self.counting(), cacheTtl=1).cached)
+        self.assertEqual(self.runs(), 3)
+        self.assertEqual(self.runner.getStats()[os.path.basename(sys.executable)]['cacheHits'], 1)
+
+    def test_failuresAreNotCached(self):
+        command = python(f'open({self.counter!r}, "a").write("x"); raise SystemExit(1)')
+        self.runner.run(command, cacheTtl=60)
+        self.assertFalse(self.runner.run(command, cacheTtl=60).cached)
+        self.assertEqual(self.runs(), 2)
+
+    def test_runManyRunsAtTheSameTime(self):
+        commands = [python(f'import time; time.sleep(0.5); print({i})') for i in range(4)]
+        start = time.monotonic()
+        results = self.runner.runMany(commands)
+        self.assertLess(time.monotonic() - start, 1.8) # one after the other takes at least 2s.
+        self.assertEqual([r.stdout.strip() for r in results], ['0', '1', '2', '3'])
+
+    def test_runManyTimeoutsAndCache(self):
+        self.runner.run(self.counting('cached'), cacheTtl=60)
+        results = self.runner.runMany([self.counting('cached'), python('import time; time.sleep(60)'), ['/nonexistent/program']],
+            timeout=0.5, cacheTtl=60)
+        self.assertEqual([(r.cached, r.timedOut, r.returncode) for r in results], [(True, False, 0), (False, True, -9), (False, False, 127)])
+        self.assertEqual(self.runs(), 1)
+
+    def test_streamYieldsLinesAndKillsWhenClosed(self):
+        lines = self.runner.stream(python('import time\nfor i in range(100):\n print(i, flush=True); time.sleep(0.05)'))
+        self.assertEqual([next(lines) for _ in range(3)], ['0', '1', '2'])
+        start = time.monotonic()
+        lines.close()
+        self.assertLess(time.monotonic() - start, 2)
+        self.assertEqual(list(self.runner.stream(python('print("a"); print("b")'))), ['a', 'b'])
+
+    def test_runSysRaisesOnStderr(self):
+        self.assertEqual(SysUtils.runSys(python('print(" ok ")')), 'ok')
+        with self.assertRaises(SysUtils.CommandError):
+            SysUtils.runSys(python('import sys; sys.stderr.write("warning")'))
+
+
+if __name__ == '__main__':
+    unittest.main()
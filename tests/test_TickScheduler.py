@@ -0,0 +1,58 @@
+import unittest
+import TickScheduler
+
+class Feature():
+    def __init__(self, interval):
+        self.interval = interval
+
+    def nextDeadline(self, now):
+        return now + self.interval if self.interval is not None else None
+
+class TickSchedulerTest(unittest.TestCase):
+    def setUp(self):
+        self.fast = Feature(0.5)
+        self.slow = Feature(60)
+        self.scheduler = TickScheduler.TickScheduler(maxTimeout=10000)
+        self.scheduler.schedule(self.fast, 100.5)
+        self.scheduler.schedule(self.slow, 160)
+
+    def test_everyFeatureIsDueRightAway(self):
+        scheduler = TickScheduler.TickScheduler([self.fast, self.slow])
+        self.assertEqual(scheduler.popDueFeatures(), [self.fast, self.slow])
+        self.assertIsNone(scheduler.getTimeout()) # nothing scheduled, block until an event.
+
+    def test_sleepsUntilTheEarliestDeadline(self):
+        self.assertEqual(self.scheduler.getTimeout(now=100), 500)
+        self.assertEqual(self.scheduler.getTimeout(now=100.4999), 1) # rounded up, never busy waits.
+        self.assertEqual(self.scheduler.getTimeout(now=101), 1) # overdue.
+        self.scheduler.unschedule(self.fast)
+        self.assertEqual(self.scheduler.getTimeout(now=100), 10000) # capped by maxTimeout.
+
+    def test_popsOnlyDueFeatures(self):
+        self.assertEqual(self.scheduler.popDueFeatures(now=100), [])
+        self.assertEqual(self.scheduler.popDueFeatures(now=100.5), [self.fast])
+        self.assertEqual(self.scheduler.popDueFeatures(now=100.5), []) # popped features are not scheduled.
+        self.assertEqual(self.scheduler.nextDeadline(), 160)
+
+    def test_rescheduleUsesTheFeatureDeadline(self):
+        for feature in self.scheduler.popDueFeatures(now=100.5):
+            self.scheduler.reschedule(feature, now=100.5)
+        self.assertEqual(self.scheduler.nextDeadline(), 101)
+        self.scheduler.reschedule(Feature(None), now=100.5) # None leaves a feature unscheduled.
+        self.assertEqual(len(self.scheduler._entries), 2)
+
+    def test_schedulingAgainReplacesTheDeadline(self):
+        self.scheduler.schedule(self.fast, 200)
+        self.assertEqual(self.scheduler.nextDeadline(), 160)
+        self.assertEqual(self.scheduler.popDueFeatures(now=300), [self.slow, self.fast])
+
+    def test_unscheduledFeaturesAreNeverDue(self):
+        self.scheduler.unschedule(self.fast)
+        self.scheduler.unschedule(self.fast) # twice is harmless.
+        self.assertEqual(self.scheduler.nextDeadline(), 160)
+        self.assertEqual(self.scheduler.popDueFeatures(now=1000), [self.slow])
+        self.assertEqual(self.scheduler._heap, [])
+
+
+if __name__ == '__main__':
+    unittest.main()
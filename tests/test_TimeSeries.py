@@ -0,0 +1,105 @@
+import math
+import os
+import tempfile
+import unittest
+from unittest import mock
+import TimeSeries
+
+LEVELS = ((1, 10), (10, 6)) # 10 seconds at 1s, 1 minute at 10s.
+
+def asList(values):
+    return [None if v != v else v for v in values] # nan -> None so lists compare.
+
+class SeriesTest(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.path = os.path.join(self.tmp.name, 'test.ts')
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def test_bucketsKeepMinMaxMean(self):
+        series = TimeSeries.Series(levels=LEVELS)
+        for value, t in ((1, 100.0), (3, 100.5), (2, 101.0)):
+            series.add(value, t)
+        start, resolution, mins, maxs, means = series.getRange(3, end=101.0)
+        self.assertEqual((start, resolution), (99, 1))
+        self.assertEqual(asList(mins), [None, 1, 2])
+        self.assertEqual(asList(maxs), [None, 3, 2])
+        self.assertEqual(asList(means), [None, 2, 2])
+
+    def test_ringWrapForgetsOldBuckets(self):
+        series = TimeSeries.Series(levels=LEVELS)
+        series.add(5, 100)
+        series.add(7, 110) # same slot as 100, one lap later.
+        _, _, mins, _, _ = series.getRange(10, end=110)
+        self.assertEqual(asList(mins), [None] * 9 + [7])
+        _, _, mins, _, _ = series.getRange(1, end=100)
+        self.assertEqual(asList(mins), [None]) # bucket 100 was overwritten.
+
+    def test_longRangesUseCoarserLevels(self):
+        series = TimeSeries.Series(levels=LEVELS)
+        self.assertEqual(series.getLevel(10).resolution, 1)
+        self.assertEqual(series.getLevel(30).resolution, 10)
+        self.assertEqual(series.getLevel(3600).resolution, 10) # longer than any level, the coarsest.
+
+    def test_noneAndNanAreGaps(self):
+        series = TimeSeries.Series(levels=LEVELS)
+        series.add(None, 100)
+        series.add(math.nan, 100)
+        self.assertIsNone(series.lastValue)
+        self.assertEqual(asList(series.getRange(1, end=100)[2]), [None])
+
+    def test_historySurvivesReopen(self):
+        series = TimeSeries.Series(self.path, levels=LEVELS)
+        series.add(42, 1000)
+        series.close()
+        reopened = TimeSeries.Series(self.path, levels=LEVELS)
+        self.assertEqual(asList(reopened.getRange(1, end=1000)[2]), [42])
+        reopened.close()
+
+    def test_fileWithOtherLevelsStartsOver(self):
+        series = TimeSeries.Series(self.path, levels=LEVELS)
+        series.add(42, 1000)
+        series.close()
+        other = TimeSeries.Series(self.path, levels=((1, 20),))
+        self.assertEqual(asList(other.getRange(1, end=1000)[2]), [None])
+        other.close()
+
+    def test_fileSizeOfDefaultLevels(self):
+        TimeSeries.Series(self.path).close()
+        self.assertEqual(os.path.getsize(self.path), 288060)
+
+
+class MinMaxBucketsTest(unittest.TestCase):
+    def test_keepsSpikes(self):
+        mins = [1, 1, 0, 1, 1, 1, 1, 1]
+        maxs = [1, 1, 9, 1, 1, 1, 1, 1]
+        colMins, colMaxs = TimeSeries.minMaxBuckets(mins, maxs, 4)
+        self.assertEqual(colMins, [1, 0, 1, 1])
+        self.assertEqual(colMaxs, [1, 9, 1, 1])
+
+    def test_emptyColumnsAreNan(self):
+        nan = math.nan
+        colMins, colMaxs = TimeSeries.minMaxBuckets([nan, nan, 2, 3], [nan, nan, 2, 3], 2)
+        self.assertEqual(asList(colMins), [None, 2])
+        self.assertEqual(asList(colMaxs), [None, 3])
+
+
+class SeriesDirTest(unittest.TestCase):
+    def test_historyDoesNotDependOnWorkingDirectory(self):
+        self.assertTrue(os.path.isabs(TimeSeries._seriesDir))
+        self.assertEqual(os.path.dirname(TimeSeries._seriesDir), os.path.dirname(os.path.abspath(TimeSeries.__file__)))
+
+
+class WithoutNumpyTest(SeriesTest, MinMaxBucketsTest):
+    '''The same tests on the pure python path used when numpy is not installed.'''
+    def setUp(self):
+        super().setUp()
+        patcher = mock.patch('TimeSeries._getNumpy', return_value=None)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+
+if __name__ == '__main__':
+    unittest.main()
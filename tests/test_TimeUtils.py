@@ -0,0 +1,124 @@
+import calendar
+import time
+import unittest
+from unittest import mock
+import TimeUtils
+
+def hasZone(name):
+    try:
+        return TimeUtils.zoneinfo is not None and TimeUtils.zoneinfo.ZoneInfo(name) is not None
+    except Exception: # no tzdata on this system.
+        return False
+
+class AdjustHourTest(unittest.TestCase):
+    def test_wrapsAroundMidnight(self):
+        self.assertEqual(TimeUtils.adjustHourRelLocal(3, inputHour=22), 1)
+        self.assertEqual(TimeUtils.adjustHourRelLocal(-5, inputHour=2), 21)
+        self.assertEqual(TimeUtils.adjustHourRelLocal(0, inputHour=23), 23)
+
+    def test_givenHourDoesNotReadTheClock(self):
+        with mock.patch('time.localtime') as localtime:
+            TimeUtils.adjustHourRelLocal(2, inputHour=10)
+        localtime.assert_not_called()
+
+    def test_missingHourUsesLocalTime(self):
+        self.assertEqual(TimeUtils.adjustHourRelLocal(0), time.localtime().tm_hour)
+
+
+class FormatClockTest(unittest.TestCase):
+    def test_twelveHourClock(self):
+        self.assertEqual(TimeUtils.formatClock(0, 5), ('12:05', '12 05', 'AM'))
+        self.assertEqual(TimeUtils.formatClock(12, 30), ('12:30', '12 30', 'PM'))
+        self.assertEqual(TimeUtils.formatClock(23, 59), ('11:59', '11 59', 'PM'))
+
+    def test_militaryClock(self):
+        self.assertEqual(TimeUtils.formatClock(0, 5, militaryTime=True)[0], '0:05')
+        self.assertEqual(TimeUtils.formatClock(23, 59, militaryTime=True)[0], '23:59')
+
+
+class TimeSnapshotTest(unittest.TestCase):
+    def setUp(self):
+        self.epoch = time.mktime((2024, 3, 1, 22, 45, 10, 0, 0, -1)) # 22:45:10 local time.
+
+    def test_getClockWrapsAdjustedHours(self):
+        snapshot = TimeUtils.TimeSnapshot(self.epoch)
+        self.assertEqual(snapshot.getClock(False, 0), ('10:45', '10 45', 'PM'))
+        self.assertEqual(snapshot.getClock(False, 3), ('1:45', '1 45', 'AM'))
+        self.assertEqual(snapshot.getClock(True, 3)[0], '1:45')
+        self.assertEqual(snapshot.getClock(True, -23)[0], '23:45')
+
+    def test_getClockIsCached(self):
+        snapshot = TimeUtils.TimeSnapshot(self.epoch)
+        self.assertIs(snapshot.getClock(False, 5), snapshot.getClock(False, 5))
+
+    def test_blinkTextOnOddSeconds(self):
+        odd = TimeUtils.TimeSnapshot(self.epoch + 1)
+        self.assertEqual(odd.getClockText(blink=True), ('10 45', 'PM'))
+        self.assertEqual(odd.getClockText(blink=False), ('10:45', 'PM'))
+        self.assertEqual(TimeUtils.TimeSnapshot(self.epoch).getClockText(blink=True), ('10:45', 'PM'))
+
+    def test_getSnapshotIsSharedWithinASecond(self):
+        first = TimeUtils.getSnapshot(self.epoch + 0.1)
+        self.assertIs(TimeUtils.getSnapshot(self.epoch + 0.9), first)
+        self.assertIsNot(TimeUtils.getSnapshot(self.epoch + 1.0), first)
+
+
+@unittest.skipUnless(hasZone('America/New_York'), 'IANA time zone data is not available')
+class ZoneOffsetCacheTest(unittest.TestCase):
+    springForward = calendar.timegm((2026, 3, 8, 7, 0, 0))  # 2:00 EST becomes 3:00 EDT.
+    fallBack = calendar.timegm((2026, 11, 1, 6, 0, 0))      # 2:00 EDT becomes 1:00 EST.
+
+    def setUp(self):
+        self.cache = TimeUtils.ZoneOffsetCache('America/New_York')
+        patcher = mock.patch.object(self.cache, '_refresh', wraps=self.cache._refresh)
+        self.refresh = patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def test_cachedUntilTheTransitionSecond(self):
+        self.assertEqual(self.cache.getOffset(self.springForward - 86400 * 30), (-5 * 3600, 'EST'))
+        self.assertEqual(self.cache.validUntil, self.springForward)
+        self.assertEqual(self.cache.getOffset(self.springForward - 1), (-5 * 3600, 'EST'))
+        self.assertEqual(self.refresh.call_count, 1)
+        self.assertEqual(self.cache.getOffset(self.springForward), (-4 * 3600, 'EDT'))
+        self.assertEqual(self.refresh.call_count, 2)
+        self.assertEqual(self.cache.validUntil, self.fallBack)
+        self.assertEqual(self.cache.getOffset(self.fallBack - 1), (-4 * 3600, 'EDT'))
+        self.assertEqual(self.cache.getOffset(self.fallBack), (-5 * 3600, 'EST'))
+        self.assertEqual(self.refresh.call_count, 3)
+
+    def test_goingBackInTimeRefreshes(self):
+        self.cache.getOffset(self.fallBack)
+        self.assertEqual(self.cache.getOffset(self.fallBack - 1), (-4 * 3600, 'EDT'))
+        self.assertEqual(self.refresh.call_count, 2)
+
+    @unittest.skipUnless(hasZone('UTC'), 'IANA time zone data is not available')
+    def test_zoneWithoutTransitionsIsRecheckedAfterSearchDays(self):
+        cache = TimeUtils.ZoneOffsetCache('UTC')
+        cache.searchDays = 3
+        cache.getOffset(self.springForward)
+        self.assertEqual(cache.validUntil, self.springForward + 3 * 86400)
+        self.assertEqual(cache.getOffset(self.springForward + 3 * 86400), (0, 'UTC'))
+        self.assertEqual(cache.validFrom, self.springForward + 3 * 86400)
+
+
+@unittest.skipUnless(hasZone('America/New_York'), 'IANA time zone data is not available')
+class WorldClockEngineTest(unittest.TestCase):
+    def test_clockSkipsAndRepeatsAnHour(self):
+        engine = TimeUtils.WorldClockEngine()
+        engine.registerZone('America/New_York')
+        spring = ZoneOffsetCacheTest.springForward
+        fall = ZoneOffsetCacheTest.fallBack
+        self.assertEqual(engine.computeAll(spring - 1), {'America/New_York': (1, 59, 'EST')})
+        self.assertEqual(engine.computeAll(spring), {'America/New_York': (3, 0, 'EDT')})
+        self.assertEqual(engine.computeZone('America/New_York', fall - 1), (1, 59, 'EDT'))
+        self.assertEqual(engine.computeZone('America/New_York', fall), (1, 0, 'EST'))
+        self.assertEqual(engine.computeZone('America/New_York', fall + 3600), (2, 0, 'EST'))
+
+    def test_snapshotShowsTheZoneAfterTheTransition(self):
+        TimeUtils.registerZone('America/New_York')
+        snapshot = TimeUtils.TimeSnapshot(ZoneOffsetCacheTest.springForward + 0.5)
+        self.assertEqual(snapshot.getZoneClockText('America/New_York', blink=False), ('3:00', 'AM', 'EDT'))
+
+
+if __name__ == '__main__':
+    unittest.main()
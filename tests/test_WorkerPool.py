@@ -0,0 +1,127 @@
+import queue
+import threading
+import time
+import unittest
+import WorkerPool
+
+class Window():
+    '''Collects what write_event_value() would post to a PySimpleGUI window.'''
+    def __init__(self):
+        self.events = queue.Queue()
+
+    def write_event_value(self, key, value):
+        self.events.put((key, value))
+
+    def next(self, timeout=5):
+        return self.events.get(timeout=timeout)
+
+    def nothingPosted(self, wait=0.2):
+        try:
+            self.events.get(timeout=wait)
+        except queue.Empty:
+            return True
+        return False
+
+class WorkerPoolTest(unittest.TestCase):
+    def setUp(self):
+        self.window = Window()
+        self.pool = WorkerPool.WorkerPool(maxWorkers=2, window=self.window)
+        self.release = threading.Event()
+
+    def tearDown(self):
+        self.release.set()
+        self.pool.shutdown(wait=True)
+
+    def blocking(self, value=None):
+        self.release.wait(5)
+        return value
+
+    def test_resultIsPostedToTheEventKey(self):
+        self.assertTrue(self.pool.submit('job', '-weather-', lambda a, b: a + b, 1, b=2))
+        key, result = self.window.next()
+        self.assertEqual(key, '-weather-')
+        self.assertTrue(result.ok)
+        self.assertEqual((result.jobKey, result.value), ('job', 3))
+        self.assertFalse(self.pool.isPending('job'))
+
+    def test_errorsArePostedNotRaised(self):
+        self.pool.submit('job', '-weather-', lambda: 1 / 0)
+        result = self.window.next()[1]
+        self.assertFalse(result.ok)
+        self.assertIsInstance(result.error, ZeroDivisionError)
+
+    def test_sharedJobKeyRunsOnceForEveryListener(self):
+        calls = []
+        def work():
+            calls.append(1)
+            return self.blocking('ip')
+        self.assertTrue(self.pool.submit('publicIp', '-a-', work))
+        self.assertFalse(self.pool.submit('publicIp', '-b-', work))
+        self.assertFalse(self.pool.submit('publicIp', '-b-', work)) # listed once.
+        self.assertFalse(self.pool.submit('publicIp', None, work)) # nobody waits on it, nothing posted.
+        self.release.set()
+        posted = sorted([self.window.next(), self.window.next()], key=lambda e: e[0])
+        self.assertEqual([(k, r.value) for k, r in posted], [('-a-', 'ip'), ('-b-', 'ip')])
+        self.assertTrue(self.window.nothingPosted())
+        self.assertEqual(len(calls), 1)
+
+    def test_timeoutPostsOnceAndDropsTheLateResult(self):
+        self.pool.submit('slow', '-slow-', self.blocking, 'late', timeout=0.05)
+        key, result = self.window.next()
+        self.assertTrue(result.timedOut)
+        self.assertFalse(result.ok)
+        self.assertFalse(self.pool.isPending('slow'))
+        self.release.set()
+        self.assertTrue(self.window.nothingPosted())
+
+    def test_keyCanBeSubmittedAgainAfterATimeout(self):
+        self.pool.submit('slow', '-slow-', self.blocking, timeout=0.05)
+        self.window.next()
+        self.assertTrue(self.pool.submit('slow', '-slow-', lambda: 'again'))
+        self.release.set()
+        self.assertEqual(self.window.next()[1].value, 'again')
+
+    def test_cancelOneListener(self):
+        self.pool.submit('job', '-a-', self.blocking, 'value')
+        self.pool.submit('job', '-b-', self.blocking, 'value')
+        self.pool.cancel('job', '-a-')
+        self.assertTrue(self.pool.isPending('job'))
+        self.release.set()
+        self.assertEqual(self.window.next()[0], '-b-')
+        self.assertTrue(self.window.nothingPosted())
+
+    def test_cancelLastListenerDropsTheJob(self):
+        self.pool.submit('job', '-a-', self.blocking, 'value')
+        self.pool.cancel('job', '-a-')
+        self.assertFalse(self.pool.isPending('job'))
+        self.release.set()
+        self.assertTrue(self.window.nothingPosted())
+
+    def test_cancelStopsJobsThatHaveNotStarted(self):
+        started = []
+        self.pool.submit('a', '-a-', self.blocking)
+        self.pool.submit('b', '-b-', self.blocking)
+        self.pool.submit('queued', '-queued-', lambda: started.append(1)) # both workers are busy.
+        self.pool.cancel('queued')
+        self.release.set()
+        self.assertEqual(sorted([self.window.next()[0], self.window.next()[0]]), ['-a-', '-b-'])
+        self.assertTrue(self.window.nothingPosted())
+        self.assertEqual(started, [])
+
+    def test_resultsWithoutAWindowAreDropped(self):
+        self.pool.attachWindow(None)
+        self.pool.submit('job', '-a-', lambda: 1)
+        deadline = time.time() + 5
+        while(self.pool.isPending('job') and time.time() < deadline):
+            time.sleep(0.01)
+        self.assertFalse(self.pool.isPending('job'))
+        self.assertTrue(self.window.nothingPosted())
+
+    def test_shutdownRefusesNewJobs(self):
+        self.pool.shutdown()
+        with self.assertRaises(RuntimeError):
+            self.pool.submit('job', '-a-', lambda: 1)
+
+
+if __name__ == '__main__':
+    unittest.main()